@@ -18,9 +18,24 @@ from gitlab_monitor import __app_name__
 from gitlab_monitor import __version__
 from gitlab_monitor.commands.commands import CLICommand
 from gitlab_monitor.logger import logger
+from gitlab_monitor.services.bdd.repository import DEFAULT_BATCH_SIZE
+from gitlab_monitor.services.bdd.scan_task_repository import DEFAULT_LEASE
+from gitlab_monitor.services.bdd.scan_task_repository import (
+    DEFAULT_MAX_ATTEMPTS,
+)
+from gitlab_monitor.services.bdd.scan_task_repository import (
+    DEFAULT_POLL_INTERVAL,
+)
+from gitlab_monitor.services.bdd.watermark_repository import (
+    DEFAULT_MAX_SYNC_AGE,
+)
+from gitlab_monitor.services.call_gitlab import ScanStrategy
+from gitlab_monitor.services.filters import Visibility
 
 
 app = typer.Typer()
+db_app = typer.Typer(help="Manage the gitlab_monitor database.")
+app.add_typer(db_app, name="db")
 
 
 def _version_callback(value: bool) -> None:
@@ -62,12 +77,135 @@ def scan_projects(
         help="Would store the projects retrieved in a json file with the specified name, \
 stored in the project's “saved_datas/projects” folder.",
     ),
+    full_scan: bool = typer.Option(
+        False,
+        "--full-scan",
+        help="Retrieve all the projects again, instead of only the projects updated \
+since the last scan saved in the database",
+    ),
+    batch_size: int = typer.Option(
+        DEFAULT_BATCH_SIZE,
+        "--batch-size",
+        min=1,
+        help="Number of projects saved in the database with one request",
+    ),
+    visibility: Optional[Visibility] = typer.Option(
+        None,
+        "--visibility",
+        help="Retrieve only the projects with this visibility",
+    ),
+    namespace: str = typer.Option(
+        None,
+        "--namespace",
+        help="Retrieve only the projects of this namespace and its subgroups \
+(format: group/subgroup)",
+    ),
+    archived: Optional[bool] = typer.Option(
+        None,
+        "--archived/--no-archived",
+        help="Retrieve only the archived projects, or only the projects not archived",
+    ),
+    search: str = typer.Option(
+        None,
+        "--search",
+        help="Retrieve only the projects matching this search term",
+    ),
+    active_since: datetime = typer.Option(
+        None,
+        "--active-since",
+        help="Retrieve projects active since the specified date (format: YYYY-MM-DD)",
+    ),
+    strategy: ScanStrategy = typer.Option(
+        ScanStrategy.FULL,
+        "--strategy",
+        help="'sorted' requests the projects from the least recently active and stops \
+at the first one active since the --unused-since date, 'sharded' splits the project \
+ids in ranges retrieved concurrently",
+    ),
+    jobs: int = typer.Option(
+        1,
+        "-j",
+        "--jobs",
+        min=1,
+        help="Number of concurrent requests used by the sharded strategy, and to \
+retrieve the commits details of a project with --commits",
+    ),
+    resume: bool = typer.Option(
+        False,
+        "--resume",
+        help="Resume an interrupted scan after the last project saved in the database",
+    ),
+    use_async: bool = typer.Option(
+        False,
+        "--async",
+        help="Retrieve the projects with the asynchronous client, with up to --jobs \
+requests in flight on a single thread",
+    ),
+    commits: bool = typer.Option(
+        False,
+        "--commits",
+        help="Also retrieve the commits of each project saved in the database",
+    ),
+    workers: int = typer.Option(
+        4,
+        "--workers",
+        min=1,
+        help="Number of projects whose commits are retrieved concurrently with \
+--commits",
+    ),
+    single_pass: bool = typer.Option(
+        False,
+        "--single-pass",
+        help="Build the commits from the commits list only, without requesting \
+the details of each commit",
+    ),
+    full_commit_scan: bool = typer.Option(
+        False,
+        "--full-commit-scan",
+        help="Retrieve all the commits of each project again with --commits, instead \
+of only the commits since the last scan saved in the database",
+    ),
 ):
     """Scan and retrieve all projects from GitLab"""
+    if strategy is ScanStrategy.SORTED and unused_since is None:
+        raise typer.BadParameter(
+            "The sorted strategy needs the --unused-since option.",
+            param_hint="'--strategy'",
+        )
+    if resume and (no_db or save_in_file or strategy is not ScanStrategy.FULL):
+        raise typer.BadParameter(
+            "Only a full strategy scan saved in the database can be resumed.",
+            param_hint="'--resume'",
+        )
+    if commits and (no_db or save_in_file or resume):
+        raise typer.BadParameter(
+            "The commits are only retrieved by a scan saved in the database, which \
+can't be resumed: use the worker command to scan the commits of many projects \
+across interruptions.",
+            param_hint="'--commits'",
+        )
     cli_command = CLICommand()
     command = cli_command.create_command("scan_projects")
     cli_command.handle_command(
-        command, no_db=no_db, unused_since=unused_since, save_in_file=save_in_file
+        command,
+        no_db=no_db,
+        unused_since=unused_since,
+        save_in_file=save_in_file,
+        full_scan=full_scan,
+        batch_size=batch_size,
+        visibility=visibility,
+        namespace=namespace,
+        archived=archived,
+        search=search,
+        active_since=active_since,
+        strategy=strategy,
+        jobs=jobs,
+        resume=resume,
+        use_async=use_async,
+        commits=commits,
+        workers=workers,
+        single_pass=single_pass,
+        full_commit_scan=full_commit_scan,
     )
 
 
@@ -88,8 +226,56 @@ def scan_project(
         help="Would store the project retrieved in a json file with the specified name, \
 stored in the project's “saved_datas/projects” folder.",
     ),
+    jobs: int = typer.Option(
+        1,
+        "-j",
+        "--jobs",
+        min=1,
+        help="Number of concurrent requests used to retrieve the commits details",
+    ),
+    single_pass: bool = typer.Option(
+        False,
+        "--single-pass",
+        help="Build the commits from the commits list only, without requesting \
+the details of each commit",
+    ),
+    full_commit_scan: bool = typer.Option(
+        False,
+        "--full-commit-scan",
+        help="Retrieve all the commits again, instead of only the commits since \
+the last scan saved in the database",
+    ),
+    batch_size: int = typer.Option(
+        DEFAULT_BATCH_SIZE,
+        "--batch-size",
+        min=1,
+        help="Number of commits saved in the database with one request",
+    ),
+    copy_load: bool = typer.Option(
+        False,
+        "--copy-load",
+        help="Load the commits in the database with PostgreSQL COPY, faster for \
+the initial load of projects with a large history",
+    ),
+    resume: bool = typer.Option(
+        False,
+        "--resume",
+        help="Resume an interrupted scan of the commits before the last commit saved \
+in the database",
+    ),
+    use_async: bool = typer.Option(
+        False,
+        "--async",
+        help="Retrieve the commits and their details with the asynchronous client, with up to --jobs \
+requests in flight on a single thread",
+    ),
 ):
     """Scan and retrieve a GitLab project by its ID"""
+    if resume and no_db:
+        raise typer.BadParameter(
+            "Only a scan saved in the database can be resumed.",
+            param_hint="'--resume'",
+        )
     cli_command = CLICommand()
     command = cli_command.create_command("scan_project")
     cli_command.handle_command(
@@ -98,6 +284,13 @@ stored in the project's “saved_datas/projects” folder.",
         get_commits=commit,
         no_db=no_db,
         save_in_file=save_in_file,
+        jobs=jobs,
+        single_pass=single_pass,
+        full_commit_scan=full_commit_scan,
+        batch_size=batch_size,
+        copy_load=copy_load,
+        resume=resume,
+        use_async=use_async,
     )
 
 
@@ -114,30 +307,187 @@ def validate_project(project: str):
 
 @app.command(name="archive-project")
 def archive_project(
-    project: str = typer.Argument(
-        ...,
+    project: Optional[str] = typer.Argument(
+        None,
         help="Id of the project to archive or the path to a json file containing \
 the projects to archive",
     ),
+    unused_since: datetime = typer.Option(
+        None,
+        "--unused-since",
+        help="Archive the projects saved in the database without any activity since \
+the specified date (format: YYYY-MM-DD), instead of a project or a file",
+    ),
+    namespace: str = typer.Option(
+        None,
+        "--namespace",
+        help="With --unused-since, archive only the projects of this namespace and \
+its subgroups (format: group/subgroup)",
+    ),
+    visibility: Optional[Visibility] = typer.Option(
+        None,
+        "--visibility",
+        help="With --unused-since, archive only the projects with this visibility",
+    ),
+    dry_run: bool = typer.Option(
+        False,
+        "--dry-run",
+        help="Show the projects which would be archived, without archiving them",
+    ),
+    jobs: int = typer.Option(
+        4,
+        "-j",
+        "--jobs",
+        min=1,
+        help="Number of projects archived concurrently",
+    ),
+    max_sync_age: float = typer.Option(
+        DEFAULT_MAX_SYNC_AGE,
+        "--max-sync-age",
+        min=0,
+        help="With --unused-since, maximum number of hours since the last scan of the \
+projects saved in the database: the last activity dates of older scans may be \
+outdated, and the projects are not archived",
+    ),
+    journal: str = typer.Option(
+        None,
+        "--journal",
+        help="Path of the journal of the projects archived or failed, to skip the \
+archived projects when the command is run again (default: the path of the json file \
+with the extension .archive.jsonl, or saved_datas/archive/unused-since-DATE.jsonl)",
+    ),
 ):
-    """Archive a GitLab project by its ID or archive all the project \
-        saved in the file passed as argument"""
+    """Archive a GitLab project by its ID, all the projects saved in the file \
+        passed as argument, or the projects unused since a date"""
     try:
-        is_valid_project = validate_project(project)
-        if isinstance(is_valid_project, int):
-            typer.echo(f"Given ID : {is_valid_project}")
-        elif isinstance(is_valid_project, Path):
-            typer.echo(f"Given Path : {is_valid_project}")
+        if (project is None) == (unused_since is None):
+            raise typer.BadParameter(
+                "Give either a project ID or path, or the --unused-since option."
+            )
+        if unused_since is None and (namespace or visibility):
+            raise typer.BadParameter(
+                "The --namespace and --visibility options need --unused-since."
+            )
+        if project is not None:
+            is_valid_project = validate_project(project)
+            if isinstance(is_valid_project, int):
+                typer.echo(f"Given ID : {is_valid_project}")
+            elif isinstance(is_valid_project, Path):
+                typer.echo(f"Given Path : {is_valid_project}")
 
         cli_command = CLICommand()
         command = cli_command.create_command("archive_project")
-        cli_command.handle_command(command, project=project)
+        cli_command.handle_command(
+            command,
+            project=project,
+            unused_since=unused_since,
+            namespace=namespace,
+            visibility=visibility.value if visibility else None,
+            dry_run=dry_run,
+            jobs=jobs,
+            journal=journal,
+            max_sync_age=max_sync_age,
+        )
 
     except typer.BadParameter as e:
         typer.echo(f"Error : {e}", err=True)
         raise typer.Exit(code=1)
 
 
+@app.command(name="worker")
+def worker(
+    enqueue: bool = typer.Option(
+        False,
+        "--enqueue",
+        help="Add every project saved in the database to the scan queue before \
+working",
+    ),
+    wait: bool = typer.Option(
+        False,
+        "--wait",
+        help="Wait for new tasks when the queue is empty, instead of stopping",
+    ),
+    worker_name: str = typer.Option(
+        None,
+        "--name",
+        help="Name of the worker in the queue (default: host name and process id)",
+    ),
+    lease: int = typer.Option(
+        DEFAULT_LEASE,
+        "--lease",
+        min=1,
+        help="Number of seconds without a batch of commits saved after which a task \
+not finished by its worker is queued again",
+    ),
+    max_attempts: int = typer.Option(
+        DEFAULT_MAX_ATTEMPTS,
+        "--max-attempts",
+        min=1,
+        help="Number of attempts after which the scan of a project is failed",
+    ),
+    poll_interval: int = typer.Option(
+        DEFAULT_POLL_INTERVAL,
+        "--poll-interval",
+        min=1,
+        help="Number of seconds between two claims when waiting for tasks",
+    ),
+    jobs: int = typer.Option(
+        1,
+        "-j",
+        "--jobs",
+        min=1,
+        help="Number of concurrent requests used to retrieve the commits details",
+    ),
+    single_pass: bool = typer.Option(
+        False,
+        "--single-pass",
+        help="Build the commits from the commits list only, without requesting \
+the details of each commit",
+    ),
+    batch_size: int = typer.Option(
+        DEFAULT_BATCH_SIZE,
+        "--batch-size",
+        min=1,
+        help="Number of commits saved in the database with one request",
+    ),
+    copy_load: bool = typer.Option(
+        False,
+        "--copy-load",
+        help="Load the commits in the database with PostgreSQL COPY",
+    ),
+    use_async: bool = typer.Option(
+        False,
+        "--async",
+        help="Retrieve the commits and their details with the asynchronous client",
+    ),
+):
+    """Scan the projects of the queue shared by the workers, with their commits"""
+    cli_command = CLICommand()
+    command = cli_command.create_command("worker")
+    cli_command.handle_command(
+        command,
+        enqueue=enqueue,
+        wait=wait,
+        worker_name=worker_name,
+        lease=lease,
+        max_attempts=max_attempts,
+        poll_interval=poll_interval,
+        jobs=jobs,
+        single_pass=single_pass,
+        batch_size=batch_size,
+        copy_load=copy_load,
+        use_async=use_async,
+    )
+
+
+@db_app.command(name="upgrade")
+def db_upgrade():
+    """Create the database schema or upgrade it to the version of the application"""
+    cli_command = CLICommand()
+    command = cli_command.create_command("db_upgrade")
+    cli_command.handle_command(command)
+
+
 @app.callback()
 def main(
     version: Optional[bool] = typer.Option(
@@ -10,6 +10,8 @@ from typing import Type
 from gitlab_monitor.controller.controller import ArchiveProjectCommand
 from gitlab_monitor.controller.controller import GetProjectCommand
 from gitlab_monitor.controller.controller import GetProjectsCommand
+from gitlab_monitor.controller.controller import UpgradeDatabaseCommand
+from gitlab_monitor.controller.controller import WorkerCommand
 
 
 class CommandMapper:
@@ -48,3 +50,5 @@ class CommandMapper:
 CommandMapper.register("scan_projects", GetProjectsCommand)
 CommandMapper.register("scan_project", GetProjectCommand)
 CommandMapper.register("archive_project", ArchiveProjectCommand)
+CommandMapper.register("db_upgrade", UpgradeDatabaseCommand)
+CommandMapper.register("worker", WorkerCommand)
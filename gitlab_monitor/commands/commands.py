@@ -30,7 +30,10 @@ class CLICommand:
         :type command_class: Type
         """
         command_instance = command_class(kwargs)
-        if kwargs:
-            command_instance.execute(kwargs)
-        else:
-            command_instance.execute()
+        try:
+            if kwargs:
+                command_instance.execute(kwargs)
+            else:
+                command_instance.execute()
+        finally:
+            command_instance.close()
@@ -12,27 +12,77 @@ too few public methods raised by pylint.
 
 import json
 import os
+import socket
+import sys
+import threading
+import time
 from abc import ABC
 from abc import abstractmethod
+from collections import deque
+from collections.abc import Callable
+from collections.abc import Iterable
+from collections.abc import Iterator
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
 from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+from itertools import chain
+from pathlib import Path
+from textwrap import indent
+from typing import Optional
 
 from dotenv import load_dotenv
 from gitlab.base import RESTObject
+from gitlab.exceptions import GitlabError
+from requests.exceptions import RequestException
+from sqlalchemy.orm import Session
 
+from gitlab_monitor.exc import LeaseLostError
 from gitlab_monitor.logger.logger import logger
+from gitlab_monitor.services.async_gitlab import BridgedGitlabAPIService
 from gitlab_monitor.services.bdd.bdd import Database
+from gitlab_monitor.services.bdd.checkpoint_repository import Checkpoint
+from gitlab_monitor.services.bdd.checkpoint_repository import (
+    SQLAlchemyCheckpointRepository,
+)
 from gitlab_monitor.services.bdd.commit_repository import (
     SQLAlchemyCommitRepository,
 )
 from gitlab_monitor.services.bdd.project_repository import (
     SQLAlchemyProjectRepository,
 )
+from gitlab_monitor.services.bdd.repository import DEFAULT_BATCH_SIZE
+from gitlab_monitor.services.bdd.scan_task_repository import DEFAULT_LEASE
+from gitlab_monitor.services.bdd.scan_task_repository import (
+    DEFAULT_MAX_ATTEMPTS,
+)
+from gitlab_monitor.services.bdd.scan_task_repository import (
+    DEFAULT_POLL_INTERVAL,
+)
+from gitlab_monitor.services.bdd.scan_task_repository import (
+    SQLAlchemyScanTaskRepository,
+)
+from gitlab_monitor.services.bdd.watermark_repository import (
+    DEFAULT_MAX_SYNC_AGE,
+)
+from gitlab_monitor.services.bdd.watermark_repository import (
+    SQLAlchemyWatermarkRepository,
+)
 from gitlab_monitor.services.call_gitlab import GitlabAPIService
+from gitlab_monitor.services.call_gitlab import ScanStrategy
 from gitlab_monitor.services.dto import CommitDTO
+from gitlab_monitor.services.dto import CommitsScanDTO
 from gitlab_monitor.services.dto import ProjectDTO
+from gitlab_monitor.services.filters import ProjectFilter
+from gitlab_monitor.services.journal import ProjectJournal
 from gitlab_monitor.services.mapper import Mapper
+from gitlab_monitor.services.pipeline import stage
 from gitlab_monitor.services.pretty_print import PrintCommitDTO
+from gitlab_monitor.services.pretty_print import PrintCommitsScanDTO
 from gitlab_monitor.services.pretty_print import PrintProjectDTO
+from gitlab_monitor.services.utils import batched
 
 
 class Command(ABC):  # pylint: disable=too-few-public-methods
@@ -42,9 +92,14 @@ class Command(ABC):  # pylint: disable=too-few-public-methods
     :type ABC: class
     """
 
-    def __init__(self, kwargs) -> None:
+    def __init__(
+        self, kwargs, gitlab_service: Optional[GitlabAPIService] = None
+    ) -> None:
         """Constructor of the Command class.
 
+        :param gitlab_service: GitLab client shared with another command, defaults
+            to None to create one
+        :type gitlab_service: Optional[GitlabAPIService], optional
         :raises ValueError: Handle error from the environment variables.
         """
         load_dotenv()
@@ -60,9 +115,21 @@ class Command(ABC):  # pylint: disable=too-few-public-methods
 
         # instanciate all fields that represente global options
         self._no_db = False
+        self._options = kwargs
         self._global_options(kwargs)
 
-        self.gitlab_service = GitlabAPIService(url, self.private_token, ssl_cert_path)
+        self.gitlab_url = url
+        if gitlab_service is None:
+            service_class = (
+                BridgedGitlabAPIService if self._use_async else GitlabAPIService
+            )
+            gitlab_service = service_class(
+                url,
+                self.private_token,
+                ssl_cert_path,
+                pool_size=self._jobs * self._workers,
+            )
+        self.gitlab_service = gitlab_service
         if not self._no_db:
             self.db = Database()
             self.db._session = self.db._initialize_database()
@@ -70,18 +137,66 @@ class Command(ABC):  # pylint: disable=too-few-public-methods
                 raise ValueError(
                     "Session is None, database is not initialized correctly"
                 )
-            self.project_repository = SQLAlchemyProjectRepository(self.db._session)
-            self.commit_repository = SQLAlchemyCommitRepository(self.db._session)
+            self._init_repositories(self.db._session)
+
+    def _init_repositories(self, session: Session) -> None:
+        """Create the repositories used by the commands.
+
+        :param session: database session of the repositories.
+        :type session: Session
+        """
+        self.project_repository = SQLAlchemyProjectRepository(session)
+        self.commit_repository = SQLAlchemyCommitRepository(session)
+        self.watermark_repository = SQLAlchemyWatermarkRepository(session)
+        self.checkpoint_repository = SQLAlchemyCheckpointRepository(session)
 
     @abstractmethod
     def execute(self, kwargs):
         """Define the method execute that will be implemented in the child classes."""
 
+    def close(self) -> None:
+        """Close the connections to the GitLab instance."""
+        self.gitlab_service.close()
+
     def _global_options(self, kwargs):
         """Method used to retrieve global options (options that can be used with all
         commands) from the command line."""
         self._no_db = kwargs.get("no_db")
         self._save_in_file = kwargs.get("save_in_file")
+        self._jobs = kwargs.get("jobs") or 1
+        self._single_pass = kwargs.get("single_pass")
+        self._full_scan = kwargs.get("full_scan")
+        self._full_commit_scan = kwargs.get("full_commit_scan")
+        self._batch_size = kwargs.get("batch_size") or DEFAULT_BATCH_SIZE
+        self._copy_load = kwargs.get("copy_load")
+        self._resume = kwargs.get("resume")
+        self._use_async = kwargs.get("use_async")
+        self._workers = kwargs.get("workers") or 1
+        self._scan_commits = kwargs.get("commits")
+
+    def _get_checkpoint(self, scope: str, params: dict) -> Optional[Checkpoint]:
+        """Get the checkpoint from which a scan resumes.
+
+        :param scope: what the scan retrieves.
+        :type scope: str
+        :param params: parameters of the scan, which must be the ones of the
+            interrupted scan.
+        :type params: dict
+        :return: the checkpoint, None if the scan must start from the beginning.
+        :rtype: Optional[Checkpoint]
+        """
+        checkpoint = self.checkpoint_repository.get(scope)
+        if checkpoint is None:
+            logger.info("No scan of %s to resume, starting from the beginning.", scope)
+            return None
+        if checkpoint.context.get("params") != params:
+            logger.warning(
+                "The scan of %s to resume had other options, starting from the \
+beginning.",
+                scope,
+            )
+            return None
+        return checkpoint
 
 
 class GetProjectsCommand(Command):  # pylint: disable=too-few-public-methods
@@ -92,68 +207,243 @@ class GetProjectsCommand(Command):  # pylint: disable=too-few-public-methods
     """
 
     def execute(self, kwargs):
-        """Execute the command scan-projects."""
+        """Execute the command scan-projects.
+
+        Projects are streamed from the API to the output: each page retrieved is
+        mapped, filtered and written before the next one is requested. The filters
+        the API can apply are sent with the request.
+
+        When all the projects are saved in the database, only the projects updated
+        since the last scan are retrieved, unless a full scan is asked.
+
+        When the projects are saved in the database with the full strategy, the id of
+        the last project saved, or its update date when only the projects updated
+        since the last scan are retrieved, is checkpointed after each batch, and
+        `--resume` continues the scan after it.
+
+        With `--commits`, the commits of each batch of projects saved are retrieved
+        by `--workers` threads while the next projects are retrieved, and a summary
+        of the throughput of each project is printed at the end.
+        """
 
         unused_since = kwargs.get("unused_since")
+        project_filter = ProjectFilter(
+            visibility=kwargs.get("visibility"),
+            namespace=kwargs.get("namespace"),
+            archived=kwargs.get("archived"),
+            search=kwargs.get("search"),
+            active_since=kwargs.get("active_since"),
+            unused_since=unused_since,
+        )
 
-        projects = self.gitlab_service.scan_projects()
-        projects_dto = []
-        for project in projects:
-            if (
-                not unused_since
-                or datetime.fromisoformat(project.updated_at).replace(tzinfo=None)
-                < unused_since
-            ):
-                project_dto = Mapper().project_from_gitlab_api(project)
-                projects_dto.append(project_dto)
+        strategy = kwargs.get("strategy") or ScanStrategy.FULL
+
+        synced_at = datetime.now(timezone.utc)
+        updated_after = None
+        if not (
+            self._no_db
+            or self._save_in_file
+            or self._full_scan
+            or not project_filter.is_empty()
+        ):
+            updated_after = self.watermark_repository.get_projects_watermark(
+                self.gitlab_url
+            )
+
+        checkpointed = not (self._no_db or self._save_in_file) and (
+            strategy is ScanStrategy.FULL
+        )
+        scope = f"projects:{self.gitlab_url}"
+        params = json.loads(
+            json.dumps(
+                {"filter": asdict(project_filter), "updated_after": updated_after},
+                default=str,
+            )
+        )
+        id_after = None
+        updated_ids = None
+        scan_updated_after = updated_after
+        if checkpointed and self._resume:
+            checkpoint = self._get_checkpoint(scope, params)
+            if checkpoint and updated_after:
+                scan_updated_after = datetime.fromisoformat(checkpoint.cursor)
+                updated_ids = checkpoint.context.get("updated_ids")
+                synced_at = checkpoint.started_at
+            elif checkpoint:
+                id_after = int(checkpoint.cursor)
+                synced_at = checkpoint.started_at
+
+        projects = self.gitlab_service.scan_projects(
+            updated_after=scan_updated_after,
+            project_filter=project_filter,
+            strategy=strategy,
+            jobs=self._jobs,
+            id_after=id_after,
+            updated_ids=updated_ids,
+        )
+        # Projects saved in the database whose commits are still to be scanned.
+        scanned: Optional[dict[int, RESTObject]] = {} if self._scan_commits else None
+        projects_dto = self._map_projects(projects, project_filter, scanned)
 
         if self._save_in_file:
-            with open(
-                f"saved_datas/projects/{self._save_in_file}.json", "w", encoding="utf-8"
-            ) as file:
-                json.dump(
-                    [project.__dict__ for project in projects_dto],
-                    file,
-                    indent=4,
-                    default=str,
-                )
+            count = self._dump_projects(projects_dto)
             logger.info(
                 "%s Projects have been retrieved and saved in the file \
                     saved_datas/projects/%s.json.",
-                len(projects_dto),
+                count,
                 self._save_in_file,
             )
 
         elif self._no_db:
-            PrintProjectDTO().print_dto_list(projects_dto, "Projects")
+            count = PrintProjectDTO().print_dto_list(projects_dto, "Projects")
             if unused_since:
                 logger.info(
                     "%s projects have not been updated since %s.",
-                    len(projects_dto),
+                    count,
                     unused_since,
                 )
 
         else:
+            commits_scan = (
+                CommitsScan(self, self._workers) if scanned is not None else None
+            )
+
+            def on_batch(batch: list[ProjectDTO]) -> None:
+                if checkpointed and updated_after:
+                    # The projects are sorted by update date, then by id.
+                    last_updated_at = batch[-1].updated_at
+                    self.checkpoint_repository.save(
+                        scope,
+                        Checkpoint(
+                            cursor=last_updated_at.isoformat(),
+                            started_at=synced_at,
+                            context={
+                                "params": params,
+                                "updated_ids": [
+                                    project_dto.project_id
+                                    for project_dto in batch
+                                    if project_dto.updated_at == last_updated_at
+                                ],
+                            },
+                        ),
+                    )
+                elif checkpointed:
+                    self.checkpoint_repository.save(
+                        scope,
+                        Checkpoint(
+                            cursor=str(batch[-1].project_id),
+                            started_at=synced_at,
+                            context={"params": params},
+                        ),
+                    )
+                if commits_scan is not None and scanned is not None:
+                    for project_dto in batch:
+                        project = scanned.pop(project_dto.project_id, None)
+                        if project is not None:
+                            commits_scan.submit(project)
+
+            if commits_scan is None:
+                count = self._save_projects(projects_dto, on_batch)
+            else:
+                with commits_scan:
+                    count = self._save_projects(projects_dto, on_batch)
+                    commits_scan.join()
+                commits_scan.print_summary()
+            if checkpointed:
+                self.checkpoint_repository.delete(scope)
             if unused_since:
                 logger.info(
-                    "\n%s projects have not been updated since %s.",
-                    len(projects_dto),
+                    "%s projects have not been updated since %s.",
+                    count,
                     unused_since,
                 )
-            self._save_projects(projects_dto)
+            if commits_scan is not None and commits_scan.failed:
+                logger.warning(
+                    "The commits of %d projects could not be retrieved, they will be \
+retrieved again by the next scan.",
+                    commits_scan.failed,
+                )
+            elif project_filter.is_empty():
+                # Every project updated before the scan started is now saved.
+                self.watermark_repository.set_projects_watermark(
+                    self.gitlab_url, synced_at
+                )
 
-    def _save_projects(self, projects_dto: list[ProjectDTO]) -> None:
-        """Save projects in DB.
+    def _map_projects(
+        self,
+        projects: Iterable[RESTObject],
+        project_filter: ProjectFilter,
+        scanned: Optional[dict[int, RESTObject]] = None,
+    ) -> Iterator[ProjectDTO]:
+        """Lazily filter the projects from the API and transform them into DTOs.
 
-        :param projects_dto: list of projects to save
-        :type projects_dto: list[ProjectDTO]
+        :param projects: projects retrieved from the API.
+        :type projects: Iterable[RESTObject]
+        :param project_filter: criteria of the projects to keep.
+        :type project_filter: ProjectFilter
+        :param scanned: filled with the projects kept, by id, defaults to None
+        :type scanned: Optional[dict[int, RESTObject]], optional
+        :return: the projects kept, in DTO format.
+        :rtype: Iterator[ProjectDTO]
         """
-        for project_dto in projects_dto:
-            self.project_repository.create(project_dto)
+        for project in projects:
+            if project_filter.matches(project):
+                if scanned is not None:
+                    scanned[project.id] = project
+                yield Mapper().project_from_gitlab_api(project)
+
+    def _dump_projects(self, projects_dto: Iterable[ProjectDTO]) -> int:
+        """Write projects in a json file, one project at a time.
+
+        The file content is the same as a `json.dump` of the whole list.
+
+        :param projects_dto: projects to write.
+        :type projects_dto: Iterable[ProjectDTO]
+        :return: number of projects written.
+        :rtype: int
+        """
+        count = 0
+        with open(
+            f"saved_datas/projects/{self._save_in_file}.json", "w", encoding="utf-8"
+        ) as file:
+            file.write("[")
+            for project_dto in projects_dto:
+                file.write(",\n" if count else "\n")
+                file.write(
+                    indent(
+                        json.dumps(project_dto.__dict__, indent=4, default=str), " " * 4
+                    )
+                )
+                count += 1
+            file.write("\n]" if count else "]")
+        return count
+
+    def _save_projects(
+        self,
+        projects_dto: Iterable[ProjectDTO],
+        on_batch: Optional[Callable[[list[ProjectDTO]], None]] = None,
+    ) -> int:
+        """Save projects in DB, by batches of `batch_size` projects.
+
+        :param projects_dto: projects to save
+        :type projects_dto: Iterable[ProjectDTO]
+        :param on_batch: called with each batch once it is saved, defaults to None
+        :type on_batch: Optional[Callable[[list[ProjectDTO]], None]], optional
+        :return: number of projects saved.
+        :rtype: int
+        """
+        result = self.project_repository.upsert_many(
+            projects_dto, self._batch_size, on_batch=on_batch
+        )
         logger.info(
-            "%d projects have been retrieved and saved or updated in the database.",
-            len(projects_dto),
+            "%d projects have been retrieved: %d saved, %d updated and %d unchanged \
+in the database.",
+            result.total,
+            result.inserted,
+            result.updated,
+            result.unchanged,
         )
+        return result.total
 
 
 class GetProjectCommand(Command):  # pylint: disable=too-few-public-methods
@@ -210,49 +500,359 @@ class GetProjectCommand(Command):  # pylint: disable=too-few-public-methods
             dto_project.name,
         )
 
-    def _get_commits(self, project_restobject_data: RESTObject) -> None:
+    def _get_commits(self, project_restobject_data: RESTObject) -> int:
         """Retrieve commits from a project and transform them into DTOs.
 
+        The commits are processed from the newest to the oldest, the order of the
+        commits list. When they are saved in the database, the commit date of the
+        last commit saved is checkpointed after each batch, and `--resume` only
+        retrieves the commits until this date.
+
+        The pages of the commits list are requested, the details of the commits
+        retrieved by up to `jobs` threads and the commits mapped to DTOs in a
+        thread, at most one batch ahead of the database, which writes them by
+        batches. In single pass mode, the list holds all the data saved: its pages
+        are requested while the database writes the commits. A resumed scan
+        retrieves the rest of the list whole and sorts it by commit date, so that
+        the commits before the checkpoint are not retrieved again.
+
         :param project_id: id of the project from which we retrieve the commits.
         :type project_id: int
         :param project_restobject_data: project from which we retrieve the commits.
         :type project_restobject_data: RESTObject
+        :return: number of commits retrieved.
+        :rtype: int
         """
-        project_commits: list[RESTObject] = self.gitlab_service.get_project_commit(
-            project_restobject_data
-        )
+        since = None
+        if not (self._no_db or self._full_commit_scan):
+            since = self._get_commits_since(project_restobject_data)
 
-        if project_commits:
-            dto_commits_list = []
-            for commit in project_commits:
-                commit_details = self.gitlab_service.get_commit_details(
-                    project_restobject_data, commit.id
+        scope = f"commits:{project_restobject_data.id}"
+        params = {
+            "since": since.isoformat() if since else None,
+            "single_pass": bool(self._single_pass),
+        }
+        checkpoint = None
+        if self._resume and not self._no_db:
+            checkpoint = self._get_checkpoint(scope, params)
+
+        project_commits: Iterator[RESTObject]
+        if checkpoint:
+            project_commits = iter(
+                sorted(
+                    self.gitlab_service.get_project_commit(
+                        project_restobject_data,
+                        since=since,
+                        until=datetime.fromisoformat(checkpoint.cursor),
+                    ),
+                    key=lambda commit: datetime.fromisoformat(commit.committed_date),
+                    reverse=True,
                 )
-                dto_commits_list.append(
-                    Mapper().commit_from_gitlab_api(commit, commit_details)
+            )
+        else:
+            project_commits = iter(
+                self.gitlab_service.get_project_commit(
+                    project_restobject_data, since=since
                 )
+            )
+
+        first_commit = next(project_commits, None)
+        if first_commit is not None:
+            project_commits = chain([first_commit], project_commits)
             if self._no_db:
+                dto_commits_list = list(
+                    self._map_commits(project_commits, project_restobject_data)
+                )
                 PrintCommitDTO().print_dto_list(dto_commits_list, "Commits")
+                return len(dto_commits_list)
             else:
-                self._save_commits(dto_commits_list, project_restobject_data)
+                # The newest commit of an interrupted scan is not retrieved again.
+                newest_commit = (
+                    checkpoint.context["newest_commit"]
+                    if checkpoint
+                    else [first_commit.id, first_commit.committed_date]
+                )
+                # Commit dates of the commits listed and not checkpointed yet, in
+                # the order of the list.
+                committed_dates: deque[tuple[str, str]] = deque()
+
+                def listed_commits() -> Iterator[RESTObject]:
+                    for commit in project_commits:
+                        committed_dates.append((commit.id, commit.committed_date))
+                        yield commit
+
+                def save_checkpoint(batch: list[CommitDTO]) -> None:
+                    commit_id, committed_date = committed_dates.popleft()
+                    while commit_id != batch[-1].commit_id:
+                        commit_id, committed_date = committed_dates.popleft()
+                    self.checkpoint_repository.save(
+                        scope,
+                        Checkpoint(
+                            cursor=committed_date,
+                            started_at=datetime.now(timezone.utc),
+                            context={"params": params, "newest_commit": newest_commit},
+                        ),
+                    )
+                    self._on_commits_batch(project_restobject_data)
+
+                dto_commits = self._map_commits(
+                    listed_commits(), project_restobject_data
+                )
+                if not (self._single_pass and checkpoint):
+                    # The list is retrieved, and the details retrieved and mapped,
+                    # while the database writes the previous batch, one batch ahead
+                    # at most. A resumed single pass scan has nothing to retrieve.
+                    dto_commits = stage(dto_commits, self._batch_size)
+                count = self._save_commits(
+                    dto_commits, project_restobject_data, on_batch=save_checkpoint
+                )
+                self.watermark_repository.set_commits_watermark(
+                    project_restobject_data.id,
+                    newest_commit[0],
+                    datetime.fromisoformat(newest_commit[1]),
+                )
+                self.checkpoint_repository.delete(scope)
+                return count
+        return 0
+
+    def _on_commits_batch(self, project_restobject_data: RESTObject) -> None:
+        """Called once each batch of commits is saved and checkpointed.
+
+        :param project_restobject_data: project from which we retrieve the commits.
+        :type project_restobject_data: RESTObject
+        """
+
+    def _map_commits(
+        self,
+        project_commits: Iterable[RESTObject],
+        project_restobject_data: RESTObject,
+    ) -> Iterator[CommitDTO]:
+        """Lazily transform the commits of a project into DTOs, requesting their
+        details unless in single pass mode.
+
+        The details are requested by batches of the commits list, so that one batch
+        of the list at most is held in memory.
+
+        :param project_commits: commits from the commits list of the API.
+        :type project_commits: Iterable[RESTObject]
+        :param project_restobject_data: project from which we retrieve the commits.
+        :type project_restobject_data: RESTObject
+        :return: the commits, in DTO format, in the same order.
+        :rtype: Iterator[CommitDTO]
+        """
+        if self._single_pass:
+            for commit in project_commits:
+                yield Mapper().commit_from_gitlab_api_list(
+                    commit, project_restobject_data.id
+                )
+            return
+        for commits in batched(project_commits, self._batch_size):
+            commits_details = self.gitlab_service.get_commits_details(
+                project_restobject_data,
+                [commit.id for commit in commits],
+                self._jobs,
+            )
+            for commit, commit_details in zip(commits, commits_details):
+                yield Mapper().commit_from_gitlab_api(commit, commit_details)
+
+    def _get_commits_since(
+        self, project_restobject_data: RESTObject
+    ) -> Optional[datetime]:
+        """Get the date from which the commits of a project must be retrieved.
+
+        It is the commit date of the newest commit saved, if this commit is still
+        in a branch of the project. Otherwise the history has been rewritten and
+        all the commits must be retrieved again.
+
+        :param project_restobject_data: project from which we retrieve the commits.
+        :type project_restobject_data: RESTObject
+        :return: the date of the newest commit saved, None to retrieve all commits.
+        :rtype: Optional[datetime]
+        """
+        watermark = self.watermark_repository.get_commits_watermark(
+            project_restobject_data.id
+        )
+        if not watermark:
+            return None
+        last_commit_id, last_committed_at = watermark
+        if not self.gitlab_service.is_commit_in_branches(
+            project_restobject_data, last_commit_id
+        ):
+            logger.info(
+                "Commit %s of project %s is no longer in a branch, \
+retrieving all the commits again.",
+                last_commit_id,
+                project_restobject_data.name,
+            )
+            return None
+        return last_committed_at
 
     def _save_commits(
-        self, dto_commits_list: list[CommitDTO], project_restobject_data: RESTObject
-    ) -> None:
+        self,
+        dto_commits: Iterable[CommitDTO],
+        project_restobject_data: RESTObject,
+        on_batch: Optional[Callable[[list[CommitDTO]], None]] = None,
+    ) -> int:
         """Save commits in DB.
 
-        :param dto_commits_list: list of commits to save
-        :type dto_commits_list: list[CommitDTO]
+        The commits already saved are skipped without any request, using the index
+        of the commits of the project: a commit id identifies its content.
+
+        :param dto_commits: commits to save
+        :type dto_commits: Iterable[CommitDTO]
         :param project_restobject_data: project from which we retrieve the commits.
         :type project_restobject_data: RESTObject
+        :param on_batch: called with each batch once it is saved, defaults to None
+        :type on_batch: Optional[Callable[[list[CommitDTO]], None]], optional
+        :return: number of commits retrieved.
+        :rtype: int
         """
-        for dto_commit in dto_commits_list:
-            self.commit_repository.create(dto_commit)
+        known_commits = self.commit_repository.load_identity_index(
+            project_restobject_data.id
+        )
+        retrieved = known = 0
+
+        def new_commits() -> Iterator[CommitDTO]:
+            nonlocal retrieved, known
+            for dto_commit in dto_commits:
+                retrieved += 1
+                if known_commits is not None and dto_commit.commit_id in known_commits:
+                    known += 1
+                else:
+                    yield dto_commit
+
+        if self._copy_load:
+            result = self.commit_repository.copy_many(new_commits(), on_batch=on_batch)
+        else:
+            result = self.commit_repository.upsert_many(
+                new_commits(), self._batch_size, on_batch=on_batch
+            )
         logger.info(
-            '%d commits from project "%s" have been retrieved and saved or updated \
-in the database.',
-            len(dto_commits_list),
+            '%d commits from project "%s" have been retrieved: %d saved, %d updated \
+and %d unchanged in the database.',
+            retrieved,
             project_restobject_data.name,
+            result.inserted,
+            result.updated,
+            result.unchanged + known,
+        )
+        return retrieved
+
+
+class CommitsScan:
+    """Scan of the commits of many projects, with up to `workers` projects scanned
+    concurrently.
+
+    Each thread scans its projects with its own scan-project command, built with
+    the options and the GitLab client of the command of the scan, with its own
+    database session from the shared connection pool.
+    """
+
+    def __init__(self, command: Command, workers: int) -> None:
+        """Constructor of the CommitsScan class.
+
+        :param command: command whose GitLab client and options are used.
+        :type command: Command
+        :param workers: number of projects scanned concurrently.
+        :type workers: int
+        """
+        self._command = command
+        self._workers = workers
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._pending: deque[Future] = deque()
+        self._local = threading.local()
+        self._scanners: list[GetProjectCommand] = []
+        self._lock = threading.Lock()
+        self._started_at = time.monotonic()
+        self.results: list[CommitsScanDTO] = []
+
+    @property
+    def failed(self) -> int:
+        """Number of projects whose commits could not be retrieved."""
+        return sum(1 for result in self.results if result.failed)
+
+    def __enter__(self) -> "CommitsScan":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        """Stop the threads, without scanning the projects still queued if the scan
+        was interrupted, and close their database sessions."""
+        self._executor.shutdown(wait=True, cancel_futures=exc_type is not None)
+        for scanner in self._scanners:
+            scanner.db._session.close()  # pylint: disable=protected-access
+
+    def submit(self, project: RESTObject) -> None:
+        """Queue the scan of the commits of a project.
+
+        The caller waits while twice as many projects as workers are queued, so that
+        the projects wait in the queue rather than in memory.
+
+        :param project: project whose commits are retrieved.
+        :type project: RESTObject
+        """
+        while len(self._pending) >= 2 * self._workers:
+            self.results.append(self._pending.popleft().result())
+        self._pending.append(self._executor.submit(self._scan, project))
+
+    def join(self) -> None:
+        """Wait for the end of the scan of all the projects queued."""
+        while self._pending:
+            self.results.append(self._pending.popleft().result())
+
+    def print_summary(self) -> None:
+        """Print the number of commits retrieved and the throughput of each
+        project."""
+        PrintCommitsScanDTO().print_summary(
+            self.results, time.monotonic() - self._started_at
+        )
+
+    def _scanner(self) -> GetProjectCommand:
+        """Get the scan-project command of the current thread, create it on first
+        call.
+
+        :return: the command of the thread.
+        :rtype: GetProjectCommand
+        """
+        scanner = getattr(self._local, "scanner", None)
+        if scanner is None:
+            scanner = GetProjectCommand(
+                # pylint: disable=protected-access
+                self._command._options,
+                gitlab_service=self._command.gitlab_service,
+            )
+            self._local.scanner = scanner
+            with self._lock:
+                self._scanners.append(scanner)
+        return scanner
+
+    def _scan(self, project: RESTObject) -> CommitsScanDTO:
+        """Retrieve and save the commits of a project.
+
+        A failure, including a network error, is logged and reported in the
+        summary, without stopping the scan of the other projects.
+
+        :param project: project whose commits are retrieved.
+        :type project: RESTObject
+        :return: the outcome of the scan of the project.
+        :rtype: CommitsScanDTO
+        """
+        scanner = self._scanner()
+        started_at = time.monotonic()
+        try:
+            # pylint: disable=protected-access
+            commits = scanner._get_commits(project)
+        except (SystemExit, RequestException, GitlabError) as e:
+            if not isinstance(e, SystemExit):
+                logger.debug(e)
+            scanner.db._session.rollback()  # pylint: disable=protected-access
+            logger.error(
+                "The commits of project %s could not be retrieved.", project.name
+            )
+            return CommitsScanDTO(
+                project.id, project.name, 0, time.monotonic() - started_at, failed=True
+            )
+        return CommitsScanDTO(
+            project.id, project.name, commits, time.monotonic() - started_at
         )
 
 
@@ -266,23 +866,284 @@ class ArchiveProjectCommand(Command):  # pylint: disable=too-few-public-methods
     def execute(self, kwargs):
         """Execute the command archive-project [PROJECT].
 
+        The projects are archived by their id, without being requested first. The
+        projects of a json file, or the projects saved in the database without any
+        activity since the `--unused-since` date, are archived concurrently, and
+        the outcome of each one is recorded in a journal: the projects already
+        archived according to the journal are skipped when the command is run again.
+
+        The projects are only selected in the database if they were scanned less
+        than `--max-sync-age` hours ago, otherwise a project active since the last
+        scan could be archived.
+
         :param project: project(s) to archive. Can be the path to a json file that \
             contain one or more projects or just an ID.
         """
 
         # Retrieve arguments from the command line
         project = kwargs.get("project")
+        unused_since = kwargs.get("unused_since")
+        dry_run = kwargs.get("dry_run")
+
+        if unused_since:
+            max_sync_age = kwargs.get("max_sync_age")
+            self._check_projects_synced(
+                DEFAULT_MAX_SYNC_AGE if max_sync_age is None else max_sync_age,
+                dry_run,
+            )
+            projects_dto = self.project_repository.find_unused_since(
+                unused_since,
+                namespace=kwargs.get("namespace"),
+                visibility=kwargs.get("visibility"),
+            )
+            logger.info(
+                "%d projects saved in the database have not been active since %s.",
+                len(projects_dto),
+                unused_since,
+            )
+            journal_path = (
+                kwargs.get("journal")
+                or f"saved_datas/archive/unused-since-{unused_since:%Y-%m-%d}.jsonl"
+            )
+            if dry_run:
+                PrintProjectDTO().print_dto_list(projects_dto, "Projects to archive")
+            self._archive_projects(
+                [dto.project_id for dto in projects_dto], journal_path, dry_run
+            )
+
+        elif project.isdigit():
+            if dry_run:
+                logger.info("Project id %s would be archived.", project)
+                return
+            self.gitlab_service.archive_project(
+                self.gitlab_service.get_project_handle(int(project))
+            )
 
-        if project.isdigit():
-            # Retrieve the project from the API
-            project_from_gitlab_api = self.gitlab_service.get_project_by_id(project)
-            self.gitlab_service.archive_project(project_from_gitlab_api)
         else:
             # Retrieve the project(s) from the json file
             with open(project, "r", encoding="utf-8") as file:
                 projects = json.load(file)
-                for project in projects:
-                    project_from_gitlab_api = self.gitlab_service.get_project_by_id(
-                        project["project_id"]
+            journal_path = kwargs.get("journal") or str(
+                Path(project).with_suffix(".archive.jsonl")
+            )
+            self._archive_projects(
+                [int(project["project_id"]) for project in projects],
+                journal_path,
+                dry_run,
+            )
+
+    def _check_projects_synced(self, max_sync_age: float, dry_run: bool) -> None:
+        """Stop, or only warn in dry run mode, if the projects saved in the database
+        were not scanned recently.
+
+        :param max_sync_age: maximum age, in hours, of the last scan of the
+            projects.
+        :type max_sync_age: float
+        :param dry_run: only warn instead of stopping.
+        :type dry_run: bool
+        """
+        synced_at = self.watermark_repository.get_projects_watermark(self.gitlab_url)
+        if synced_at is not None and datetime.now(
+            timezone.utc
+        ) - synced_at <= timedelta(hours=max_sync_age):
+            return
+        if synced_at is None:
+            reason = "were never scanned"
+        else:
+            reason = f"were last scanned on {synced_at:%Y-%m-%d %H:%M} UTC"
+        log = logger.warning if dry_run else logger.error
+        log(
+            "The projects of %s %s, their last activity date may be outdated: run \
+scan-projects first, or raise --max-sync-age.",
+            self.gitlab_url,
+            reason,
+        )
+        if not dry_run:
+            sys.exit(1)
+
+    def _archive_projects(
+        self, project_ids: list[int], journal_path: str, dry_run: bool = False
+    ) -> None:
+        """Archive projects concurrently, skipping the projects already archived
+        according to the journal, and record the outcome of each one in it.
+
+        :param project_ids: ids of the projects to archive.
+        :type project_ids: list[int]
+        :param journal_path: path of the journal of the archiving.
+        :type journal_path: str
+        :param dry_run: only log the projects which would be archived, defaults to
+            False
+        :type dry_run: bool, optional
+        """
+        journal = ProjectJournal(journal_path, "archive")
+        archived = journal.done_ids()
+        unique_ids = list(dict.fromkeys(project_ids))
+        project_ids = [
+            project_id for project_id in unique_ids if project_id not in archived
+        ]
+        skipped = len(unique_ids) - len(project_ids)
+        if skipped:
+            logger.info(
+                "%d projects already archived according to %s are skipped.",
+                skipped,
+                journal.path,
+            )
+        if dry_run:
+            logger.info(
+                "%d projects would be archived: %s",
+                len(project_ids),
+                ", ".join(str(project_id) for project_id in project_ids),
+            )
+            return
+
+        logger.info("Archiving %d projects...", len(project_ids))
+        failed = 0
+        with journal:
+            for project_id, error in self.gitlab_service.archive_projects(
+                project_ids, self._jobs
+            ):
+                journal.record(project_id, error)
+                if error:
+                    failed += 1
+                    logger.error(
+                        "Error when archiving project id %s: %s", project_id, error
+                    )
+        logger.info(
+            "%d projects have been archived, %d failed and %d skipped. The results \
+are recorded in %s.",
+            len(project_ids) - failed,
+            failed,
+            skipped,
+            journal.path,
+        )
+        if failed:
+            sys.exit(1)
+
+
+class WorkerCommand(GetProjectCommand):  # pylint: disable=too-few-public-methods
+    """Class of the command worker: scan the projects of the queue shared with the
+    other workers, with their commits.
+
+    :param GetProjectCommand: Class of the command scan-project.
+    :type GetProjectCommand: class
+    """
+
+    def __init__(self, kwargs) -> None:
+        """Constructor of the WorkerCommand class."""
+        super().__init__(kwargs)
+        self.scan_task_repository = SQLAlchemyScanTaskRepository(self.db._session)
+        # A task attempted again resumes the scan of the commits of its project.
+        self._resume = True
+        self._worker = ""
+        self._lease = timedelta(seconds=DEFAULT_LEASE)
+
+    def execute(self, kwargs):
+        """Execute the command worker.
+
+        Before each claim, the tasks whose lease has expired are queued again, so
+        that any worker recovers the tasks of a stopped one. The lease of the task
+        being scanned is renewed after each batch of commits saved, and the scan is
+        stopped if the task has been queued again meanwhile.
+        """
+        worker = kwargs.get("worker_name") or f"{socket.gethostname()}:{os.getpid()}"
+        lease = timedelta(seconds=kwargs.get("lease") or DEFAULT_LEASE)
+        max_attempts = kwargs.get("max_attempts") or DEFAULT_MAX_ATTEMPTS
+        self._worker = worker
+        self._lease = lease
+
+        if kwargs.get("enqueue"):
+            count = self.scan_task_repository.enqueue_saved_projects()
+            logger.info("%d projects have been added to the scan queue.", count)
+
+        scanned = failed = lost = 0
+        while True:
+            requeued = self.scan_task_repository.requeue_expired(max_attempts)
+            if requeued:
+                logger.warning(
+                    "%d scan tasks whose lease has expired have been released.",
+                    requeued,
+                )
+            project_id = self.scan_task_repository.claim(worker, lease)
+            if project_id is None:
+                if not kwargs.get("wait"):
+                    break
+                time.sleep(kwargs.get("poll_interval") or DEFAULT_POLL_INTERVAL)
+                continue
+
+            try:
+                super().execute({"id": project_id, "get_commits": True})
+            except LeaseLostError as e:
+                self.db._session.rollback()
+                logger.warning(
+                    "%s The scan of worker %s is stopped.", e.message, worker
+                )
+                lost += 1
+            except (SystemExit, RequestException, GitlabError) as e:
+                if not isinstance(e, SystemExit):
+                    logger.debug(e)
+                self.scan_task_repository.fail(project_id, worker, max_attempts)
+                logger.error(
+                    "Worker %s failed to scan project id %s.", worker, project_id
+                )
+                failed += 1
+            else:
+                if not self.scan_task_repository.complete(project_id, worker):
+                    logger.warning(
+                        "The lease of worker %s on project id %s had expired.",
+                        worker,
+                        project_id,
                     )
-                    self.gitlab_service.archive_project(project_from_gitlab_api)
+                scanned += 1
+
+        logger.info(
+            "Worker %s has stopped: %d projects scanned, %d failed and %d lost. \
+Scan tasks by status: %s.",
+            worker,
+            scanned,
+            failed,
+            lost,
+            self.scan_task_repository.count_by_status(),
+        )
+
+    def _on_commits_batch(self, project_restobject_data: RESTObject) -> None:
+        """Renew the lease of the task of the project scanned.
+
+        :param project_restobject_data: project from which we retrieve the commits.
+        :type project_restobject_data: RESTObject
+        :raises LeaseLostError: Raised if the task is no longer held by the worker.
+        """
+        if not self.scan_task_repository.renew(
+            project_restobject_data.id, self._worker, self._lease
+        ):
+            raise LeaseLostError(project_restobject_data.id, self._worker)
+
+
+class UpgradeDatabaseCommand(Command):  # pylint: disable=too-few-public-methods
+    """Class of the command db upgrade.
+
+    :param Command: Interface for the commands.
+    :type Command: class
+    """
+
+    def __init__(self, kwargs) -> None:  # pylint: disable=super-init-not-called
+        """Constructor of the UpgradeDatabaseCommand class.
+
+        The upgrade only needs the database: neither the GitLab API nor the
+        repositories, which would require an up-to-date schema, are initialized.
+        """
+        self._global_options(kwargs)
+
+    def close(self) -> None:
+        """Nothing to close: the command doesn't connect to the GitLab instance."""
+
+    def execute(self, kwargs=None):
+        """Execute the command db upgrade."""
+        previous_version, version = Database.upgrade()
+        if previous_version == version:
+            logger.info("The database schema is already at version %s.", version)
+        else:
+            logger.info(
+                "The database schema has been upgraded from version %s to version %s.",
+                previous_version,
+                version,
+            )
@@ -52,3 +52,22 @@ class ProjectNotFoundError(GitlabMonitorError):
             "is expected to exist but cannot be located."
         )
         super().__init__(self.message)
+
+
+class LeaseLostError(GitlabMonitorError):
+    """Custom exception raised when a worker no longer holds its scan task."""
+
+    def __init__(self, project_id: int, worker: str):
+        """
+        Initialize the LeaseLostError with the project and the worker.
+
+        :param project_id: The ID of the project of the scan task.
+        :param worker: The name of the worker which claimed the scan task.
+        """
+        self.project_id = project_id
+        self.worker = worker
+        self.message = (
+            f"The lease of worker '{worker}' on the scan task of project "
+            f"'{project_id}' has expired, the task may be claimed by another worker."
+        )
+        super().__init__(self.message)
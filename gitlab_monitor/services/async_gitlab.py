@@ -0,0 +1,439 @@
+# # --- Copyright (c) 2024-2025 Linagora
+# # licence       : GPL v3
+# # - Flavien Perez fperez@linagora.com
+# # - Maïlys Jara mjara@linagora.com
+
+"""Asynchronous client of the list-heavy endpoints of the GitLab API.
+
+`AsyncGitlabAPIService` retrieves the projects, the commits and the commit details
+as async generators, with many requests in flight on a single thread, over HTTP/2
+when the instance supports it and kept-alive HTTP/1.1 connections otherwise. The
+objects returned are the python-gitlab objects of the synchronous service, so the
+mapper and the other requests use them unchanged.
+
+`BridgedGitlabAPIService` is the `GitlabAPIService` of the `--async` option: its
+list-heavy methods run on the asynchronous client, in an event loop thread, and
+the others are left to python-gitlab. Its `close` method, also called at the end
+of a with statement, closes the connections of both clients and stops the thread.
+"""
+
+import asyncio
+import ssl
+import sys
+import threading
+from collections import deque
+from collections.abc import AsyncGenerator
+from collections.abc import Iterable
+from collections.abc import Iterator
+from datetime import datetime
+from typing import Any
+from typing import Optional
+from typing import Union
+
+import gitlab
+import httpx
+from gitlab.base import RESTObject
+from gitlab.v4.objects import Project
+from gitlab.v4.objects import ProjectCommit
+
+from gitlab_monitor.logger.logger import logger
+from gitlab_monitor.services.call_gitlab import GitlabAPIService
+from gitlab_monitor.services.call_gitlab import ScanStrategy
+from gitlab_monitor.services.filters import ProjectFilter
+from gitlab_monitor.services.filters import is_unused_since
+from gitlab_monitor.services.rate_limiter import DEFAULT_RETRIES
+from gitlab_monitor.services.rate_limiter import RateLimiter
+from gitlab_monitor.services.rate_limiter import jittered_backoff
+from gitlab_monitor.services.rate_limiter import retry_after
+from gitlab_monitor.services.transport import CONNECT_TIMEOUT
+from gitlab_monitor.services.transport import DEFAULT_POOL_SIZE
+from gitlab_monitor.services.transport import READ_TIMEOUT
+from gitlab_monitor.services.transport import TRANSPORT_RETRIES
+
+
+# Number of elements per page of the lists.
+PER_PAGE = 100
+
+
+class AsyncGitlabAPIService:
+    """Service that calls the list-heavy endpoints of the GitLab API with asyncio."""
+
+    def __init__(
+        self,
+        gitlab_instance: gitlab.Gitlab,
+        rate_limiter: RateLimiter,
+        max_connections: int = DEFAULT_POOL_SIZE,
+    ) -> None:
+        """Constructor of the AsyncGitlabAPIService class.
+
+        :param gitlab_instance: GitLab instance of the synchronous service, whose
+            url, token and certificate are used, and to which the objects returned
+            are bound.
+        :type gitlab_instance: gitlab.Gitlab
+        :param rate_limiter: rate limiter shared with the synchronous service.
+        :type rate_limiter: RateLimiter
+        :param max_connections: maximum number of connections, defaults to
+            DEFAULT_POOL_SIZE
+        :type max_connections: int, optional
+        """
+        self._gitlab_instance = gitlab_instance
+        self._rate_limiter = rate_limiter
+        verify: Union[bool, ssl.SSLContext] = bool(gitlab_instance.ssl_verify)
+        if isinstance(gitlab_instance.ssl_verify, str):
+            verify = ssl.create_default_context(cafile=gitlab_instance.ssl_verify)
+        connections = max(max_connections, DEFAULT_POOL_SIZE)
+        self._client = httpx.AsyncClient(
+            base_url=gitlab_instance.api_url,
+            headers={"PRIVATE-TOKEN": gitlab_instance.private_token or ""},
+            timeout=httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+            transport=httpx.AsyncHTTPTransport(
+                verify=verify,
+                http2=True,
+                limits=httpx.Limits(
+                    max_connections=connections,
+                    max_keepalive_connections=connections,
+                ),
+                retries=TRANSPORT_RETRIES,
+            ),
+        )
+
+    async def aclose(self) -> None:
+        """Close the connections of the client."""
+        await self._client.aclose()
+
+    async def scan_projects(
+        self,
+        project_filter: Optional[ProjectFilter] = None,
+        strategy: ScanStrategy = ScanStrategy.FULL,
+        id_after: Optional[int] = None,
+    ) -> AsyncGenerator[Project, None]:
+        """Retrieve the projects of the GitLab instance, with the parameters of
+        `GitlabAPIService.scan_projects`.
+
+        The incremental scan, whose pages each depend on the previous one, is left
+        to the synchronous service.
+
+        :param project_filter: criteria sent to the API, defaults to None
+        :type project_filter: Optional[ProjectFilter], optional
+        :param strategy: full or sorted, defaults to ScanStrategy.FULL
+        :type strategy: ScanStrategy, optional
+        :param id_after: only retrieve the projects with a greater id, with the full
+            strategy, defaults to None
+        :type id_after: Optional[int], optional
+        :raises ValueError: Raised if the strategy is sharded, or sorted without
+            `unused_since` date.
+        :return: the projects.
+        :rtype: AsyncGenerator[Project, None]
+        """
+        params: dict[str, Any] = (
+            project_filter.to_api_params() if project_filter else {}
+        )
+        if strategy is ScanStrategy.SORTED:
+            if project_filter is None or project_filter.unused_since is None:
+                raise ValueError("The sorted scan needs an unused_since date")
+            params["order_by"] = "last_activity_at"
+            params["sort"] = "asc"
+        elif strategy is ScanStrategy.FULL:
+            params["order_by"] = "id"
+            params["sort"] = "asc"
+            if id_after is not None:
+                params["id_after"] = id_after
+        else:
+            raise ValueError("The sharded scan is not available asynchronously")
+
+        async for attrs in self._paginate("/projects", params):
+            project = Project(self._gitlab_instance.projects, attrs)
+            if (
+                strategy is ScanStrategy.SORTED
+                and project_filter is not None
+                and project_filter.unused_since is not None
+                and not is_unused_since(project, project_filter.unused_since)
+            ):
+                # The next pages are not requested once a project is active.
+                return
+            yield project
+
+    async def get_project_commit(
+        self,
+        project: RESTObject,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> AsyncGenerator[ProjectCommit, None]:
+        """Retrieve the commits of a project, with the same query as the
+        synchronous client.
+
+        :param project: project to get the commits from.
+        :type project: RESTObject
+        :param since: only get the commits committed since this date, defaults to None
+        :type since: Optional[datetime], optional
+        :param until: only get the commits committed until this date, defaults to
+            None
+        :type until: Optional[datetime], optional
+        :return: the commits.
+        :rtype: AsyncGenerator[ProjectCommit, None]
+        """
+        params: dict[str, Any] = {}
+        if since:
+            params["since"] = since.isoformat()
+        if until:
+            params["until"] = until.isoformat()
+        async for attrs in self._paginate(
+            f"/projects/{project.id}/repository/commits", params
+        ):
+            yield ProjectCommit(project.commits, attrs)
+
+    async def get_commit_details(
+        self, project: RESTObject, commit_id: str
+    ) -> ProjectCommit:
+        """Retrieve the details of a commit.
+
+        :param project: project the commit belongs to.
+        :type project: RESTObject
+        :param commit_id: id of the commit.
+        :type commit_id: str
+        :return: the commit, with its details.
+        :rtype: ProjectCommit
+        """
+        response = await self._get(
+            f"/projects/{project.id}/repository/commits/{commit_id}"
+        )
+        return ProjectCommit(project.commits, response.json())
+
+    async def get_commits_details(
+        self, project: RESTObject, commit_ids: Iterable[str], concurrency: int = 1
+    ) -> AsyncGenerator[ProjectCommit, None]:
+        """Retrieve the details of several commits, with up to `concurrency`
+        requests in flight, in the same order as `commit_ids`.
+
+        :param project: project the commits belong to.
+        :type project: RESTObject
+        :param commit_ids: ids of the commits to retrieve.
+        :type commit_ids: Iterable[str]
+        :param concurrency: maximum number of requests in flight, defaults to 1
+        :type concurrency: int, optional
+        :return: details of each commit.
+        :rtype: AsyncGenerator[ProjectCommit, None]
+        """
+        pending: deque[asyncio.Task] = deque()
+        try:
+            for commit_id in commit_ids:
+                pending.append(
+                    asyncio.create_task(self.get_commit_details(project, commit_id))
+                )
+                if len(pending) >= concurrency:
+                    yield await pending.popleft()
+            while pending:
+                yield await pending.popleft()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _paginate(
+        self, path: str, params: dict[str, Any]
+    ) -> AsyncGenerator[dict[str, Any], None]:
+        """Retrieve the elements of a list, following the `next` links.
+
+        :param path: path of the list in the API.
+        :type path: str
+        :param params: parameters of the list.
+        :type params: dict[str, Any]
+        :return: the attributes of each element.
+        :rtype: AsyncGenerator[dict[str, Any], None]
+        """
+        url: Optional[str] = path
+        page_params: Optional[dict[str, Any]] = {**params, "per_page": PER_PAGE}
+        while url:
+            response = await self._get(url, page_params)
+            for attrs in response.json():
+                yield attrs
+            # The next link keeps the parameters of the list.
+            url = response.links.get("next", {}).get("url")
+            page_params = None
+
+    async def _get(
+        self, url: str, params: Optional[dict[str, Any]] = None
+    ) -> httpx.Response:
+        """Send a GET request under the rate limit, sending it again if it is
+        rejected by the rate limiter of the instance.
+
+        :param url: path or url of the request.
+        :type url: str
+        :param params: parameters of the request, defaults to None
+        :type params: Optional[dict[str, Any]], optional
+        :raises httpx.HTTPStatusError: Raised if the response is an error.
+        :return: the response.
+        :rtype: httpx.Response
+        """
+        attempt = 0
+        while True:
+            while (wait := self._rate_limiter.try_acquire()) > 0:
+                await asyncio.sleep(wait)
+            response = await self._client.get(url, params=params)
+            self._rate_limiter.update(response.headers)
+            if response.status_code != 429 or attempt >= DEFAULT_RETRIES:
+                response.raise_for_status()
+                return response
+            delay = retry_after(response.headers)
+            if delay is None:
+                delay = jittered_backoff(attempt)
+            attempt += 1
+            logger.warning(
+                "Rate limit of the GitLab API reached, request sent again in %.1f \
+seconds (%d/%d).",
+                delay,
+                attempt,
+                DEFAULT_RETRIES,
+            )
+            self._rate_limiter.pause(delay)
+
+
+class BridgedGitlabAPIService(GitlabAPIService):
+    """GitLab service whose list-heavy methods run on the asynchronous client.
+
+    The coroutines run in an event loop thread owned by the service, and their
+    results are handed over to the calling thread one at a time.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        private_token: str,
+        ssl_cert_path: Optional[str] = None,
+        pool_size: int = DEFAULT_POOL_SIZE,
+    ) -> None:
+        """Constructor of the BridgedGitlabAPIService class.
+
+        :param url: url of the GitLab instance
+        :type url: str
+        :param private_token: personal access token for the GitLab instance.
+        :type private_token: str
+        :param ssl_cert_path: path to the certificate for the GitLab instance,
+            defaults to None
+        :type ssl_cert_path: Optional[str], optional
+        :param pool_size: maximum number of requests in flight, defaults to
+            DEFAULT_POOL_SIZE
+        :type pool_size: int, optional
+        """
+        super().__init__(url, private_token, ssl_cert_path, pool_size=pool_size)
+        self._loop = asyncio.new_event_loop()
+        self._loop_thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._loop_thread.start()
+        self._async_service = AsyncGitlabAPIService(
+            self._gitlab_instance, self.rate_limiter, max_connections=pool_size
+        )
+
+    def close(self) -> None:
+        """Close the connections of the asynchronous client, stop its event loop
+        thread, then close the connections of python-gitlab."""
+        if not self._loop.is_closed():
+            asyncio.run_coroutine_threadsafe(
+                self._async_service.aclose(), self._loop
+            ).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._loop_thread.join()
+            self._loop.close()
+        super().close()
+
+    def scan_projects(
+        self,
+        updated_after: Optional[datetime] = None,
+        project_filter: Optional[ProjectFilter] = None,
+        strategy: ScanStrategy = ScanStrategy.FULL,
+        jobs: int = 1,
+        id_after: Optional[int] = None,
+        updated_ids: Optional[Iterable[int]] = None,
+    ) -> Iterable[RESTObject]:
+        """Retrieve the projects with the asynchronous client, except with the
+        sharded strategy, which already paginates concurrently, and with the
+        incremental scan, which requests its pages one after the other.
+
+        See `GitlabAPIService.scan_projects` for the parameters.
+        """
+        if strategy is ScanStrategy.SHARDED or (
+            updated_after and strategy is not ScanStrategy.SORTED
+        ):
+            return super().scan_projects(
+                updated_after, project_filter, strategy, jobs, id_after, updated_ids
+            )
+        if strategy is ScanStrategy.SORTED and (
+            project_filter is None or project_filter.unused_since is None
+        ):
+            raise ValueError("The sorted scan needs an unused_since date")
+        logger.info("Retrieving projects asynchronously...")
+        return self._iterate(
+            self._async_service.scan_projects(project_filter, strategy, id_after),
+            "projects",
+        )
+
+    def get_project_commit(
+        self,
+        project: RESTObject,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> Iterator[RESTObject]:
+        """Get all the commits of a project with the asynchronous client, one page
+        at a time.
+
+        See `GitlabAPIService.get_project_commit` for the parameters.
+        """
+        logger.info(
+            "Retrieving commits from %s project asynchronously...", project.name
+        )
+        return self._iterate(
+            self._async_service.get_project_commit(project, since, until),
+            f"commits from project {project.name}",
+        )
+
+    def get_commits_details(
+        self, project: RESTObject, commit_ids: Iterable[str], jobs: int = 1
+    ) -> Iterator[RESTObject]:
+        """Get details of several commits with the asynchronous client, with up to
+        `jobs` requests in flight.
+
+        See `GitlabAPIService.get_commits_details` for the parameters.
+        """
+        return self._iterate(
+            self._async_service.get_commits_details(project, commit_ids, jobs),
+            f"commit details from project {project.name}",
+        )
+
+    def _iterate(self, async_iterator: AsyncGenerator, description: str) -> Iterator:
+        """Iterate over an async generator from the calling thread.
+
+        :param async_iterator: async generator of the asynchronous client.
+        :type async_iterator: AsyncGenerator
+        :param description: what is retrieved, for the error messages.
+        :type description: str
+        :return: the elements of the async generator.
+        :rtype: Iterator
+        """
+        try:
+            while True:
+                try:
+                    yield asyncio.run_coroutine_threadsafe(
+                        async_iterator.__anext__(), self._loop
+                    ).result()
+                except StopAsyncIteration:
+                    return
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 401:
+                logger.error(
+                    "Authentication error due to bad token: %s",
+                    self._gitlab_instance.private_token,
+                )
+            else:
+                logger.error("Error when retrieving %s.", description)
+            logger.debug(e)
+            sys.exit(1)
+        except httpx.TransportError as e:
+            logger.error(
+                "Error when retrieving %s due to bad url: %s",
+                description,
+                self._gitlab_instance.url,
+            )
+            logger.debug(e)
+            sys.exit(1)
+        finally:
+            asyncio.run_coroutine_threadsafe(
+                async_iterator.aclose(), self._loop
+            ).result()
@@ -3,16 +3,27 @@
 # # - Flavien Perez fperez@linagora.com
 # # - Maïlys Jara mjara@linagora.com
 
-"""Database module to manage the database connection."""
+"""Database module to manage the database connection.
+
+The engine, and so its connection pool, is created once per process and shared
+by all the Database instances. Each thread should use its own session, created
+from the shared session factory.
+
+The schema is not created here, see the migrations module.
+"""
 
 import os
+import threading
+from typing import Optional
 
 from dotenv import load_dotenv
+from sqlalchemy import Engine
 from sqlalchemy import create_engine
 from sqlalchemy.orm import Session
 from sqlalchemy.orm import sessionmaker
 
-from gitlab_monitor.services.bdd.models import Base
+from gitlab_monitor.services.bdd.migrations import check_schema_version
+from gitlab_monitor.services.bdd.migrations import upgrade_schema
 
 
 # Load and retrieve environment variables
@@ -25,26 +36,86 @@ db_port = os.getenv("DB_PORT")
 
 DB_URL = f"postgresql+psycopg2://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}"
 
+# Connection pool settings
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true")
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
 
 class Database:  # pylint: disable=too-few-public-methods
     """Initialize the database connection."""
 
+    _engine: Optional[Engine] = None
+    _session_factory: Optional[sessionmaker] = None
+    _schema_checked = False
+    _lock = threading.Lock()
+
     def __init__(self):
         """Constructor of the the database connection."""
         self._session = None
 
-    def _initialize_database(self) -> Session:
-        """Initialize the database connection."""
-        # Create a database engine
-        engine = create_engine(DB_URL)
+    @classmethod
+    def get_engine(cls, check_schema: bool = True) -> Engine:
+        """Get the engine of the process, create it on first call.
 
-        # engine.connect()
-        engine.connect()
-        Base.metadata.create_all(bind=engine)
+        :param check_schema: check once per process that the database schema is at
+            the expected version, defaults to True
+        :type check_schema: bool, optional
+        :return: the engine shared by the whole process.
+        :rtype: Engine
+        """
+        with cls._lock:
+            if cls._engine is None:
+                cls._engine = create_engine(
+                    DB_URL,
+                    pool_size=DB_POOL_SIZE,
+                    max_overflow=DB_MAX_OVERFLOW,
+                    pool_pre_ping=DB_POOL_PRE_PING,
+                    pool_recycle=DB_POOL_RECYCLE,
+                )
+            if check_schema and not cls._schema_checked:
+                check_schema_version(cls._engine)
+                cls._schema_checked = True
+            return cls._engine
+
+    @classmethod
+    def upgrade(cls) -> tuple[int, int]:
+        """Create or upgrade the database schema to the version of the models.
+
+        :return: the version before and after the upgrade.
+        :rtype: tuple[int, int]
+        """
+        versions = upgrade_schema(cls.get_engine(check_schema=False))
+        cls._schema_checked = True
+        return versions
+
+    @classmethod
+    def get_session_factory(cls) -> sessionmaker:
+        """Get the session factory of the process, bound to the shared engine.
+
+        :return: the session factory.
+        :rtype: sessionmaker
+        """
+        engine = cls.get_engine()
+        with cls._lock:
+            if cls._session_factory is None:
+                cls._session_factory = sessionmaker(bind=engine)
+            return cls._session_factory
+
+    @classmethod
+    def dispose(cls) -> None:
+        """Close all the connections of the pool and forget the engine."""
+        with cls._lock:
+            if cls._engine is not None:
+                cls._engine.dispose()
+            cls._engine = None
+            cls._session_factory = None
+            cls._schema_checked = False
 
-        # Connect to the database session
-        session = sessionmaker(bind=engine)
-        return session()
+    def _initialize_database(self) -> Session:
+        """Initialize the database connection."""
+        return self.get_session_factory()()
 
     @property
     def session(self) -> Session:
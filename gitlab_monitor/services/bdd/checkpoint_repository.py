@@ -0,0 +1,106 @@
+# # --- Copyright (c) 2024-2025 Linagora
+# # licence       : GPL v3
+# # - Flavien Perez fperez@linagora.com
+# # - Maïlys Jara mjara@linagora.com
+
+"""Repository for the checkpoints of the scans.
+
+A checkpoint is written after each batch saved in the database: it holds the
+pagination cursor after which the scan resumes with `--resume`, the date at which
+the scan started and the parameters of the scan, as a JSON object. It is deleted
+once the scan is complete.
+"""
+
+import json
+import sys
+from dataclasses import dataclass
+from datetime import datetime
+from datetime import timezone
+from typing import Any
+from typing import Optional
+from typing import cast
+
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from gitlab_monitor.logger.logger import logger
+from gitlab_monitor.services.bdd.models import ScanCheckpoint
+
+
+@dataclass
+class Checkpoint:
+    """Progress of a scan."""
+
+    cursor: str
+    started_at: datetime
+    context: dict[str, Any]
+
+
+class SQLAlchemyCheckpointRepository:
+    """Read and write the checkpoints of the scans."""
+
+    def __init__(self, session: Session):
+        """Constructor
+
+        :param session: database session.
+        :type session: Session
+        """
+        self.session = session
+
+    def get(self, scope: str) -> Optional[Checkpoint]:
+        """Get the checkpoint of a scan.
+
+        :param scope: what the scan retrieves, e.g. `commits:<project id>`.
+        :type scope: str
+        :return: the checkpoint, None if no scan of this scope is in progress.
+        :rtype: Optional[Checkpoint]
+        """
+        checkpoint = self.session.get(ScanCheckpoint, scope)
+        if checkpoint:
+            return Checkpoint(
+                cursor=cast(str, checkpoint.cursor),
+                started_at=checkpoint.started_at.replace(tzinfo=timezone.utc),
+                context=json.loads(cast(str, checkpoint.context)),
+            )
+        return None
+
+    def save(self, scope: str, checkpoint: Checkpoint) -> None:
+        """Store the checkpoint of a scan.
+
+        :param scope: what the scan retrieves, e.g. `commits:<project id>`.
+        :type scope: str
+        :param checkpoint: progress of the scan.
+        :type checkpoint: Checkpoint
+        """
+        try:
+            self.session.merge(
+                ScanCheckpoint(
+                    scope=scope,
+                    cursor=checkpoint.cursor,
+                    started_at=checkpoint.started_at.astimezone(timezone.utc).replace(
+                        tzinfo=None
+                    ),
+                    context=json.dumps(checkpoint.context, sort_keys=True),
+                )
+            )
+            self.session.commit()
+        except SQLAlchemyError as e:
+            logger.error("Error while saving the checkpoint of %s in BD.", scope)
+            logger.debug(e)
+            sys.exit(1)
+
+    def delete(self, scope: str) -> None:
+        """Delete the checkpoint of a complete scan.
+
+        :param scope: what the scan retrieves, e.g. `commits:<project id>`.
+        :type scope: str
+        """
+        try:
+            self.session.query(ScanCheckpoint).filter(
+                ScanCheckpoint.scope == scope
+            ).delete()
+            self.session.commit()
+        except SQLAlchemyError as e:
+            logger.error("Error while deleting the checkpoint of %s in BD.", scope)
+            logger.debug(e)
+            sys.exit(1)
@@ -11,17 +11,135 @@ pylint: disable=duplicate-code ; can't ignore the duplicate-code error from pyli
 """
 
 import sys
+from collections.abc import Callable
+from collections.abc import Iterable
+from datetime import datetime
 from typing import Optional
+from typing import cast
 
+from psycopg2 import Error as Psycopg2Error
 from sqlalchemy.exc import SQLAlchemyError
 
 from gitlab_monitor.exc import CommitNotFoundError
 from gitlab_monitor.logger.logger import logger
+from gitlab_monitor.services.bdd.identity_index import IdentityIndex
 from gitlab_monitor.services.bdd.mapper_from_db import DatabaseToDTOMapper
 from gitlab_monitor.services.bdd.mapper_from_dto import DTOToDatabaseMapper
 from gitlab_monitor.services.bdd.models import Commit
 from gitlab_monitor.services.bdd.repository import Repository
+from gitlab_monitor.services.bdd.repository import UpsertResult
 from gitlab_monitor.services.dto import CommitDTO
+from gitlab_monitor.services.utils import batched
+
+
+# Number of commits of a project above which their ids are not loaded in memory
+# (about 40 MB of hashes).
+MAX_INDEX_SIZE = 5_000_000
+
+# Number of commits loaded by one COPY and merged in one transaction: the scan is
+# checkpointed, and the lease of a worker renewed, after each of them.
+COPY_BATCH_SIZE = 10_000
+
+COPY_COLUMNS = ("commit_id", "project_id", "message", "date", "author", "content_hash")
+
+# The date is staged with its time zone, so that it is converted in the same way as
+# with an INSERT of the commit.
+CREATE_STAGING_TABLE = """
+CREATE TEMPORARY TABLE commit_staging (
+    commit_id VARCHAR,
+    project_id INTEGER,
+    message TEXT,
+    date TIMESTAMP WITH TIME ZONE,
+    author VARCHAR,
+    content_hash VARCHAR
+) ON COMMIT DROP
+"""
+
+COPY_TO_STAGING_TABLE = (
+    f"COPY commit_staging ({', '.join(COPY_COLUMNS)}) FROM STDIN WITH (FORMAT csv)"
+)
+
+# Rows whose content hash has not changed are not rewritten, and xmax is 0 for the
+# rows inserted by the statement.
+MERGE_STAGING_TABLE = f"""
+WITH merged AS (
+    INSERT INTO commit ({', '.join(COPY_COLUMNS)})
+    SELECT DISTINCT ON (commit_id) {', '.join(COPY_COLUMNS)}
+    FROM commit_staging
+    ORDER BY commit_id
+    ON CONFLICT (commit_id) DO UPDATE SET
+    {', '.join(f"{column} = excluded.{column}" for column in COPY_COLUMNS[1:])}
+    WHERE commit.content_hash IS DISTINCT FROM excluded.content_hash
+    RETURNING xmax = 0 AS inserted
+)
+SELECT count(*) FILTER (WHERE inserted), count(*) FILTER (WHERE NOT inserted)
+FROM merged
+"""
+
+
+class CommitCSVStream:
+    """Read-only file-like object that serializes commits to CSV lazily, to be
+    consumed by a `COPY ... FROM STDIN`."""
+
+    def __init__(self, commits_dto: Iterable[CommitDTO]):
+        """Constructor
+
+        :param commits_dto: the commits to serialize.
+        :type commits_dto: Iterable[CommitDTO]
+        """
+        self._commits_dto = iter(commits_dto)
+        self._mapper = DTOToDatabaseMapper()
+        self._buffer = ""
+        self.count = 0
+
+    def read(self, size: int = -1) -> str:
+        """Read at most `size` characters, or everything left if `size` is negative.
+
+        :param size: number of characters to read.
+        :type size: int
+        :return: the CSV data, an empty string once all the commits are read.
+        :rtype: str
+        """
+        lines = [self._buffer]
+        length = len(self._buffer)
+        while size < 0 or length < size:
+            commit_dto = next(self._commits_dto, None)
+            if commit_dto is None:
+                break
+            line = self._to_csv_line(commit_dto)
+            lines.append(line)
+            length += len(line)
+            self.count += 1
+        data = "".join(lines)
+        if size < 0:
+            self._buffer = ""
+            return data
+        self._buffer = data[size:]
+        return data[:size]
+
+    def _to_csv_line(self, commit_dto: CommitDTO) -> str:
+        """Serialize a commit to a CSV line, None values are unquoted empty fields
+        which COPY reads as NULL.
+
+        :param commit_dto: the commit to serialize.
+        :type commit_dto: CommitDTO
+        :return: the CSV line.
+        :rtype: str
+        """
+        row = {
+            **vars(commit_dto),
+            "content_hash": self._mapper.content_hash(commit_dto),
+        }
+        fields = []
+        for column in COPY_COLUMNS:
+            value = row[column]
+            if value is None:
+                fields.append("")
+            elif isinstance(value, datetime):
+                fields.append(value.isoformat())
+            else:
+                fields.append('"' + str(value).replace('"', '""') + '"')
+        return ",".join(fields) + "\n"
 
 
 class SQLAlchemyCommitRepository(Repository[CommitDTO]):
@@ -31,6 +149,9 @@ class SQLAlchemyCommitRepository(Repository[CommitDTO]):
     :type Repository: class
     """
 
+    model = Commit
+    primary_key = "commit_id"
+
     def get_by_id(self, object_id: int) -> Optional[CommitDTO]:
         """Get a commit by its ID.
 
@@ -46,6 +167,84 @@ class SQLAlchemyCommitRepository(Repository[CommitDTO]):
             return DatabaseToDTOMapper().map_commit_to_dto(commit)
         return None
 
+    def copy_many(
+        self,
+        commits_dto: Iterable[CommitDTO],
+        batch_size: int = COPY_BATCH_SIZE,
+        on_batch: Optional[Callable[[list[CommitDTO]], None]] = None,
+    ) -> UpsertResult:
+        """Load commits with PostgreSQL COPY, for large initial loads.
+
+        Each batch of commits is streamed into a temporary staging table with
+        `COPY ... FROM STDIN`, then merged into the commit table with a single
+        `INSERT ... ON CONFLICT DO UPDATE`, in one transaction per batch. Commits
+        whose content hash has not changed are left untouched.
+
+        :param commits_dto: the commits to load.
+        :type commits_dto: Iterable[CommitDTO]
+        :param batch_size: number of commits loaded in one transaction, defaults to
+            COPY_BATCH_SIZE
+        :type batch_size: int, optional
+        :param on_batch: called with each batch once it is committed, defaults to
+            None
+        :type on_batch: Optional[Callable[[list[CommitDTO]], None]], optional
+        :return: number of commits inserted, updated and left unchanged.
+        :rtype: UpsertResult
+        """
+        result = UpsertResult()
+        try:
+            for batch in batched(commits_dto, batch_size):
+                cursor = self.session.connection().connection.cursor()
+                cursor.execute(CREATE_STAGING_TABLE)
+                cursor.copy_expert(COPY_TO_STAGING_TABLE, CommitCSVStream(batch))
+                cursor.execute(MERGE_STAGING_TABLE)
+                # The aggregate returns a row of counts, even when no row is merged.
+                inserted, updated = cast(tuple[int, int], cursor.fetchone())
+                self.session.commit()
+                result.inserted += inserted
+                result.updated += updated
+                result.unchanged += len(batch) - inserted - updated
+                logger.debug("%d commits loaded in the database.", result.total)
+                if on_batch is not None:
+                    on_batch(batch)
+        except (SQLAlchemyError, Psycopg2Error) as e:
+            self.session.rollback()
+            logger.error(
+                "Error while loading commits in BD. Use --verbose for more details."
+            )
+            logger.debug(e)
+            sys.exit(1)
+        return result
+
+    def load_identity_index(
+        self, project_id: int, max_size: int = MAX_INDEX_SIZE
+    ) -> Optional[IdentityIndex]:
+        """Load the ids of the commits of a project already saved, with one query.
+
+        :param project_id: id of the project.
+        :type project_id: int
+        :param max_size: number of commits above which no index is loaded, to
+            bound the memory used.
+        :type max_size: int
+        :return: the index of the commits ids, None if the project has too many
+            commits.
+        :rtype: Optional[IdentityIndex]
+        """
+        query = self.session.query(Commit.commit_id).filter(
+            Commit.project_id == project_id
+        )
+        size = query.count()
+        if size > max_size:
+            logger.debug(
+                "Project id %s has %d commits saved, too many to index them.",
+                project_id,
+                size,
+            )
+            return None
+        return IdentityIndex(
+            (commit_id for (commit_id,) in query.yield_per(10_000)), size
+        )
+
     def check_in_db(self, object_dto: CommitDTO) -> Optional[Commit]:
         """Create a commit in the database.
 
@@ -75,9 +274,13 @@ class SQLAlchemyCommitRepository(Repository[CommitDTO]):
                 .first()
             )
             if commit:
+                content_hash = DTOToDatabaseMapper().content_hash(object_dto)
+                if getattr(commit, "content_hash", None) == content_hash:
+                    return
                 for field, data in vars(object_dto).items():
                     if hasattr(commit, field):
                         setattr(commit, field, data)
+                setattr(commit, "content_hash", content_hash)
                 self.session.commit()
             else:
                 raise CommitNotFoundError(
@@ -0,0 +1,91 @@
+# # --- Copyright (c) 2024-2025 Linagora
+# # licence       : GPL v3
+# # - Flavien Perez fperez@linagora.com
+# # - Maïlys Jara mjara@linagora.com
+
+"""In-memory index of the ids already saved in the database.
+
+It is loaded once, then tells without any request whether an object is already
+saved. Small indexes keep the ids in a set. Large indexes only keep a sorted array
+of 64-bit hashes of the ids (8 bytes per id): an unknown id has a probability of
+about n / 2**64 to be reported as known, which is negligible for any repository.
+"""
+
+import hashlib
+from collections.abc import Iterable
+
+import numpy as np
+
+
+# Number of ids above which the index only keeps the hashes of the ids.
+MAX_EXACT_SIZE = 100_000
+
+
+def hash_id(object_id: str) -> int:
+    """Hash an id into an unsigned 64-bit integer.
+
+    :param object_id: the id to hash.
+    :type object_id: str
+    :return: the hash of the id.
+    :rtype: int
+    """
+    return int.from_bytes(
+        hashlib.blake2b(object_id.encode(), digest_size=8).digest(), "big"
+    )
+
+
+class IdentityIndex:
+    """Set of ids, exact or compact depending on its size."""
+
+    def __init__(
+        self, object_ids: Iterable[str], size: int, max_exact_size: int = MAX_EXACT_SIZE
+    ):
+        """Constructor
+
+        :param object_ids: the ids to index, consumed once.
+        :type object_ids: Iterable[str]
+        :param size: number of ids, used to choose the representation.
+        :type size: int
+        :param max_exact_size: number of ids above which only the hashes are kept.
+        :type max_exact_size: int
+        """
+        self._ids: set[str] | None = None
+        self._hashes: np.ndarray | None = None
+        if size <= max_exact_size:
+            self._ids = set(object_ids)
+        else:
+            hashes = np.fromiter(
+                (hash_id(object_id) for object_id in object_ids),
+                dtype=np.uint64,
+                count=size,
+            )
+            hashes.sort()
+            self._hashes = hashes
+
+    @property
+    def is_exact(self) -> bool:
+        """True if the index keeps the ids themselves."""
+        return self._ids is not None
+
+    def __len__(self) -> int:
+        """Number of ids in the index."""
+        if self._ids is not None:
+            return len(self._ids)
+        return len(self._hashes)  # type: ignore[arg-type]
+
+    def __contains__(self, object_id: object) -> bool:
+        """Check if an id is in the index.
+
+        :param object_id: the id to look for.
+        :type object_id: object
+        :return: True if the id is (very probably, for a compact index) known.
+        :rtype: bool
+        """
+        if self._ids is not None:
+            return object_id in self._ids
+        value = np.uint64(hash_id(str(object_id)))
+        position = np.searchsorted(self._hashes, value)  # type: ignore[arg-type]
+        return bool(
+            position < len(self._hashes)  # type: ignore[arg-type]
+            and self._hashes[position] == value  # type: ignore[index]
+        )
@@ -4,6 +4,10 @@
 # # - Maïlys Jara mjara@linagora.com
 """Objects transformation module."""
 
+from datetime import datetime
+from typing import Optional
+from typing import cast
+
 from gitlab_monitor.services.bdd.models import Commit
 from gitlab_monitor.services.bdd.models import Project
 from gitlab_monitor.services.dto import CommitDTO
@@ -30,6 +34,7 @@ class DatabaseToDTOMapper:
             visibility=project_db.visibility,
             created_at=project_db.created_at,
             updated_at=project_db.updated_at,
+            last_activity_at=cast(Optional[datetime], project_db.last_activity_at),
         )
 
     def map_commit_to_dto(self, commit_db: Commit) -> CommitDTO:
@@ -4,6 +4,9 @@
 # # - Maïlys Jara mjara@linagora.com
 """Objects transformation module."""
 
+import hashlib
+import json
+
 from gitlab_monitor.services.bdd.models import Commit
 from gitlab_monitor.services.bdd.models import Project
 from gitlab_monitor.services.dto import CommitDTO
@@ -13,6 +16,17 @@ from gitlab_monitor.services.dto import ProjectDTO
 class DTOToDatabaseMapper:
     """Transform DTOs objects into database models objects."""
 
+    def content_hash(self, object_dto: CommitDTO | ProjectDTO) -> str:
+        """Hash the content of a DTO, to detect if its row has changed.
+
+        :param object_dto: object in DTO format
+        :type object_dto: CommitDTO | ProjectDTO
+        :return: hexadecimal hash of all the fields of the DTO
+        :rtype: str
+        """
+        content = json.dumps(vars(object_dto), sort_keys=True, default=str)
+        return hashlib.blake2b(content.encode(), digest_size=16).hexdigest()
+
     def map_project_to_database(self, project_dto: ProjectDTO) -> Project:
         """Transform the data of a project from a ProjectDTO to a Project.
 
@@ -30,6 +44,8 @@ class DTOToDatabaseMapper:
             visibility=project_dto.visibility,
             created_at=project_dto.created_at,
             updated_at=project_dto.updated_at,
+            last_activity_at=project_dto.last_activity_at,
+            content_hash=self.content_hash(project_dto),
         )
 
     def map_commit_to_database(self, commit_dto: CommitDTO) -> Commit:
@@ -46,4 +62,5 @@ class DTOToDatabaseMapper:
             message=commit_dto.message,
             date=commit_dto.date,
             author=commit_dto.author,
+            content_hash=self.content_hash(commit_dto),
         )
@@ -0,0 +1,142 @@
+# # --- Copyright (c) 2024-2025 Linagora
+# # licence       : GPL v3
+# # - Flavien Perez fperez@linagora.com
+# # - Maïlys Jara mjara@linagora.com
+
+"""Versioning of the database schema.
+
+The schema is only created or upgraded by the `db upgrade` command. The other
+commands only check, with a single query, that the database is at the version
+expected by the models (SCHEMA_VERSION).
+
+To change the schema, update the models, increase SCHEMA_VERSION and add the SQL
+statements that bring an existing database to the new version in MIGRATIONS. New
+tables don't need a statement, they are created from the models.
+"""
+
+import sys
+from datetime import datetime
+from datetime import timezone
+from typing import Optional
+
+from sqlalchemy import Engine
+from sqlalchemy import func
+from sqlalchemy import insert
+from sqlalchemy import select
+from sqlalchemy import text
+from sqlalchemy.exc import ProgrammingError
+
+from gitlab_monitor.logger.logger import logger
+from gitlab_monitor.services.bdd.models import SCHEMA_VERSION
+from gitlab_monitor.services.bdd.models import Base
+from gitlab_monitor.services.bdd.models import SchemaVersion
+
+
+# SQL statements applied to upgrade an existing database to each version.
+MIGRATIONS: dict[int, list[str]] = {
+    # Initial schema: project, commit and the synchronisation watermarks.
+    1: [],
+    # Hash of the content of the rows, to skip the updates that change nothing.
+    2: [
+        "ALTER TABLE project ADD COLUMN IF NOT EXISTS content_hash VARCHAR",
+        "ALTER TABLE commit ADD COLUMN IF NOT EXISTS content_hash VARCHAR",
+    ],
+    # Queue of the projects to scan shared by the workers (new table).
+    3: [],
+    # Checkpoints of the scans in progress (new table).
+    4: [],
+    # Last activity date of the projects, which selects the projects unused since
+    # a date in archive-project. It is filled by the next scan of the projects.
+    5: [
+        "ALTER TABLE project ADD COLUMN IF NOT EXISTS last_activity_at TIMESTAMP",
+        "CREATE INDEX IF NOT EXISTS ix_project_last_activity_at ON project "
+        "(last_activity_at)",
+    ],
+    # Indexes of the analytical queries on the commits.
+    6: [
+        "CREATE INDEX IF NOT EXISTS ix_commit_project_id_date ON commit "
+        "(project_id, date)",
+        "CREATE INDEX IF NOT EXISTS ix_commit_author ON commit (author)",
+        "CREATE INDEX IF NOT EXISTS ix_commit_date ON commit (date)",
+    ],
+}
+
+
+def get_schema_version(engine: Engine) -> Optional[int]:
+    """Get the version of the schema of the database, with a single query.
+
+    :param engine: engine connected to the database.
+    :type engine: Engine
+    :return: the version of the schema, None if the schema was never versioned.
+    :rtype: Optional[int]
+    """
+    try:
+        with engine.connect() as connection:
+            return connection.execute(select(func.max(SchemaVersion.version))).scalar()
+    except ProgrammingError as e:
+        # The schema_version table doesn't exist yet.
+        logger.debug(e)
+        return None
+
+
+def check_schema_version(engine: Engine) -> None:
+    """Stop the application if the database schema is not the expected one.
+
+    :param engine: engine connected to the database.
+    :type engine: Engine
+    """
+    version = get_schema_version(engine)
+    if version == SCHEMA_VERSION:
+        return
+    if version is not None and version > SCHEMA_VERSION:
+        logger.error(
+            "The database schema is at version %s, newer than the version %s \
+supported by this gitlab_monitor. Please upgrade gitlab_monitor.",
+            version,
+            SCHEMA_VERSION,
+        )
+    else:
+        logger.error(
+            "The database schema is at version %s but version %s is expected. \
+Please run `gitlab-monitor db upgrade`.",
+            version,
+            SCHEMA_VERSION,
+        )
+    sys.exit(1)
+
+
+def upgrade_schema(
+    engine: Engine,
+    migrations: Optional[dict[int, list[str]]] = None,
+    target_version: int = SCHEMA_VERSION,
+) -> tuple[int, int]:
+    """Create the missing tables and apply the missing migrations, in one
+    transaction.
+
+    :param engine: engine connected to the database.
+    :type engine: Engine
+    :param migrations: statements of each version, defaults to MIGRATIONS.
+    :type migrations: Optional[dict[int, list[str]]], optional
+    :param target_version: version to upgrade to, defaults to SCHEMA_VERSION.
+    :type target_version: int, optional
+    :return: the version before and after the upgrade.
+    :rtype: tuple[int, int]
+    """
+    if migrations is None:
+        migrations = MIGRATIONS
+    with engine.begin() as connection:
+        Base.metadata.create_all(bind=connection)
+        current_version = (
+            connection.execute(select(func.max(SchemaVersion.version))).scalar() or 0
+        )
+        for version in range(current_version + 1, target_version + 1):
+            logger.info("Upgrading the database schema to version %s...", version)
+            for statement in migrations.get(version, []):
+                connection.execute(text(statement))
+            connection.execute(
+                insert(SchemaVersion).values(
+                    version=version,
+                    applied_at=datetime.now(timezone.utc).replace(tzinfo=None),
+                )
+            )
+    return current_version, max(current_version, target_version)
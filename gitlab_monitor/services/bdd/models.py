@@ -15,6 +15,7 @@ error: Module "sqlalchemy.orm" has no attribute "Mapped"; maybe "Mapper"?  [attr
 from sqlalchemy import Column
 from sqlalchemy import DateTime
 from sqlalchemy import ForeignKey
+from sqlalchemy import Index
 from sqlalchemy import Integer
 from sqlalchemy import String
 from sqlalchemy import Text
@@ -25,11 +26,25 @@ from sqlalchemy.orm import relationship
 
 Base = declarative_base()
 
+# Version of the schema described in this module, to increase with each migration
+# added in the migrations module.
+SCHEMA_VERSION = 6
+
+
+class SchemaVersion(Base):  # type: ignore # pylint: disable=too-few-public-methods
+    """Technical table, versions of the schema applied to the database."""
+
+    __tablename__ = "schema_version"
+
+    version = Column(Integer, primary_key=True)
+    applied_at = Column(DateTime, nullable=False)
+
 
 class Project(Base):  # type: ignore # pylint: disable=too-few-public-methods
     """Dimension table Project."""
 
     __tablename__ = "project"
+    __table_args__ = (Index("ix_project_last_activity_at", "last_activity_at"),)
 
     project_id = Column(Integer, primary_key=True)
     # group_id = Column(Integer, ForeignKey('group.group_id')) # Clé étrangère vers Group
@@ -40,6 +55,8 @@ class Project(Base):  # type: ignore # pylint: disable=too-few-public-methods
     visibility = Column(String)
     created_at = Column(DateTime)
     updated_at = Column(DateTime)
+    last_activity_at = Column(DateTime)
+    content_hash = Column(String)
 
     # group = relationship('Group', back_populates='projects')
     # project_users = relationship('ProjectUser', back_populates='project')
@@ -49,6 +66,15 @@ class Project(Base):  # type: ignore # pylint: disable=too-few-public-methods
 #     merge_requests = relationship('MergeRequest', back_populates='project')
 
 
+class SyncWatermark(Base):  # type: ignore # pylint: disable=too-few-public-methods
+    """Technical table, last successful scan of the projects of a GitLab instance."""
+
+    __tablename__ = "sync_watermark"
+
+    instance_url = Column(String, primary_key=True)
+    synced_at = Column(DateTime, nullable=False)
+
+
 # # Table de dimension : Group
 # class Group(Base):
 #     __tablename__ = 'group'
@@ -98,12 +124,23 @@ class Commit(Base):  # type: ignore # pylint: disable=too-few-public-methods
     """Fact table Commit."""
 
     __tablename__ = "commit"
+    __table_args__ = (
+        # Commits of a project, and of a project over a period: the index also
+        # serves the queries on the project alone.
+        Index("ix_commit_project_id_date", "project_id", "date"),
+        Index("ix_commit_author", "author"),
+        # Commits of the whole instance over a period. The commits are not stored
+        # in date order (each project is scanned from its newest commit, several
+        # projects at a time), so the index is a btree rather than a BRIN.
+        Index("ix_commit_date", "date"),
+    )
 
     commit_id = Column(String, primary_key=True)
     project_id = Column(Integer, ForeignKey("project.project_id"))
     message = Column(Text)
     date = Column(DateTime)
     author = Column(String)
+    content_hash = Column(String)
     # date_id = Column(Integer, ForeignKey('datetime.date_id'))
     # group_id = Column(Integer, ForeignKey('group.group_id'))
     # merge_request_id = Column(Integer, ForeignKey('merge_request.merge_request_id'))
@@ -116,6 +153,43 @@ class Commit(Base):  # type: ignore # pylint: disable=too-few-public-methods
     # merge_request = relationship('MergeRequest', back_populates='commits')
 
 
+class CommitWatermark(Base):  # type: ignore # pylint: disable=too-few-public-methods
+    """Technical table, newest commit retrieved for each project."""
+
+    __tablename__ = "commit_watermark"
+
+    project_id = Column(Integer, ForeignKey("project.project_id"), primary_key=True)
+    last_commit_id = Column(String, nullable=False)
+    last_committed_at = Column(DateTime, nullable=False)
+
+
+class ScanTask(Base):  # type: ignore # pylint: disable=too-few-public-methods
+    """Technical table, queue of the projects to scan shared by the workers."""
+
+    __tablename__ = "scan_task"
+    __table_args__ = (
+        Index("ix_scan_task_status_enqueued_at", "status", "enqueued_at"),
+    )
+
+    project_id = Column(Integer, primary_key=True)
+    status = Column(String, nullable=False)
+    worker = Column(String)
+    attempts = Column(Integer, nullable=False, default=0)
+    enqueued_at = Column(DateTime, nullable=False)
+    lease_expires_at = Column(DateTime)
+
+
+class ScanCheckpoint(Base):  # type: ignore # pylint: disable=too-few-public-methods
+    """Technical table, progress of the scans in progress, to resume them."""
+
+    __tablename__ = "scan_checkpoint"
+
+    scope = Column(String, primary_key=True)
+    cursor = Column(String, nullable=False)
+    started_at = Column(DateTime, nullable=False)
+    context = Column(Text, nullable=False)
+
+
 # # Table de faits : MergeRequest
 # class MergeRequest(Base):
 #     __tablename__ = 'merge_request'
@@ -12,8 +12,11 @@ pylint: disable=duplicate-code ; can't ignore the duplicate-code error from pyli
 """
 
 import sys
+from datetime import datetime
 from typing import Optional
 
+from sqlalchemy import func
+from sqlalchemy import select
 from sqlalchemy.exc import SQLAlchemyError
 
 from gitlab_monitor.exc import ProjectNotFoundError
@@ -32,6 +35,9 @@ class SQLAlchemyProjectRepository(Repository[ProjectDTO]):
     :type Repository: class
     """
 
+    model = Project
+    primary_key = "project_id"
+
     def get_by_id(self, object_id: int) -> Optional[ProjectDTO]:
         """Get a project by its ID.
 
@@ -47,6 +53,61 @@ class SQLAlchemyProjectRepository(Repository[ProjectDTO]):
             return DatabaseToDTOMapper().map_project_to_dto(project)
         return None
 
+    def find_unused_since(
+        self,
+        unused_since: datetime,
+        namespace: Optional[str] = None,
+        visibility: Optional[str] = None,
+    ) -> list[ProjectDTO]:
+        """Get the projects saved in the database without any activity since a
+        date, with the index on their last activity date.
+
+        The projects saved before the last activity date was stored have none
+        until they are scanned again: they are never selected, and a warning
+        gives their number.
+
+        :param unused_since: date before which the projects were last active.
+        :type unused_since: datetime
+        :param namespace: only get the projects of this namespace and its
+            subgroups, defaults to None
+        :type namespace: Optional[str], optional
+        :param visibility: only get the projects with this visibility, defaults to
+            None
+        :type visibility: Optional[str], optional
+        :return: the projects, from the least recently active.
+        :rtype: list[ProjectDTO]
+        """
+        statement = select(Project).where(Project.last_activity_at < unused_since)
+        if namespace is not None:
+            statement = statement.where(
+                Project.path.startswith(namespace.strip("/") + "/", autoescape=True)
+            )
+        if visibility is not None:
+            statement = statement.where(Project.visibility == visibility)
+        statement = statement.order_by(Project.last_activity_at, Project.project_id)
+        try:
+            unknown = self.session.execute(
+                select(func.count()).where(Project.last_activity_at.is_(None))
+            ).scalar()
+            if unknown:
+                logger.warning(
+                    "%d projects saved in the database have no last activity date and \
+are not selected: run scan-projects --full-scan to retrieve it.",
+                    unknown,
+                )
+            mapper = DatabaseToDTOMapper()
+            return [
+                mapper.map_project_to_dto(project)
+                for project in self.session.execute(statement).scalars()
+            ]
+        except SQLAlchemyError as e:
+            logger.error(
+                "Error while retrieving the projects unused since %s in BD.",
+                unused_since,
+            )
+            logger.debug(e)
+            sys.exit(1)
+
     def check_in_db(self, object_dto: ProjectDTO) -> None | Project:
         """Create a project in the database.
 
@@ -76,9 +137,13 @@ class SQLAlchemyProjectRepository(Repository[ProjectDTO]):
                 .first()
             )
             if project:
+                content_hash = DTOToDatabaseMapper().content_hash(object_dto)
+                if getattr(project, "content_hash", None) == content_hash:
+                    return
                 for field, data in vars(object_dto).items():
                     if hasattr(project, field):
                         setattr(project, field, data)
+                setattr(project, "content_hash", content_hash)
                 self.session.commit()
             else:
                 raise ProjectNotFoundError(
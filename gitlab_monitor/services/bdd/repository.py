@@ -8,21 +8,45 @@
 import sys
 from abc import ABC
 from abc import abstractmethod
+from collections.abc import Callable
+from collections.abc import Iterable
+from dataclasses import dataclass
 from typing import Generic
 from typing import Optional
 from typing import TypeVar
 
+from sqlalchemy import literal_column
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
 
 from gitlab_monitor.logger.logger import logger
+from gitlab_monitor.services.bdd.mapper_from_dto import DTOToDatabaseMapper
+from gitlab_monitor.services.bdd.models import Base
 from gitlab_monitor.services.bdd.models import Project
 from gitlab_monitor.services.dto import CommitDTO
 from gitlab_monitor.services.dto import ProjectDTO
+from gitlab_monitor.services.utils import batched
 
 
 T = TypeVar("T", CommitDTO, ProjectDTO)
 
+DEFAULT_BATCH_SIZE = 500
+
+
+@dataclass
+class UpsertResult:
+    """Number of objects inserted, updated and left unchanged by a bulk save."""
+
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+
+    @property
+    def total(self) -> int:
+        """Number of objects processed."""
+        return self.inserted + self.updated + self.unchanged
+
 
 class Repository(ABC, Generic[T]):
     """Interface for the repository pattern.
@@ -31,6 +55,9 @@ class Repository(ABC, Generic[T]):
     :type ABC: class
     """
 
+    model: type[Base]
+    primary_key: str
+
     def __init__(self, session: Session):
         """Constructor
 
@@ -69,6 +96,124 @@ class Repository(ABC, Generic[T]):
             logger.debug(e)
             sys.exit(1)
 
+    def create_many(
+        self, objects_dto: Iterable[T], batch_size: int = DEFAULT_BATCH_SIZE
+    ) -> UpsertResult:
+        """Insert objects in the database, by batches, ignoring the objects that
+        already exist.
+
+        :param objects_dto: the objects to insert.
+        :type objects_dto: Iterable[T]
+        :param batch_size: number of objects sent in one statement.
+        :type batch_size: int
+        :return: number of objects inserted and left unchanged.
+        :rtype: UpsertResult
+        """
+        return self._insert_many(objects_dto, batch_size, update=False)
+
+    def upsert_many(
+        self,
+        objects_dto: Iterable[T],
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        on_batch: Optional[Callable[[list[T]], None]] = None,
+    ) -> UpsertResult:
+        """Insert objects in the database, or update them if they already exist and
+        their content has changed, by batches.
+
+        :param objects_dto: the objects to insert or update.
+        :type objects_dto: Iterable[T]
+        :param batch_size: number of objects sent in one statement.
+        :type batch_size: int
+        :param on_batch: called with each batch once it is committed, defaults to
+            None
+        :type on_batch: Optional[Callable[[list[T]], None]], optional
+        :return: number of objects inserted, updated and left unchanged.
+        :rtype: UpsertResult
+        """
+        return self._insert_many(
+            objects_dto, batch_size, update=True, on_batch=on_batch
+        )
+
+    def _insert_many(
+        self,
+        objects_dto: Iterable[T],
+        batch_size: int,
+        update: bool,
+        on_batch: Optional[Callable[[list[T]], None]] = None,
+    ) -> UpsertResult:
+        """Send the objects with one `INSERT ... ON CONFLICT` statement and one
+        commit per batch.
+
+        Existing rows are only updated when the hash of their content differs from
+        the hash of the DTO, so unchanged rows are not written at all.
+
+        :param objects_dto: the objects to insert.
+        :type objects_dto: Iterable[T]
+        :param batch_size: number of objects sent in one statement.
+        :type batch_size: int
+        :param update: update the existing objects instead of ignoring them.
+        :type update: bool
+        :param on_batch: called with each batch once it is committed.
+        :type on_batch: Optional[Callable[[list[T]], None]]
+        :return: number of objects inserted, updated and left unchanged.
+        :rtype: UpsertResult
+        """
+        result = UpsertResult()
+        mapper = DTOToDatabaseMapper()
+        try:
+            for batch in batched(objects_dto, batch_size):
+                # A statement can't affect the same row twice, keep the last one.
+                rows = list(
+                    {
+                        vars(dto)[self.primary_key]: {
+                            **vars(dto),
+                            "content_hash": mapper.content_hash(dto),
+                        }
+                        for dto in batch
+                    }.values()
+                )
+                statement = insert(self.model).values(rows)
+                if update:
+                    statement = statement.on_conflict_do_update(
+                        index_elements=[self.primary_key],
+                        set_={
+                            column: statement.excluded[column]
+                            for column in rows[0]
+                            if column != self.primary_key
+                        },
+                        where=self.model.content_hash.is_distinct_from(
+                            statement.excluded.content_hash
+                        ),
+                    )
+                else:
+                    statement = statement.on_conflict_do_nothing(
+                        index_elements=[self.primary_key]
+                    )
+                # xmax is 0 for the rows inserted by the statement.
+                returning = statement.returning(
+                    literal_column("xmax") == literal_column("0")
+                )
+                written = self.session.execute(returning).scalars().all()
+                self.session.commit()
+                inserted = sum(1 for is_inserted in written if is_inserted)
+                result.inserted += inserted
+                result.updated += len(written) - inserted
+                result.unchanged += len(batch) - len(written)
+                logger.debug(
+                    "%d %s saved in the database.",
+                    result.total,
+                    self.model.__tablename__,
+                )
+                if on_batch is not None:
+                    on_batch(batch)
+        except SQLAlchemyError as e:
+            logger.error(
+                "Error while saving objects in BD. Use --verbose for more details."
+            )
+            logger.debug(e)
+            sys.exit(1)
+        return result
+
     @abstractmethod
     def check_in_db(self, object_dto: T) -> Optional[Project]:
         """Check if an object exists in the database.
@@ -0,0 +1,317 @@
+# # --- Copyright (c) 2024-2025 Linagora
+# # licence       : GPL v3
+# # - Flavien Perez fperez@linagora.com
+# # - Maïlys Jara mjara@linagora.com
+
+"""Repository for the queue of the projects to scan.
+
+Several workers, on one or several machines, share the queue through the database:
+a worker claims a task with `SELECT ... FOR UPDATE SKIP LOCKED`, so that two
+workers never claim the same task, and holds it for the duration of a lease, which
+it renews while the scan progresses. The tasks whose lease has expired, because
+their worker stopped, are queued again. The leases are dated by the clock of the
+database, so that the clocks of the machines of the workers don't matter.
+"""
+
+import sys
+from datetime import timedelta
+from enum import Enum
+from typing import Optional
+
+from sqlalchemy import case
+from sqlalchemy import func
+from sqlalchemy import literal
+from sqlalchemy import select
+from sqlalchemy import update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from gitlab_monitor.logger.logger import logger
+from gitlab_monitor.services.bdd.models import Project
+from gitlab_monitor.services.bdd.models import ScanTask
+
+
+# Default duration, in seconds, after which a task claimed by a worker is queued
+# again if the worker has not finished it.
+DEFAULT_LEASE = 3600
+# Default number of attempts after which a scan task is failed.
+DEFAULT_MAX_ATTEMPTS = 3
+# Default delay, in seconds, between two claims of a worker waiting for tasks.
+DEFAULT_POLL_INTERVAL = 30
+
+
+class TaskStatus(str, Enum):
+    """States of a scan task."""
+
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+
+def _db_now():
+    """SQL expression of the current date of the database, in UTC without time
+    zone, as the dates stored in the database.
+
+    :return: the current date of the database.
+    """
+    return func.timezone("UTC", func.now())
+
+
+class SQLAlchemyScanTaskRepository:
+    """Read and write the queue of the projects to scan."""
+
+    def __init__(self, session: Session):
+        """Constructor
+
+        :param session: database session.
+        :type session: Session
+        """
+        self.session = session
+
+    def enqueue_saved_projects(self) -> int:
+        """Queue a scan of every project saved in the database, with one statement.
+
+        The projects already pending or running are left as they are.
+
+        :return: number of tasks queued.
+        :rtype: int
+        """
+        statement = insert(ScanTask).from_select(
+            ["project_id", "status", "attempts", "enqueued_at"],
+            select(
+                Project.project_id,
+                literal(TaskStatus.PENDING.value),
+                literal(0),
+                _db_now(),
+            ),
+        )
+        upsert = statement.on_conflict_do_update(
+            index_elements=["project_id"],
+            set_={
+                "status": TaskStatus.PENDING.value,
+                "worker": None,
+                "attempts": 0,
+                "enqueued_at": statement.excluded.enqueued_at,
+                "lease_expires_at": None,
+            },
+            where=ScanTask.status.in_([TaskStatus.DONE.value, TaskStatus.FAILED.value]),
+        ).returning(ScanTask.project_id)
+        try:
+            count = len(self.session.execute(upsert).all())
+            self.session.commit()
+        except SQLAlchemyError as e:
+            logger.error("Error while queuing the projects to scan in BD.")
+            logger.debug(e)
+            sys.exit(1)
+        return count
+
+    def claim(self, worker: str, lease: timedelta) -> Optional[int]:
+        """Claim the oldest pending task, skipping the tasks being claimed by other
+        workers.
+
+        :param worker: name of the worker.
+        :type worker: str
+        :param lease: duration after which the task is queued again if the worker
+            has not finished it.
+        :type lease: timedelta
+        :return: id of the project to scan, None if no task is pending.
+        :rtype: Optional[int]
+        """
+        try:
+            project_id = self.session.execute(
+                select(ScanTask.project_id)
+                .where(ScanTask.status == TaskStatus.PENDING.value)
+                .order_by(ScanTask.enqueued_at, ScanTask.project_id)
+                .limit(1)
+                .with_for_update(skip_locked=True)
+            ).scalar_one_or_none()
+            if project_id is None:
+                self.session.commit()
+                return None
+            self.session.execute(
+                update(ScanTask)
+                .where(ScanTask.project_id == project_id)
+                .values(
+                    status=TaskStatus.RUNNING.value,
+                    worker=worker,
+                    attempts=ScanTask.attempts + 1,
+                    lease_expires_at=_db_now() + lease,
+                )
+            )
+            self.session.commit()
+        except SQLAlchemyError as e:
+            logger.error("Error while claiming a scan task in BD.")
+            logger.debug(e)
+            sys.exit(1)
+        return project_id
+
+    def renew(self, project_id: int, worker: str, lease: timedelta) -> bool:
+        """Extend the lease of a task claimed by a worker.
+
+        :param project_id: id of the project being scanned.
+        :type project_id: int
+        :param worker: name of the worker.
+        :type worker: str
+        :param lease: duration, from now, after which the task is queued again if
+            the worker has not finished it.
+        :type lease: timedelta
+        :return: False if the task was no longer held by the worker.
+        :rtype: bool
+        """
+        try:
+            result = self.session.execute(
+                update(ScanTask)
+                .where(*self._held_by(project_id, worker))
+                .values(lease_expires_at=_db_now() + lease)
+            )
+            self.session.commit()
+        except SQLAlchemyError as e:
+            logger.error(
+                "Error while renewing the lease of the scan task of project id : %s \
+in BD.",
+                project_id,
+            )
+            logger.debug(e)
+            sys.exit(1)
+        return result.rowcount == 1
+
+    def complete(self, project_id: int, worker: str) -> bool:
+        """Mark a task claimed by a worker as done.
+
+        :param project_id: id of the project scanned.
+        :type project_id: int
+        :param worker: name of the worker.
+        :type worker: str
+        :return: False if the task was no longer held by the worker.
+        :rtype: bool
+        """
+        return self._release(project_id, worker, TaskStatus.DONE.value)
+
+    def fail(self, project_id: int, worker: str, max_attempts: int) -> bool:
+        """Release a task whose scan failed: it is queued again, behind the tasks
+        already pending, unless it has already been attempted `max_attempts` times.
+
+        :param project_id: id of the project whose scan failed.
+        :type project_id: int
+        :param worker: name of the worker.
+        :type worker: str
+        :param max_attempts: number of attempts after which the task is failed.
+        :type max_attempts: int
+        :return: False if the task was no longer held by the worker.
+        :rtype: bool
+        """
+        # The scan may have stopped in the middle of a transaction.
+        self.session.rollback()
+        return self._release(
+            project_id, worker, self._status_after_failure(max_attempts)
+        )
+
+    def requeue_expired(self, max_attempts: int) -> int:
+        """Queue again the tasks whose lease has expired, behind the tasks already
+        pending, or fail them if they have already been attempted `max_attempts`
+        times.
+
+        :param max_attempts: number of attempts after which a task is failed.
+        :type max_attempts: int
+        :return: number of tasks released.
+        :rtype: int
+        """
+        try:
+            result = self.session.execute(
+                update(ScanTask)
+                .where(
+                    ScanTask.status == TaskStatus.RUNNING.value,
+                    ScanTask.lease_expires_at < _db_now(),
+                )
+                .values(
+                    status=self._status_after_failure(max_attempts),
+                    worker=None,
+                    enqueued_at=_db_now(),
+                    lease_expires_at=None,
+                )
+            )
+            self.session.commit()
+        except SQLAlchemyError as e:
+            logger.error("Error while releasing the expired scan tasks in BD.")
+            logger.debug(e)
+            sys.exit(1)
+        return result.rowcount
+
+    def count_by_status(self) -> dict[str, int]:
+        """Count the tasks of the queue in each state.
+
+        :return: number of tasks by status.
+        :rtype: dict[str, int]
+        """
+        rows = self.session.execute(
+            select(ScanTask.status, func.count()).group_by(ScanTask.status)
+        ).all()
+        return {status: count for status, count in rows}
+
+    def _release(self, project_id: int, worker: str, status) -> bool:
+        """Set the status of a task, if it is still held by the worker, and queue it
+        behind the tasks already pending.
+
+        :param project_id: id of the project of the task.
+        :type project_id: int
+        :param worker: name of the worker.
+        :type worker: str
+        :param status: new status of the task.
+        :return: False if the task was no longer held by the worker.
+        :rtype: bool
+        """
+        try:
+            result = self.session.execute(
+                update(ScanTask)
+                .where(*self._held_by(project_id, worker))
+                .values(
+                    status=status,
+                    worker=None,
+                    enqueued_at=_db_now(),
+                    lease_expires_at=None,
+                )
+            )
+            self.session.commit()
+        except SQLAlchemyError as e:
+            logger.error(
+                "Error while releasing the scan task of project id : %s in BD.",
+                project_id,
+            )
+            logger.debug(e)
+            sys.exit(1)
+        return result.rowcount == 1
+
+    @staticmethod
+    def _held_by(project_id: int, worker: str) -> tuple:
+        """SQL conditions of a task held by a worker: claimed by it, and whose lease
+        has not expired.
+
+        :param project_id: id of the project of the task.
+        :type project_id: int
+        :param worker: name of the worker.
+        :type worker: str
+        :return: the conditions.
+        :rtype: tuple
+        """
+        return (
+            ScanTask.project_id == project_id,
+            ScanTask.worker == worker,
+            ScanTask.status == TaskStatus.RUNNING.value,
+            ScanTask.lease_expires_at >= _db_now(),
+        )
+
+    @staticmethod
+    def _status_after_failure(max_attempts: int):
+        """SQL expression of the status of a task released before completion.
+
+        :param max_attempts: number of attempts after which a task is failed.
+        :type max_attempts: int
+        :return: failed if the task has been attempted `max_attempts` times,
+            pending otherwise.
+        """
+        return case(
+            (ScanTask.attempts >= max_attempts, TaskStatus.FAILED.value),
+            else_=TaskStatus.PENDING.value,
+        )
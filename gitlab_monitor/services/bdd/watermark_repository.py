@@ -0,0 +1,123 @@
+# # --- Copyright (c) 2024-2025 Linagora
+# # licence       : GPL v3
+# # - Flavien Perez fperez@linagora.com
+# # - Maïlys Jara mjara@linagora.com
+
+"""Repository for the synchronisation watermarks.
+
+A watermark is the date of the last successful scan (or of the newest commit
+retrieved), it is used to only retrieve from the API what has changed since then.
+"""
+
+import sys
+from datetime import datetime
+from datetime import timezone
+from typing import Optional
+from typing import cast
+
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from gitlab_monitor.logger.logger import logger
+from gitlab_monitor.services.bdd.models import CommitWatermark
+from gitlab_monitor.services.bdd.models import SyncWatermark
+
+
+# Maximum age, in hours, of the last scan of the projects from which the projects
+# unused since a date are selected in the database.
+DEFAULT_MAX_SYNC_AGE = 24
+
+
+class SQLAlchemyWatermarkRepository:
+    """Read and write the synchronisation watermarks."""
+
+    def __init__(self, session: Session):
+        """Constructor
+
+        :param session: database session.
+        :type session: Session
+        """
+        self.session = session
+
+    def get_projects_watermark(self, instance_url: str) -> Optional[datetime]:
+        """Get the date of the last successful scan of the projects of an instance.
+
+        :param instance_url: url of the GitLab instance.
+        :type instance_url: str
+        :return: the date of the last scan (UTC), None if the instance was never
+            scanned.
+        :rtype: Optional[datetime]
+        """
+        watermark = self.session.get(SyncWatermark, instance_url)
+        if watermark:
+            return watermark.synced_at.replace(tzinfo=timezone.utc)
+        return None
+
+    def set_projects_watermark(self, instance_url: str, synced_at: datetime) -> None:
+        """Store the date of the last successful scan of the projects of an instance.
+
+        :param instance_url: url of the GitLab instance.
+        :type instance_url: str
+        :param synced_at: date at which the scan started.
+        :type synced_at: datetime
+        """
+        try:
+            self.session.merge(
+                SyncWatermark(
+                    instance_url=instance_url,
+                    synced_at=synced_at.astimezone(timezone.utc).replace(tzinfo=None),
+                )
+            )
+            self.session.commit()
+        except SQLAlchemyError as e:
+            logger.error("Error while saving the scan date of %s in BD.", instance_url)
+            logger.debug(e)
+            sys.exit(1)
+
+    def get_commits_watermark(self, project_id: int) -> Optional[tuple[str, datetime]]:
+        """Get the newest commit retrieved for a project.
+
+        :param project_id: id of the project.
+        :type project_id: int
+        :return: id and commit date (UTC) of the newest commit, None if the commits
+            of the project were never retrieved.
+        :rtype: Optional[tuple[str, datetime]]
+        """
+        watermark = self.session.get(CommitWatermark, project_id)
+        if watermark:
+            return (
+                cast(str, watermark.last_commit_id),
+                watermark.last_committed_at.replace(tzinfo=timezone.utc),
+            )
+        return None
+
+    def set_commits_watermark(
+        self, project_id: int, commit_id: str, committed_at: datetime
+    ) -> None:
+        """Store the newest commit retrieved for a project.
+
+        :param project_id: id of the project.
+        :type project_id: int
+        :param commit_id: id of the newest commit.
+        :type commit_id: str
+        :param committed_at: commit date of the newest commit.
+        :type committed_at: datetime
+        """
+        try:
+            self.session.merge(
+                CommitWatermark(
+                    project_id=project_id,
+                    last_commit_id=commit_id,
+                    last_committed_at=committed_at.astimezone(timezone.utc).replace(
+                        tzinfo=None
+                    ),
+                )
+            )
+            self.session.commit()
+        except SQLAlchemyError as e:
+            logger.error(
+                "Error while saving the last commit of project id : %s in BD.",
+                project_id,
+            )
+            logger.debug(e)
+            sys.exit(1)
@@ -14,14 +14,53 @@ requests.exceptions.ConnectionError instead of the built-in one.
 """
 
 import sys
+from collections import deque
+from collections.abc import Iterable
+from collections.abc import Iterator
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from enum import Enum
+from itertools import takewhile
 from typing import Optional
 
 import gitlab
 from gitlab.base import RESTObject
-from gitlab.base import RESTObjectList
 from requests.exceptions import ConnectionError
+from requests.exceptions import RequestException
 
 from gitlab_monitor.logger.logger import logger
+from gitlab_monitor.services.filters import ProjectFilter
+from gitlab_monitor.services.filters import is_unused_since
+from gitlab_monitor.services.http_cache import CACHE_PATH
+from gitlab_monitor.services.http_cache import HTTPCache
+from gitlab_monitor.services.pipeline import chain_stages
+from gitlab_monitor.services.rate_limiter import RateLimiter
+from gitlab_monitor.services.transport import CONNECT_TIMEOUT
+from gitlab_monitor.services.transport import DEFAULT_POOL_SIZE
+from gitlab_monitor.services.transport import READ_TIMEOUT
+from gitlab_monitor.services.transport import build_session
+
+
+class ScanStrategy(str, Enum):
+    """Ways of paginating the projects of the GitLab instance."""
+
+    # Every page of the projects list.
+    FULL = "full"
+    # Projects sorted by last activity, until the first one active since the
+    # `--unused-since` date.
+    SORTED = "sorted"
+    # Ranges of project ids paginated concurrently.
+    SHARDED = "sharded"
+
+
+# Number of id ranges per concurrent request of the sharded scan: the ids are not
+# evenly distributed, smaller ranges balance the work between the requests.
+SHARDS_PER_JOB = 4
+
+# Number of projects per page of the incremental and sharded scans, the maximum of
+# the API.
+PROJECTS_PER_PAGE = 100
 
 
 class GitlabAPIService:
@@ -32,6 +71,7 @@ class GitlabAPIService:
         url: str,
         private_token: str,
         ssl_cert_path: Optional[str] = None,
+        pool_size: int = DEFAULT_POOL_SIZE,
     ) -> None:
         """Constructor for the GitlabAPIService.
 
@@ -43,27 +83,122 @@ class GitlabAPIService:
         :type mapper: Mapper
         :param ssl_cert_path:  path to the certificate for the GitLab instance, defaults to None
         :type ssl_cert_path: Optional[str], optional
+        :param pool_size: number of connections kept alive, at least the number of
+            concurrent requests, defaults to DEFAULT_POOL_SIZE
+        :type pool_size: int, optional
         """
+        # The requests of all the threads share the rate limiter of the session.
+        self.rate_limiter = RateLimiter()
+        self._cache = HTTPCache(CACHE_PATH) if CACHE_PATH else None
         self._gitlab_instance = gitlab.Gitlab(
             url=url,
             private_token=private_token,
             ssl_verify=ssl_cert_path if ssl_cert_path else False,
+            timeout=(CONNECT_TIMEOUT, READ_TIMEOUT),  # type: ignore[arg-type]
+            session=build_session(self.rate_limiter, pool_size, self._cache),
         )
 
-    def scan_projects(self) -> RESTObjectList | list[RESTObject]:
+    def __enter__(self) -> "GitlabAPIService":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Close the connections to the GitLab instance and the HTTP cache, if
+        any."""
+        self._gitlab_instance.session.close()
+        if self._cache is not None:
+            self._cache.log_stats()
+            self._cache.close()
+            self._cache = None
+
+    def scan_projects(
+        self,
+        updated_after: Optional[datetime] = None,
+        project_filter: Optional[ProjectFilter] = None,
+        strategy: ScanStrategy = ScanStrategy.FULL,
+        jobs: int = 1,
+        id_after: Optional[int] = None,
+        updated_ids: Optional[Iterable[int]] = None,
+    ) -> Iterable[RESTObject]:
         """Retrieve all projects from the GitLab instance and convert them to DTOs.
 
+        With the sorted strategy, the projects are requested from the least recently
+        active, and the pagination stops at the first project active since the
+        `unused_since` date of the filter.
+
+        With the full strategy, the projects are returned by ascending id, so that a
+        scan can be resumed after the last project saved.
+
+        With the sharded strategy, the ids of the projects are split in ranges
+        paginated concurrently, and the projects are returned by ascending id.
+
+        With an `updated_after` date, the full and sharded strategies are replaced by
+        the incremental scan: the API only applies this filter to the projects
+        sorted by update date, so the projects are returned by ascending update date.
+
+        :param updated_after: only retrieve the projects updated after this date,
+            defaults to None
+        :type updated_after: Optional[datetime], optional
+        :param project_filter: criteria sent to the API to only retrieve the
+            matching projects, defaults to None
+        :type project_filter: Optional[ProjectFilter], optional
+        :param strategy: how the projects are paginated, defaults to
+            ScanStrategy.FULL
+        :type strategy: ScanStrategy, optional
+        :param jobs: maximum number of concurrent requests of the sharded
+            strategy, defaults to 1
+        :type jobs: int, optional
+        :param id_after: only retrieve the projects with a greater id, with the full
+            strategy, defaults to None
+        :type id_after: Optional[int], optional
+        :param updated_ids: ids of the projects updated at the `updated_after` date
+            which have already been retrieved, to resume an incremental scan,
+            defaults to None
+        :type updated_ids: Optional[Iterable[int]], optional
+        :raises ValueError: Raised if the sorted strategy is used without
+            `unused_since` date.
         :return: _description_
         :rtype: list of Project in DTO format
         """
-        logger.info("Retrieving projects...")
+        params = project_filter.to_api_params() if project_filter else {}
+        unused_since = None
+        if strategy is ScanStrategy.SORTED:
+            if project_filter is None or project_filter.unused_since is None:
+                raise ValueError("The sorted scan needs an unused_since date")
+            unused_since = project_filter.unused_since
+            params["order_by"] = "last_activity_at"
+            params["sort"] = "asc"
+        elif strategy is ScanStrategy.FULL and not updated_after:
+            params["order_by"] = "id"
+            params["sort"] = "asc"
+            if id_after is not None:
+                logger.info("Resuming the scan after project id %s...", id_after)
+                params["id_after"] = id_after
+        if updated_after and unused_since is None:
+            logger.info("Retrieving projects updated since %s...", updated_after)
+        else:
+            logger.info("Retrieving projects...")
         try:
             if self._gitlab_instance.ssl_verify is False:
                 logger.warning(
                     "SSL verification is not enabled. \
                     Connecting to Gitlab instance without certificate."
                 )
-            return self._gitlab_instance.projects.list(iterator=True)
+            if unused_since is not None:
+                projects = self._gitlab_instance.projects.list(iterator=True, **params)
+                # The next pages are not requested once a project is active.
+                return takewhile(
+                    lambda project: is_unused_since(project, unused_since), projects
+                )
+            if updated_after:
+                return self._scan_updated_after(updated_after, updated_ids, params)
+            if strategy is ScanStrategy.SHARDED:
+                return self._scan_shards(
+                    self._get_last_project_id(params), params, jobs
+                )
+            return self._gitlab_instance.projects.list(iterator=True, **params)
         except ConnectionError as e:
             logger.error(
                 "Error when retrieving projects due to bad url: %s",
@@ -86,6 +221,133 @@ class GitlabAPIService:
             logger.debug(e)
             sys.exit(1)
 
+    def _scan_updated_after(
+        self,
+        updated_after: datetime,
+        updated_ids: Optional[Iterable[int]],
+        params: dict,
+    ) -> Iterator[RESTObject]:
+        """Paginate the projects updated since a date, by ascending update date.
+
+        A page is requested from the update date of the last project retrieved
+        rather than by its number, as the API includes the projects updated at the
+        date itself: a project updated during the scan moves to the end of the list
+        without shifting the projects not retrieved yet to a page already
+        requested. The projects updated at the same date as the last one are
+        skipped when they come again.
+
+        :param updated_after: date from which the projects are retrieved.
+        :type updated_after: datetime
+        :param updated_ids: ids of the projects updated at the `updated_after` date
+            which have already been retrieved.
+        :type updated_ids: Optional[Iterable[int]]
+        :param params: parameters of the projects list.
+        :type params: dict
+        :return: the projects, by ascending update date.
+        :rtype: Iterator[RESTObject]
+        """
+        cursor = updated_after
+        retrieved = {(project_id, cursor) for project_id in updated_ids or ()}
+        page = 1
+        while True:
+            projects = self._gitlab_instance.projects.list(
+                order_by="updated_at",
+                sort="asc",
+                updated_after=cursor.isoformat(),
+                per_page=PROJECTS_PER_PAGE,
+                page=page,
+                **params,
+            )
+            for project in projects:
+                key = (project.id, datetime.fromisoformat(project.updated_at))
+                if key in retrieved:
+                    continue
+                if key[1] != cursor:
+                    cursor = key[1]
+                    retrieved.clear()
+                retrieved.add(key)
+                yield project
+            if len(projects) < PROJECTS_PER_PAGE:
+                return
+            # The projects updated at the last date come first, by id: the pages
+            # only made of projects already retrieved are not requested again.
+            page = len(retrieved) // PROJECTS_PER_PAGE + 1
+
+    def _get_last_project_id(self, params: dict) -> Optional[int]:
+        """Get the highest id of the projects matching the parameters.
+
+        :param params: parameters of the projects list.
+        :type params: dict
+        :return: the highest id, None if no project matches.
+        :rtype: Optional[int]
+        """
+        last_project = next(
+            iter(
+                self._gitlab_instance.projects.list(
+                    order_by="id", sort="desc", per_page=1, page=1, **params
+                )
+            ),
+            None,
+        )
+        return last_project.id if last_project else None
+
+    def _scan_shards(
+        self, last_project_id: Optional[int], params: dict, jobs: int
+    ) -> Iterator[RESTObject]:
+        """Paginate ranges of project ids concurrently, with up to `jobs` ranges in
+        flight, and yield the projects range after range.
+
+        Each range is paginated in a thread at most one page ahead of the
+        projects yielded, so that at most `jobs` pages wait in memory.
+
+        :param last_project_id: highest id of the projects to retrieve.
+        :type last_project_id: Optional[int]
+        :param params: parameters of the projects list.
+        :type params: dict
+        :param jobs: maximum number of concurrent requests.
+        :type jobs: int
+        :return: the projects, by ascending id.
+        :rtype: Iterator[RESTObject]
+        """
+        if last_project_id is None:
+            return
+        shards = max(jobs, 1) * SHARDS_PER_JOB
+        bounds = sorted(
+            {last_project_id * shard // shards for shard in range(shards + 1)}
+        )
+        yield from chain_stages(
+            (
+                self._scan_id_range(low, high, params)
+                for low, high in zip(bounds, bounds[1:])
+            ),
+            PROJECTS_PER_PAGE,
+            max(jobs, 1),
+        )
+
+    def _scan_id_range(self, low: int, high: int, params: dict) -> Iterator[RESTObject]:
+        """Retrieve the projects whose id is in ]low, high], with keyset pagination.
+
+        :param low: id after which the projects are retrieved.
+        :type low: int
+        :param high: highest id of the projects retrieved.
+        :type high: int
+        :param params: parameters of the projects list.
+        :type params: dict
+        :return: the projects of the range, by ascending id, page after page.
+        :rtype: Iterator[RESTObject]
+        """
+        logger.debug("Retrieving projects with id in ]%d, %d]...", low, high)
+        yield from self._gitlab_instance.projects.list(
+            iterator=True,
+            pagination="keyset",
+            order_by="id",
+            sort="asc",
+            per_page=PROJECTS_PER_PAGE,
+            id_after=low,
+            id_before=high + 1,
+            **params,
+        )
+
     def get_project_by_id(self, project_id: int) -> RESTObject:
         """Get a project from gitlab by its id.
 
@@ -128,18 +390,46 @@ class GitlabAPIService:
             logger.debug(e)
             sys.exit(1)
 
-    def get_project_commit(self, project: RESTObject) -> list[RESTObject]:
-        """Get all the commits of a project.
+    def get_project_commit(
+        self,
+        project: RESTObject,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> Iterator[RESTObject]:
+        """Get all the commits of a project, from the newest to the oldest.
+
+        The pages of the list are requested as the commits are consumed, so that
+        only one page is held in memory.
 
         :param project: project to get the commits from
         :type project: RESTObject
-        :return: RESTObject of the commits
-        :rtype: Optional[RESTObject]
+        :param since: only get the commits committed since this date, defaults to None
+        :type since: Optional[datetime], optional
+        :param until: only get the commits committed until this date, defaults to
+            None
+        :type until: Optional[datetime], optional
+        :return: the commits.
+        :rtype: Iterator[RESTObject]
         """
-        logger.info("Retrieving commits from %s project...", project.name)
+        params = {}
+        if until:
+            logger.info(
+                "Resuming the retrieval of the commits from %s project until %s...",
+                project.name,
+                until,
+            )
+            params["until"] = until.isoformat()
+        if since:
+            logger.info(
+                "Retrieving commits from %s project since %s...", project.name, since
+            )
+            params["since"] = since.isoformat()
+        else:
+            logger.info("Retrieving commits from %s project...", project.name)
         try:
-            return project.commits.list(get_all=True, all=True)
-        except gitlab.GitlabGetError as e:
+            yield from project.commits.list(iterator=True, per_page=100, **params)
+        # The first page raises a GitlabListError, the next ones a GitlabHttpError.
+        except (gitlab.GitlabListError, gitlab.GitlabHttpError) as e:
             logger.error("Error when retrieving commit from project %s", project.name)
             logger.debug(e)
             sys.exit(1)
@@ -155,16 +445,130 @@ class GitlabAPIService:
             logger.debug(e)
             sys.exit(1)
 
+    def is_commit_in_branches(self, project: RESTObject, commit_id: str) -> bool:
+        """Check if a commit is still reachable from a branch of a project.
+
+        A commit retrieved before is no longer reachable when the history of the
+        branches containing it has been rewritten (force-push) or deleted.
+
+        :param project: project the commit belongs to.
+        :type project: RESTObject
+        :param commit_id: id of the commit.
+        :type commit_id: str
+        :return: True if at least one branch contains the commit.
+        :rtype: bool
+        """
+        try:
+            return bool(project.commits.get(commit_id, lazy=True).refs(type="branch"))
+        except gitlab.GitlabGetError as e:
+            logger.debug(e)
+            return False
+
+    def get_commits_details(
+        self, project: RESTObject, commit_ids: Iterable[str], jobs: int = 1
+    ) -> Iterator[RESTObject]:
+        """Get details of several commits, with up to `jobs` requests in flight.
+
+        The details are yielded in the same order as `commit_ids`, whatever the
+        order in which the requests complete. A request is only sent once the
+        consumer has taken the details of the commit `jobs` places before, so that
+        at most `jobs` details wait in memory.
+
+        :param project: project the commits belong to.
+        :type project: RESTObject
+        :param commit_ids: ids of the commits to retrieve.
+        :type commit_ids: Iterable[str]
+        :param jobs: maximum number of concurrent requests, defaults to 1
+        :type jobs: int, optional
+        :return: details of each commit.
+        :rtype: Iterator[RESTObject]
+        """
+        if jobs <= 1:
+            for commit_id in commit_ids:
+                yield self.get_commit_details(project, commit_id)
+            return
+
+        pending: deque[Future] = deque()
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            for commit_id in commit_ids:
+                pending.append(
+                    executor.submit(self.get_commit_details, project, commit_id)
+                )
+                if len(pending) >= jobs:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    def get_project_handle(self, project_id: int) -> RESTObject:
+        """Get a project without requesting it, to act on it by its id.
+
+        :param project_id: project id
+        :type project_id: int
+        :return: the project, with its id as only attribute.
+        :rtype: RESTObject
+        """
+        return self._gitlab_instance.projects.get(project_id, lazy=True)
+
     def archive_project(self, project: RESTObject) -> None:
         """Archive a project in GitLab.
 
-        :param project: project to archive
+        :param project: project to archive, possibly a handle without its name.
         :type project: RESTObject
         """
-        logger.info("Archiving project %s...", project.name)
+        name = getattr(project, "name", None) or project.get_id()
+        logger.info("Archiving project %s...", name)
         try:
             project.archive()
         except gitlab.GitlabError as e:
-            logger.error("Error when archiving project %s", project.name)
+            logger.error("Error when archiving project %s", name)
             logger.debug(e)
             sys.exit(1)
+
+    def archive_projects(
+        self, project_ids: Iterable[int], jobs: int = 1
+    ) -> Iterator[tuple[int, Optional[str]]]:
+        """Archive several projects by their id, with up to `jobs` requests in
+        flight, without requesting the projects first.
+
+        A failure doesn't stop the archiving of the other projects: it is yielded
+        with the id of its project, in the same order as `project_ids`.
+
+        :param project_ids: ids of the projects to archive.
+        :type project_ids: Iterable[int]
+        :param jobs: maximum number of concurrent requests, defaults to 1
+        :type jobs: int, optional
+        :return: the id of each project, with None if it is archived or the error
+            message if it is not.
+        :rtype: Iterator[tuple[int, Optional[str]]]
+        """
+        pending: deque[tuple[int, Future]] = deque()
+        with ThreadPoolExecutor(max_workers=max(jobs, 1)) as executor:
+            for project_id in project_ids:
+                pending.append(
+                    (project_id, executor.submit(self._archive_by_id, project_id))
+                )
+                if len(pending) >= jobs:
+                    first_id, future = pending.popleft()
+                    yield first_id, future.result()
+            while pending:
+                first_id, future = pending.popleft()
+                yield first_id, future.result()
+
+    def _archive_by_id(self, project_id: int) -> Optional[str]:
+        """Archive a project by its id.
+
+        A GitLab error, or a network error such as a timeout, is returned rather
+        than raised, so that the other projects are still archived.
+
+        :param project_id: id of the project to archive.
+        :type project_id: int
+        :return: None if the project is archived, the error message otherwise.
+        :rtype: Optional[str]
+        """
+        logger.debug("Archiving project id %s...", project_id)
+        try:
+            self.get_project_handle(project_id).archive()
+        except (gitlab.GitlabError, RequestException) as e:
+            logger.debug(e)
+            return str(e) or type(e).__name__
+        return None
@@ -7,6 +7,7 @@
 
 from dataclasses import dataclass
 from datetime import datetime
+from typing import Optional
 
 
 @dataclass
@@ -24,6 +25,7 @@ class ProjectDTO:  # pylint: disable=too-many-instance-attributes
     visibility: str
     created_at: datetime
     updated_at: datetime
+    last_activity_at: Optional[datetime] = None
 
 
 @dataclass
@@ -38,3 +40,20 @@ class CommitDTO:
     message: str
     date: datetime
     author: str
+
+
+@dataclass
+class CommitsScanDTO:
+    """Outcome of the scan of the commits of a project, kept in memory for the
+    summary of a scan of many projects."""
+
+    project_id: int
+    name: str
+    commits: int
+    duration: float
+    failed: bool = False
+
+    @property
+    def throughput(self) -> float:
+        """Number of commits retrieved per second."""
+        return self.commits / self.duration if self.duration > 0 else 0.0
@@ -0,0 +1,144 @@
+# # --- Copyright (c) 2024-2025 Linagora
+# # licence       : GPL v3
+# # - Flavien Perez fperez@linagora.com
+# # - Maïlys Jara mjara@linagora.com
+
+"""Filters applied to the projects retrieved from the GitLab API.
+
+The predicates the API can express are sent as parameters of the projects list, so
+that only the projects searched are transferred. The others are checked on each
+project received.
+"""
+
+from dataclasses import dataclass
+from dataclasses import fields
+from datetime import datetime
+from datetime import timezone
+from enum import Enum
+from typing import Any
+from typing import Optional
+
+from gitlab.base import RESTObject
+
+
+class Visibility(str, Enum):
+    """Visibility levels of a GitLab project."""
+
+    PUBLIC = "public"
+    INTERNAL = "internal"
+    PRIVATE = "private"
+
+
+@dataclass
+class ProjectFilter:
+    """Criteria that the projects retrieved must match, None meaning no criterion."""
+
+    visibility: Optional[str] = None
+    namespace: Optional[str] = None
+    archived: Optional[bool] = None
+    search: Optional[str] = None
+    active_since: Optional[datetime] = None
+    unused_since: Optional[datetime] = None
+
+    def is_empty(self) -> bool:
+        """Tell if the filter keeps every project.
+
+        :return: True if no criterion is set.
+        :rtype: bool
+        """
+        return all(getattr(self, field.name) is None for field in fields(self))
+
+    def to_api_params(self) -> dict[str, Any]:
+        """Translate the criteria to parameters of the GitLab projects list.
+
+        The namespace has no equivalent in the projects list of the API, it is only
+        checked by `matches`.
+
+        :return: the parameters of the projects list.
+        :rtype: dict[str, Any]
+        """
+        params: dict[str, Any] = {}
+        if self.visibility is not None:
+            params["visibility"] = Visibility(self.visibility).value
+        if self.archived is not None:
+            params["archived"] = self.archived
+        if self.search is not None:
+            params["search"] = self.search
+        if self.active_since is not None:
+            params["last_activity_after"] = self.active_since.isoformat()
+        if self.unused_since is not None:
+            params["last_activity_before"] = self.unused_since.isoformat()
+        return params
+
+    def matches(self, project: RESTObject) -> bool:
+        """Check a project retrieved from the API against the criteria.
+
+        The criteria sent to the API are checked again, as older GitLab versions
+        ignore some of them. The search term is left to the API, which matches it
+        against several fields of the project.
+
+        :param project: project retrieved from the API.
+        :type project: RESTObject
+        :return: True if the project matches all the criteria.
+        :rtype: bool
+        """
+        if self.namespace is not None and not _in_namespace(
+            project.path_with_namespace, self.namespace
+        ):
+            return False
+        if (
+            self.visibility is not None
+            and project.visibility != Visibility(self.visibility).value
+        ):
+            return False
+        if self.archived is not None and project.archived != self.archived:
+            return False
+        if self.active_since is not None and is_unused_since(
+            project, self.active_since
+        ):
+            return False
+        if self.unused_since is not None and not is_unused_since(
+            project, self.unused_since
+        ):
+            return False
+        return True
+
+
+def is_unused_since(project: RESTObject, date: datetime) -> bool:
+    """Tell if a project retrieved from the API has had no activity since a date.
+
+    :param project: project retrieved from the API.
+    :type project: RESTObject
+    :param date: date with or without time zone, in UTC if it has none.
+    :type date: datetime
+    :return: True if the last activity of the project is before the date.
+    :rtype: bool
+    """
+    return _naive(datetime.fromisoformat(project.last_activity_at)) < _naive(date)
+
+
+def _in_namespace(path_with_namespace: str, namespace: str) -> bool:
+    """Tell if a project path is in a namespace or one of its subgroups.
+
+    :param path_with_namespace: full path of the project.
+    :type path_with_namespace: str
+    :param namespace: full path of the namespace.
+    :type namespace: str
+    :return: True if the project is in the namespace.
+    :rtype: bool
+    """
+    return path_with_namespace.startswith(namespace.strip("/") + "/")
+
+
+def _naive(date: datetime) -> datetime:
+    """Convert a date to UTC without time zone, like the dates given in the command
+    line.
+
+    :param date: date with or without time zone.
+    :type date: datetime
+    :return: the date without time zone.
+    :rtype: datetime
+    """
+    if date.tzinfo is None:
+        return date
+    return date.astimezone(timezone.utc).replace(tzinfo=None)
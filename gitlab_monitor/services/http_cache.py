@@ -0,0 +1,366 @@
+# # --- Copyright (c) 2024-2025 Linagora
+# # licence       : GPL v3
+# # - Flavien Perez fperez@linagora.com
+# # - Maïlys Jara mjara@linagora.com
+
+"""On-disk cache of the responses of the GitLab API.
+
+The responses to the GET requests are stored in a SQLite database with their
+`ETag` and `Last-Modified` headers. A response younger than the time to live is
+served without any request; an older one is revalidated with `If-None-Match` and
+`If-Modified-Since`, and served again if the API answers 304 Not Modified. The
+least recently used responses are evicted when the cache exceeds its size: the
+access times of the responses served are written in batches, and the size of the
+cache is kept up to date rather than summed at each write.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections.abc import Callable
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Optional
+from typing import Union
+
+from dotenv import load_dotenv
+from requests import PreparedRequest
+from requests import Response
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from gitlab_monitor.logger.logger import logger
+from gitlab_monitor.services.rate_limiter import RateLimitedAdapter
+from gitlab_monitor.services.rate_limiter import RateLimiter
+
+
+load_dotenv()
+
+# Path of the cache database, the cache is disabled if it is not set.
+CACHE_PATH = os.getenv("GITLAB_CACHE_PATH")
+# Number of seconds during which a response is served without revalidation.
+CACHE_TTL = float(os.getenv("GITLAB_CACHE_TTL", "0"))
+# Maximum size of the responses stored, in megabytes.
+CACHE_MAX_SIZE = int(os.getenv("GITLAB_CACHE_MAX_SIZE", "100"))
+
+# Headers of a stored response which no longer apply to its decoded body.
+_DROPPED_HEADERS = ("content-encoding", "content-length", "transfer-encoding")
+
+# Number of access times kept in memory before they are written to the database.
+_ACCESS_BATCH_SIZE = 100
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS response (
+    key TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    headers TEXT NOT NULL,
+    body BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    stored_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS response_accessed_at ON response (accessed_at);
+"""
+
+
+class HTTPCache:
+    """SQLite store of the responses, shared by the threads of the process."""
+
+    def __init__(
+        self,
+        path: str,
+        ttl: float = CACHE_TTL,
+        max_size: int = CACHE_MAX_SIZE * 1024 * 1024,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        """Constructor of the HTTPCache class.
+
+        :param path: path of the cache database, `:memory:` for a cache in memory.
+        :type path: str
+        :param ttl: number of seconds during which a response is served without
+            revalidation, defaults to CACHE_TTL
+        :type ttl: float, optional
+        :param max_size: maximum size of the responses stored, in bytes, defaults
+            to CACHE_MAX_SIZE megabytes
+        :type max_size: int, optional
+        :param clock: current time in seconds, defaults to time.time
+        :type clock: Callable[[], float], optional
+        """
+        if path != ":memory:":
+            path = os.path.expanduser(path)
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.executescript(_SCHEMA)
+        (self._size,) = self._connection.execute(
+            "SELECT coalesce(sum(size), 0) FROM response"
+        ).fetchone()
+        # Access times of the responses served, not written yet.
+        self._accessed: dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._ttl = ttl
+        self._max_size = max_size
+        self._clock = clock
+        self.hits = 0
+        self.revalidations = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[tuple[CaseInsensitiveDict[str], bytes, bool]]:
+        """Get a stored response, counted as a hit if it is fresh.
+
+        :param key: key of the request.
+        :type key: str
+        :return: the headers and the body of the response, and whether it is still
+            fresh, None if no response is stored.
+        :rtype: Optional[tuple[CaseInsensitiveDict[str], bytes, bool]]
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT headers, body, stored_at FROM response WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            headers, body, stored_at = row
+            now = self._clock()
+            fresh = now - stored_at < self._ttl
+            if fresh:
+                self.hits += 1
+            self._accessed[key] = now
+            if len(self._accessed) >= _ACCESS_BATCH_SIZE:
+                self._write_accesses()
+                self._connection.commit()
+        return CaseInsensitiveDict(json.loads(headers)), body, fresh
+
+    def set(self, key: str, url: str, headers: dict[str, str], body: bytes) -> None:
+        """Store a response, then evict the least recently used responses if the
+        cache is full.
+
+        :param key: key of the request.
+        :type key: str
+        :param url: url of the request.
+        :type url: str
+        :param headers: headers of the response.
+        :type headers: dict[str, str]
+        :param body: decoded body of the response.
+        :type body: bytes
+        """
+        now = self._clock()
+        with self._lock:
+            replaced = self._connection.execute(
+                "SELECT size FROM response WHERE key = ?", (key,)
+            ).fetchone()
+            self._connection.execute(
+                "INSERT OR REPLACE INTO response VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, url, json.dumps(headers), body, len(body), now, now),
+            )
+            self._accessed.pop(key, None)
+            self._size += len(body) - (replaced[0] if replaced else 0)
+            self._evict()
+            self._connection.commit()
+
+    def touch(self, key: str) -> None:
+        """Mark a stored response as fresh again, after its revalidation.
+
+        :param key: key of the request.
+        :type key: str
+        """
+        with self._lock:
+            self.revalidations += 1
+            self._connection.execute(
+                "UPDATE response SET stored_at = ? WHERE key = ?", (self._clock(), key)
+            )
+            self._connection.commit()
+
+    def invalidate(self, url: str) -> None:
+        """Delete the responses of a resource and of its sub-resources: the urls
+        equal to the url of the resource or starting with it followed by `/` or `?`.
+
+        :param url: url of the resource.
+        :type url: str
+        """
+        # `/projects/12` doesn't match `/projects/123`.
+        where = "WHERE url = ? OR substr(url, 1, ?) IN (?, ?)"
+        params = (url, len(url) + 1, url + "/", url + "?")
+        with self._lock:
+            (size,) = self._connection.execute(
+                f"SELECT coalesce(sum(size), 0) FROM response {where}", params
+            ).fetchone()
+            self._connection.execute(f"DELETE FROM response {where}", params)
+            self._size -= size
+            self._connection.commit()
+
+    def miss(self) -> None:
+        """Count a response which was not served from the cache."""
+        with self._lock:
+            self.misses += 1
+
+    def flush(self) -> None:
+        """Write the access times of the responses served since the last write."""
+        with self._lock:
+            self._write_accesses()
+            self._connection.commit()
+
+    def close(self) -> None:
+        """Write the pending access times and close the database of the cache."""
+        with self._lock:
+            self._write_accesses()
+            self._connection.commit()
+            self._connection.close()
+
+    def log_stats(self) -> None:
+        """Log the use of the cache, in verbose mode."""
+        logger.debug(
+            "HTTP cache: %d hits, %d revalidated, %d misses.",
+            self.hits,
+            self.revalidations,
+            self.misses,
+        )
+
+    def _write_accesses(self) -> None:
+        """Write the pending access times, without committing them."""
+        self._connection.executemany(
+            "UPDATE response SET accessed_at = ? WHERE key = ?",
+            [(accessed_at, key) for key, accessed_at in self._accessed.items()],
+        )
+        self._accessed.clear()
+
+    def _evict(self) -> None:
+        """Delete the least recently used responses beyond the maximum size."""
+        if self._size <= self._max_size:
+            return
+        self._write_accesses()
+        rows = self._connection.execute(
+            "SELECT key, size FROM response ORDER BY accessed_at"
+        )
+        evicted = []
+        for key, row_size in rows:
+            if self._size <= self._max_size:
+                break
+            evicted.append((key,))
+            self._size -= row_size
+        rows.close()
+        self._connection.executemany("DELETE FROM response WHERE key = ?", evicted)
+
+
+class CachingAdapter(RateLimitedAdapter):
+    """Transport adapter serving the GET requests from an HTTP cache, before they
+    reach the rate limiter."""
+
+    def __init__(self, limiter: RateLimiter, cache: HTTPCache, **kwargs) -> None:
+        """Constructor of the CachingAdapter class.
+
+        :param limiter: rate limiter shared by the requests.
+        :type limiter: RateLimiter
+        :param cache: cache of the responses.
+        :type cache: HTTPCache
+        """
+        super().__init__(limiter, **kwargs)
+        self.cache = cache
+
+    def send(
+        self,
+        request: PreparedRequest,
+        stream: bool = False,
+        timeout: Union[None, float, tuple[float, float], tuple[float, None]] = None,
+        verify: Union[bool, str] = True,
+        cert: Union[
+            None, bytes, str, tuple[Union[bytes, str], Union[bytes, str]]
+        ] = None,
+        proxies: Optional[Mapping[str, str]] = None,
+    ) -> Response:
+        """Send a request, unless its response is stored and fresh.
+
+        See `HTTPAdapter.send` for the parameters.
+
+        :return: the response.
+        :rtype: Response
+        """
+        if request.method != "GET" or stream:
+            response = super().send(request, stream, timeout, verify, cert, proxies)
+            if request.method != "GET" and response.ok:
+                # The resource changed: forget it and its sub-resources.
+                self.cache.invalidate(str(request.url).rsplit("/", 1)[0])
+            return response
+
+        key = cache_key(request)
+        stored = self.cache.get(key)
+        if stored is not None:
+            headers, body, fresh = stored
+            if fresh:
+                logger.debug("HTTP cache hit: %s", request.url)
+                return _build_response(request, headers, body)
+            if "ETag" in headers:
+                request.headers["If-None-Match"] = headers["ETag"]
+            if "Last-Modified" in headers:
+                request.headers["If-Modified-Since"] = headers["Last-Modified"]
+
+        response = super().send(request, stream, timeout, verify, cert, proxies)
+        if stored is not None and response.status_code == 304:
+            self.cache.touch(key)
+            logger.debug("HTTP cache revalidated: %s", request.url)
+            return _build_response(request, stored[0], stored[1])
+
+        self.cache.miss()
+        logger.debug("HTTP cache miss: %s", request.url)
+        if response.status_code == 200 and _is_cacheable(response):
+            kept_headers = {
+                name: value
+                for name, value in response.headers.items()
+                if name.lower() not in _DROPPED_HEADERS
+            }
+            self.cache.set(key, str(request.url), kept_headers, response.content)
+        return response
+
+
+def cache_key(request: PreparedRequest) -> str:
+    """Key of a request in the cache: its url and a digest of its token, so that
+    users sharing a cache never get the responses of one another.
+
+    :param request: request sent.
+    :type request: PreparedRequest
+    :return: the key.
+    :rtype: str
+    """
+    token = request.headers.get("PRIVATE-TOKEN", "")
+    digest = hashlib.sha256(token.encode()).hexdigest()[:16]
+    return f"{digest}:{request.url}"
+
+
+def _is_cacheable(response: Response) -> bool:
+    """Tell if a response may be stored, and revalidated.
+
+    :param response: response received.
+    :type response: Response
+    :return: True if the response has a validator and no `no-store` directive.
+    :rtype: bool
+    """
+    if "no-store" in response.headers.get("Cache-Control", ""):
+        return False
+    return "ETag" in response.headers or "Last-Modified" in response.headers
+
+
+def _build_response(
+    request: PreparedRequest, headers: CaseInsensitiveDict[str], body: bytes
+) -> Response:
+    """Build the response of a request from a stored response.
+
+    :param request: request sent.
+    :type request: PreparedRequest
+    :param headers: headers of the stored response.
+    :type headers: CaseInsensitiveDict[str]
+    :param body: body of the stored response.
+    :type body: bytes
+    :return: the response.
+    :rtype: Response
+    """
+    response = Response()
+    response.status_code = 200
+    response.reason = "OK"
+    response.headers = headers
+    response.encoding = get_encoding_from_headers(response.headers)
+    response.url = str(request.url)
+    response.request = request
+    response._content = body  # pylint: disable=protected-access
+    return response
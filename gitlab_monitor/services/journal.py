@@ -0,0 +1,98 @@
+# # --- Copyright (c) 2024-2025 Linagora
+# # licence       : GPL v3
+# # - Flavien Perez fperez@linagora.com
+# # - Maïlys Jara mjara@linagora.com
+
+"""Journal of the actions done on projects.
+
+The journal is a JSON lines file: one line is appended, and flushed, for each
+project as soon as the action on it is done or has failed, so that an interrupted
+or partly failed run can be started again without acting twice on a project.
+"""
+
+import json
+import threading
+from datetime import datetime
+from datetime import timezone
+from pathlib import Path
+from typing import Optional
+from typing import TextIO
+
+from gitlab_monitor.logger.logger import logger
+
+
+class ProjectJournal:
+    """Append-only record of the outcome of an action on each project."""
+
+    def __init__(self, path: str, action: str) -> None:
+        """Constructor of the ProjectJournal class.
+
+        :param path: path of the journal file, created if it doesn't exist.
+        :type path: str
+        :param action: name of the action recorded, e.g. `archive`.
+        :type action: str
+        """
+        self.path = path
+        self._action = action
+        self._file: Optional[TextIO] = None
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> "ProjectJournal":
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        # pylint: disable=consider-using-with
+        self._file = open(self.path, "a", encoding="utf-8")
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def done_ids(self) -> set[int]:
+        """Get the ids of the projects whose last recorded action succeeded.
+
+        :return: the ids of the projects on which the action is done.
+        :rtype: set[int]
+        """
+        done: set[int] = set()
+        if not Path(self.path).exists():
+            return done
+        with open(self.path, "r", encoding="utf-8") as file:
+            for number, line in enumerate(file, start=1):
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # The last line of a journal interrupted while writing it.
+                    logger.warning(
+                        "Line %d of the journal %s is not valid, it is ignored.",
+                        number,
+                        self.path,
+                    )
+                    continue
+                if entry.get("action") != self._action:
+                    continue
+                if entry.get("error") is None:
+                    done.add(int(entry["project_id"]))
+                else:
+                    done.discard(int(entry["project_id"]))
+        return done
+
+    def record(self, project_id: int, error: Optional[str] = None) -> None:
+        """Append the outcome of the action on a project.
+
+        :param project_id: id of the project.
+        :type project_id: int
+        :param error: error message if the action failed, defaults to None
+        :type error: Optional[str], optional
+        """
+        if self._file is None:
+            raise ValueError("The journal must be opened with a with statement")
+        entry = {
+            "project_id": project_id,
+            "action": self._action,
+            "error": error,
+            "at": datetime.now(timezone.utc).isoformat(),
+        }
+        with self._lock:
+            self._file.write(json.dumps(entry) + "\n")
+            self._file.flush()
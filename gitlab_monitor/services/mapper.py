@@ -33,6 +33,7 @@ class Mapper:
         visibility = project_data.visibility
         created_at = datetime.fromisoformat(project_data.created_at)
         updated_at = datetime.fromisoformat(project_data.updated_at)
+        last_activity_at = datetime.fromisoformat(project_data.last_activity_at)
 
         return ProjectDTO(
             project_id=project_id,
@@ -43,6 +44,7 @@ class Mapper:
             visibility=visibility,
             created_at=created_at,
             updated_at=updated_at,
+            last_activity_at=last_activity_at,
         )
 
     def commit_from_gitlab_api(
@@ -69,3 +71,27 @@ class Mapper:
             date=date,
             author=author,
         )
+
+    def commit_from_gitlab_api_list(
+        self, commit_data: RESTObject, project_id: int
+    ) -> CommitDTO:
+        """Transform a commit from the commits list of the gitlab API to a
+        CommitDTO, without the commit details.
+
+        The commits list already contains the authored date and the author name,
+        only the project id has to be given.
+
+        :param commit_data: commit data from the commits list of the gitlab API
+        :type commit_data: RESTObject
+        :param project_id: id of the project the commit belongs to
+        :type project_id: int
+        :return: commit in DTO format
+        :rtype: CommitDTO
+        """
+        return CommitDTO(
+            commit_id=commit_data.id,
+            message=commit_data.title,
+            project_id=project_id,
+            date=datetime.fromisoformat(commit_data.authored_date),
+            author=commit_data.author_name,
+        )
@@ -0,0 +1,144 @@
+# # --- Copyright (c) 2024-2025 Linagora
+# # licence       : GPL v3
+# # - Flavien Perez fperez@linagora.com
+# # - Maïlys Jara mjara@linagora.com
+
+"""Stages of the pipelines moving data from the GitLab API to the database.
+
+A stage iterates over its input in a thread of its own and hands the elements to
+the next stage through a bounded queue: the stage is paused while the queue is
+full, so the API requests go on while the database writes a batch, and the number
+of elements waiting between two stages is capped by the size of the queue.
+"""
+
+import queue
+import threading
+from collections import deque
+from collections.abc import Iterable
+from collections.abc import Iterator
+from typing import Any
+from typing import TypeVar
+
+
+T = TypeVar("T")
+
+# Number of seconds between two checks that the consumer still waits for elements.
+_PUT_TIMEOUT = 0.1
+
+# Marker of the end of the input of a stage.
+_END = object()
+
+
+def stage(iterable: Iterable[T], maxsize: int) -> Iterator[T]:
+    """Iterate over an iterable in a thread, at most `maxsize` elements ahead of
+    the consumer.
+
+    An exception raised by the iterable, including the `SystemExit` of a service
+    error, is raised again to the consumer once the elements before it are
+    consumed. When the consumer stops early, the thread stops at its next element.
+
+    :param iterable: the elements to produce, consumed in the thread.
+    :type iterable: Iterable[T]
+    :param maxsize: maximum number of elements waiting for the consumer.
+    :type maxsize: int
+    :return: the elements, in the order of the iterable.
+    :rtype: Iterator[T]
+    """
+    stopped = threading.Event()
+    try:
+        yield from _consume(_produce(iterable, maxsize, stopped))
+    finally:
+        stopped.set()
+
+
+def chain_stages(
+    iterables: Iterable[Iterable[T]], maxsize: int, concurrency: int
+) -> Iterator[T]:
+    """Iterate over several iterables one after the other, each one in a thread of
+    its own, with up to `concurrency` iterables produced at the same time.
+
+    Like `stage`, each thread is at most `maxsize` elements ahead of the consumer,
+    so that at most `concurrency * maxsize` elements wait in memory.
+
+    :param iterables: the iterables whose elements are produced.
+    :type iterables: Iterable[Iterable[T]]
+    :param maxsize: maximum number of elements of an iterable waiting for the
+        consumer.
+    :type maxsize: int
+    :param concurrency: maximum number of iterables produced at the same time.
+    :type concurrency: int
+    :return: the elements of each iterable, in the order of the iterables.
+    :rtype: Iterator[T]
+    """
+    stopped = threading.Event()
+    pending: deque[queue.Queue] = deque()
+    try:
+        for iterable in iterables:
+            pending.append(_produce(iterable, maxsize, stopped))
+            if len(pending) >= concurrency:
+                yield from _consume(pending.popleft())
+        while pending:
+            yield from _consume(pending.popleft())
+    finally:
+        stopped.set()
+
+
+def _produce(iterable: Iterable, maxsize: int, stopped: threading.Event) -> queue.Queue:
+    """Start a thread iterating over an iterable into a bounded queue.
+
+    :param iterable: the elements to produce, consumed in the thread.
+    :type iterable: Iterable
+    :param maxsize: maximum number of elements waiting in the queue.
+    :type maxsize: int
+    :param stopped: set when the consumer stops, to stop the thread.
+    :type stopped: threading.Event
+    :return: the queue of the elements, ended by `_END` and the error raised by
+        the iterable, if any.
+    :rtype: queue.Queue
+    """
+    elements: queue.Queue = queue.Queue(maxsize=max(maxsize, 1))
+
+    def put(element: Any) -> bool:
+        while not stopped.is_set():
+            try:
+                elements.put(element, timeout=_PUT_TIMEOUT)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce() -> None:
+        iterator = iter(iterable)
+        try:
+            for element in iterator:
+                if not put((element, None)):
+                    return
+            put((_END, None))
+        except BaseException as e:  # pylint: disable=broad-exception-caught
+            put((_END, e))
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+
+    threading.Thread(target=produce, daemon=True).start()
+    return elements
+
+
+def _consume(elements: queue.Queue) -> Iterator:
+    """Get the elements of a queue filled by `_produce`.
+
+    :param elements: the queue of the elements.
+    :type elements: queue.Queue
+    :raises BaseException: the error raised by the iterable, once the elements
+        before it are consumed.
+    :return: the elements, until the end of the iterable.
+    :rtype: Iterator
+    """
+    while True:
+        element, error = elements.get()
+        if element is _END:
+            if error is not None:
+                raise error
+            return
+        yield element
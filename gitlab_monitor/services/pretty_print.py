@@ -10,6 +10,7 @@ from abc import ABC
 from abc import abstractmethod
 
 from gitlab_monitor.services.dto import CommitDTO
+from gitlab_monitor.services.dto import CommitsScanDTO
 from gitlab_monitor.services.dto import ProjectDTO
 
 
@@ -24,11 +25,16 @@ class MyPrettyPrint(ABC):
         :type dto: object
         """
 
-    def print_dto_list(self, dto_list, dto_type) -> None:
+    def print_dto_list(self, dto_list, dto_type) -> int:
         """Prints the list of DTOs in a pretty format.
 
+        Each DTO is printed as soon as it is produced, so `dto_list` can be a
+        generator.
+
         :param dto_list: The list of data transfer objects to pretty print.
-        :type dto_list: list
+        :type dto_list: Iterable
+        :return: The number of DTOs printed.
+        :rtype: int
         """
         print("\n--------------------")
         print(f"  List of {dto_type}: ")
@@ -40,6 +46,7 @@ class MyPrettyPrint(ABC):
             self.print_dto(dto)
             print("-" * 75)
             index += 1
+        return index
 
 
 class PrintProjectDTO(MyPrettyPrint):
@@ -83,3 +90,49 @@ class PrintCommitDTO(MyPrettyPrint):
         print(f"  Message    : {dto.message}")
         print(f"  Date       : {dto.date}")
         print(f"  Author     : {dto.author}\n")
+
+
+class PrintCommitsScanDTO(MyPrettyPrint):
+    """Class to pretty print the summary of the scan of the commits of many
+    projects."""
+
+    def print_dto(self, dto) -> None:
+        """Prints the CommitsScanDTO as one line of the summary.
+
+        :param dto: The data transfer object to pretty print.
+        :type dto: object
+        """
+        if not isinstance(dto, CommitsScanDTO):
+            raise TypeError("Expected a CommitsScanDTO object.")
+
+        status = "failed" if dto.failed else f"{dto.throughput:.1f}"
+        print(
+            f"  {dto.project_id:>10} | {dto.name[:30]:<30} | {dto.commits:>8} | "
+            f"{dto.duration:>9.1f} | {status:>9}"
+        )
+
+    def print_summary(self, dto_list: list[CommitsScanDTO], duration: float) -> None:
+        """Prints one line per project, then the totals of the scan.
+
+        :param dto_list: The outcome of the scan of each project.
+        :type dto_list: list[CommitsScanDTO]
+        :param duration: Number of seconds of the whole scan.
+        :type duration: float
+        """
+        print("\n--------------------")
+        print("  Commits scan summary: ")
+        print("--------------------")
+        print(
+            f"  {'Project ID':>10} | {'Name':<30} | {'Commits':>8} | "
+            f"{'Time (s)':>9} | {'Commits/s':>9}"
+        )
+        for dto in dto_list:
+            self.print_dto(dto)
+        print("-" * 80)
+        commits = sum(dto.commits for dto in dto_list)
+        failed = sum(1 for dto in dto_list if dto.failed)
+        print(
+            f"  {len(dto_list)} projects, {failed} failed, {commits} commits in "
+            f"{duration:.1f} s ({commits / duration if duration > 0 else 0.0:.1f} "
+            "commits/s)\n"
+        )
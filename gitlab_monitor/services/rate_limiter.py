@@ -0,0 +1,343 @@
+# # --- Copyright (c) 2024-2025 Linagora
+# # licence       : GPL v3
+# # - Flavien Perez fperez@linagora.com
+# # - Maïlys Jara mjara@linagora.com
+
+"""Scheduling of the requests sent to the GitLab API under its rate limit.
+
+Every request of the GitLab service, whatever the thread sending it, takes a token
+from a shared bucket. The bucket is refilled at the rate allowed by the
+`RateLimit-Remaining` and `RateLimit-Reset` headers of the responses, a little
+below it, so that concurrent scans spread their requests over the rate limit
+window instead of exhausting it. A request rejected with 429 pauses the bucket for
+the `Retry-After` delay, or a jittered exponential backoff, then is sent again.
+
+The requests which failed on a connection error or a transient server error are
+also sent again by the adapter, rather than by urllib3 below it, so that every
+attempt takes a token: the retries are counted by the rate limiter precisely when
+the server is under pressure.
+"""
+
+import os
+import random
+import threading
+import time
+from collections.abc import Callable
+from collections.abc import Mapping
+from email.utils import parsedate_to_datetime
+from typing import Optional
+from typing import Union
+
+from dotenv import load_dotenv
+from requests import PreparedRequest
+from requests import Response
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ConnectionError
+from requests.exceptions import ConnectTimeout
+from requests.exceptions import Timeout
+
+from gitlab_monitor.logger.logger import logger
+
+
+load_dotenv()
+
+# Share of the remaining requests left unused, so that the scans stay under the
+# rate limit despite the requests sent by other clients of the same user.
+DEFAULT_MARGIN = float(os.getenv("GITLAB_RATE_LIMIT_MARGIN", "0.1"))
+# Maximum number of requests sent at once after an idle period.
+DEFAULT_BURST = 10
+# Number of times a request rejected by the rate limiter is sent again.
+DEFAULT_RETRIES = int(os.getenv("GITLAB_RATE_LIMIT_RETRIES", "5"))
+# Delay, in seconds, of the first backoff, doubled at each retry.
+DEFAULT_BACKOFF = 1.0
+# Maximum delay, in seconds, of a backoff.
+MAX_BACKOFF = 60.0
+# Delay, in seconds, of the first backoff after a connection error or a transient
+# server error, doubled at each retry.
+DEFAULT_TRANSPORT_BACKOFF = 0.5
+
+# Server errors after which an idempotent request is sent again. The 429 responses
+# are handled by the rate limiter.
+TRANSIENT_STATUSES = frozenset({500, 502, 503, 504})
+# Methods of the requests which may be sent again after they reached the server.
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+
+class RateLimiter:
+    """Token bucket shared by the threads sending requests to the GitLab API.
+
+    The rate is unlimited until a response gives the rate limit of the instance.
+    """
+
+    def __init__(
+        self,
+        margin: float = DEFAULT_MARGIN,
+        burst: int = DEFAULT_BURST,
+        clock: Callable[[], float] = time.time,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        """Constructor of the RateLimiter class.
+
+        :param margin: share of the remaining requests left unused, defaults to
+            DEFAULT_MARGIN
+        :type margin: float, optional
+        :param burst: maximum number of tokens in the bucket, defaults to
+            DEFAULT_BURST
+        :type burst: int, optional
+        :param clock: current time in seconds since the epoch, defaults to time.time
+        :type clock: Callable[[], float], optional
+        :param sleep: waits for a number of seconds, defaults to time.sleep
+        :type sleep: Callable[[float], None], optional
+        """
+        self._margin = margin
+        self._burst = burst
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._rate: Optional[float] = None
+        self._tokens = float(burst)
+        self._refilled_at = clock()
+        self._paused_until = 0.0
+
+    @property
+    def rate(self) -> Optional[float]:
+        """Number of requests allowed per second, None if unlimited."""
+        return self._rate
+
+    def acquire(self) -> None:
+        """Wait until a request can be sent."""
+        while (wait := self.try_acquire()) > 0:
+            self._sleep(wait)
+
+    def try_acquire(self) -> float:
+        """Take a token if one is available, without waiting.
+
+        :return: 0 if a request can be sent, otherwise the number of seconds to
+            wait before trying again.
+        :rtype: float
+        """
+        with self._lock:
+            now = self._clock()
+            wait = self._paused_until - now
+            if wait > 0:
+                return wait
+            self._refill(now)
+            if self._rate is None:
+                return 0.0
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self._rate
+
+    def update(self, headers: Mapping[str, str]) -> None:
+        """Adapt the rate to the rate limit headers of a response.
+
+        :param headers: headers of a response of the GitLab API.
+        :type headers: Mapping[str, str]
+        """
+        try:
+            remaining = int(headers["RateLimit-Remaining"])
+            reset = float(headers["RateLimit-Reset"])
+        except (KeyError, ValueError):
+            return
+        with self._lock:
+            now = self._clock()
+            self._refill(now)
+            if remaining <= 0:
+                # The rate of the next window is given by its first response.
+                self._paused_until = max(self._paused_until, reset)
+                self._rate = None
+                self._tokens = 0.0
+                return
+            window = max(reset - now, 1.0)
+            self._rate = remaining * (1 - self._margin) / window
+
+    def pause(self, delay: float) -> None:
+        """Hold every request for a delay.
+
+        :param delay: number of seconds to wait.
+        :type delay: float
+        """
+        with self._lock:
+            self._paused_until = max(self._paused_until, self._clock() + delay)
+            self._tokens = 0.0
+
+    def _refill(self, now: float) -> None:
+        """Add the tokens earned since the last refill.
+
+        :param now: current time.
+        :type now: float
+        """
+        if self._rate is not None:
+            self._tokens = min(
+                self._tokens + (now - self._refilled_at) * self._rate, self._burst
+            )
+        self._refilled_at = now
+
+
+class RateLimitedAdapter(HTTPAdapter):
+    """Transport adapter sending the requests through a rate limiter, and sending
+    again the requests rejected by the rate limiter of the GitLab instance or
+    failed on a transient error."""
+
+    def __init__(
+        self,
+        limiter: RateLimiter,
+        retries: int = DEFAULT_RETRIES,
+        backoff: float = DEFAULT_BACKOFF,
+        transport_retries: int = 0,
+        transport_backoff: float = DEFAULT_TRANSPORT_BACKOFF,
+        **kwargs,
+    ) -> None:
+        """Constructor of the RateLimitedAdapter class.
+
+        :param limiter: rate limiter shared by the requests.
+        :type limiter: RateLimiter
+        :param retries: number of times a rejected request is sent again, defaults
+            to DEFAULT_RETRIES
+        :type retries: int, optional
+        :param backoff: delay, in seconds, of the first backoff, defaults to
+            DEFAULT_BACKOFF
+        :type backoff: float, optional
+        :param transport_retries: number of times a request is sent again after a
+            connection error or a transient server error, defaults to 0
+        :type transport_retries: int, optional
+        :param transport_backoff: delay, in seconds, of the first backoff after a
+            connection error or a transient server error, defaults to
+            DEFAULT_TRANSPORT_BACKOFF
+        :type transport_backoff: float, optional
+        """
+        super().__init__(**kwargs)
+        self.limiter = limiter
+        self._retries = retries
+        self._backoff = backoff
+        self.transport_retries = transport_retries
+        self._transport_backoff = transport_backoff
+
+    def send(
+        self,
+        request: PreparedRequest,
+        stream: bool = False,
+        timeout: Union[None, float, tuple[float, float], tuple[float, None]] = None,
+        verify: Union[bool, str] = True,
+        cert: Union[
+            None, bytes, str, tuple[Union[bytes, str], Union[bytes, str]]
+        ] = None,
+        proxies: Optional[Mapping[str, str]] = None,
+    ) -> Response:
+        """Send a request when the rate limiter allows it, each attempt taking a
+        token.
+
+        A request rejected with 429 is sent again once the rate limiter is paused.
+        A request which failed on a connection error, or an idempotent request which
+        failed on a read error or a transient server error, is sent again after a
+        jittered backoff, up to `transport_retries` times.
+
+        See `HTTPAdapter.send` for the parameters.
+
+        :return: the response, rejected or failed only if the retries are
+            exhausted.
+        :rtype: Response
+        """
+        attempt = failures = 0
+        while True:
+            self.limiter.acquire()
+            try:
+                response = super().send(request, stream, timeout, verify, cert, proxies)
+            except (ConnectionError, Timeout) as e:
+                if failures >= self.transport_retries or not (
+                    isinstance(e, ConnectTimeout)
+                    or request.method in IDEMPOTENT_METHODS
+                ):
+                    raise
+                failures = self._wait_transport_retry(request, failures, e)
+                continue
+            self.limiter.update(response.headers)
+            if (
+                response.status_code in TRANSIENT_STATUSES
+                and request.method in IDEMPOTENT_METHODS
+                and failures < self.transport_retries
+            ):
+                response.close()
+                failures = self._wait_transport_retry(
+                    request, failures, response.status_code
+                )
+                continue
+            if response.status_code != 429 or attempt >= self._retries:
+                return response
+            delay = retry_after(response.headers)
+            if delay is None:
+                delay = jittered_backoff(attempt, self._backoff)
+            attempt += 1
+            logger.warning(
+                "Rate limit of the GitLab API reached, request sent again in %.1f \
+seconds (%d/%d).",
+                delay,
+                attempt,
+                self._retries,
+            )
+            response.close()
+            self.limiter.pause(delay)
+
+    def _wait_transport_retry(
+        self, request: PreparedRequest, failures: int, error: object
+    ) -> int:
+        """Wait before sending again a request which failed on a transient error.
+
+        :param request: request which failed.
+        :type request: PreparedRequest
+        :param failures: number of transient errors of the request so far.
+        :type failures: int
+        :param error: the error or the status code of the response.
+        :type error: object
+        :return: the number of transient errors of the request, this one included.
+        :rtype: int
+        """
+        delay = jittered_backoff(failures, self._transport_backoff)
+        failures += 1
+        logger.debug(
+            "Request %s %s failed (%s), sent again in %.1f seconds (%d/%d).",
+            request.method,
+            request.url,
+            error,
+            delay,
+            failures,
+            self.transport_retries,
+        )
+        time.sleep(delay)
+        return failures
+
+
+def retry_after(headers: Mapping[str, str]) -> Optional[float]:
+    """Read the delay of the `Retry-After` header, in seconds or as an HTTP date.
+
+    :param headers: headers of a response.
+    :type headers: Mapping[str, str]
+    :return: the number of seconds to wait, None if the header is missing.
+    :rtype: Optional[float]
+    """
+    value = headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def jittered_backoff(attempt: int, backoff: float = DEFAULT_BACKOFF) -> float:
+    """Delay before sending a request again, drawn between zero and an exponential
+    bound, so that the threads rejected together don't retry together.
+
+    :param attempt: number of retries already made.
+    :type attempt: int
+    :param backoff: delay of the first backoff, defaults to DEFAULT_BACKOFF
+    :type backoff: float, optional
+    :return: the number of seconds to wait.
+    :rtype: float
+    """
+    return random.uniform(0, min(MAX_BACKOFF, backoff * 2**attempt))
@@ -0,0 +1,83 @@
+# # --- Copyright (c) 2024-2025 Linagora
+# # licence       : GPL v3
+# # - Flavien Perez fperez@linagora.com
+# # - Maïlys Jara mjara@linagora.com
+
+"""HTTP transport of the GitLab service.
+
+The `requests` session given to python-gitlab keeps a pool of connections alive
+with at least one connection per concurrent job, so that the parallel modes don't
+open and close a connection for each request, and retries the idempotent requests
+which failed on a connection error or a transient server error. The rate limiter,
+and the cache when it is enabled, are part of the transport adapter, which also
+sends the failed requests again, so that every attempt goes through the rate
+limiter.
+"""
+
+import os
+from typing import Optional
+
+import requests
+from dotenv import load_dotenv
+
+from gitlab_monitor.services.http_cache import CACHE_PATH
+from gitlab_monitor.services.http_cache import CachingAdapter
+from gitlab_monitor.services.http_cache import HTTPCache
+from gitlab_monitor.services.rate_limiter import RateLimitedAdapter
+from gitlab_monitor.services.rate_limiter import RateLimiter
+
+
+load_dotenv()
+
+# Number of seconds to wait for the connection to the GitLab instance.
+CONNECT_TIMEOUT = float(os.getenv("GITLAB_CONNECT_TIMEOUT", "10"))
+# Number of seconds to wait for the data of a response.
+READ_TIMEOUT = float(os.getenv("GITLAB_READ_TIMEOUT", "60"))
+# Number of times an idempotent request is sent again after a connection error or
+# a transient server error.
+TRANSPORT_RETRIES = int(os.getenv("GITLAB_TRANSPORT_RETRIES", "3"))
+# Minimum number of connections kept alive, raised to the number of jobs.
+DEFAULT_POOL_SIZE = 10
+
+
+def build_session(
+    rate_limiter: RateLimiter,
+    pool_size: int = DEFAULT_POOL_SIZE,
+    cache: Optional[HTTPCache] = None,
+) -> requests.Session:
+    """Build the session of the requests to the GitLab API.
+
+    :param rate_limiter: rate limiter shared by the requests.
+    :type rate_limiter: RateLimiter
+    :param pool_size: number of connections kept alive, defaults to
+        DEFAULT_POOL_SIZE
+    :type pool_size: int, optional
+    :param cache: cache of the responses, defaults to None
+    :type cache: Optional[HTTPCache], optional
+    :return: the session.
+    :rtype: requests.Session
+    """
+    pool_maxsize = max(pool_size, DEFAULT_POOL_SIZE)
+    # The last response is returned to python-gitlab, which reports the error.
+    adapter: RateLimitedAdapter
+    if cache is not None:
+        adapter = CachingAdapter(
+            rate_limiter,
+            cache,
+            transport_retries=TRANSPORT_RETRIES,
+            pool_connections=1,
+            pool_maxsize=pool_maxsize,
+        )
+    else:
+        adapter = RateLimitedAdapter(
+            rate_limiter,
+            transport_retries=TRANSPORT_RETRIES,
+            pool_connections=1,
+            pool_maxsize=pool_maxsize,
+        )
+
+    # requests already asks for responses compressed with gzip or deflate.
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
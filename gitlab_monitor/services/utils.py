@@ -0,0 +1,31 @@
+# # --- Copyright (c) 2024-2025 Linagora
+# # licence       : GPL v3
+# # - Flavien Perez fperez@linagora.com
+# # - Maïlys Jara mjara@linagora.com
+
+"""Module with small helpers shared by the services and the controller."""
+
+from collections.abc import Iterable
+from collections.abc import Iterator
+from itertools import islice
+from typing import TypeVar
+
+
+T = TypeVar("T")
+
+
+def batched(iterable: Iterable[T], size: int) -> Iterator[list[T]]:
+    """Split an iterable into lists of at most `size` elements.
+
+    The iterable is consumed lazily, so only one batch is held in memory at a time.
+
+    :param iterable: the elements to split.
+    :type iterable: Iterable[T]
+    :param size: maximum number of elements in a batch.
+    :type size: int
+    :return: the batches, in the order of the iterable.
+    :rtype: Iterator[list[T]]
+    """
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
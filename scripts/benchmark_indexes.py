@@ -0,0 +1,187 @@
+# # --- Copyright (c) 2024-2025 Linagora
+# # licence       : GPL v3
+# # - Flavien Perez fperez@linagora.com
+# # - Maïlys Jara mjara@linagora.com
+"""
+Run this script to measure the latency of the analytical queries on the project and
+commit tables, without and with the indexes declared in the models.
+
+The tables are created in a separate schema ("benchmark_indexes" by default) of the
+database configured by the DB_* environment variables, filled with a synthetic
+dataset, and dropped at the end: the tables of gitlab_monitor are not read nor
+written.
+
+    poetry run python scripts/benchmark_indexes.py --projects 5000 --commits 2000000
+"""
+
+import argparse
+import statistics
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy import text
+
+from gitlab_monitor.services.bdd.bdd import DB_URL
+from gitlab_monitor.services.bdd.models import Commit
+from gitlab_monitor.services.bdd.models import Project
+
+
+TABLES = """
+CREATE TABLE project (
+    project_id INTEGER PRIMARY KEY,
+    name VARCHAR NOT NULL,
+    path VARCHAR,
+    visibility VARCHAR,
+    updated_at TIMESTAMP,
+    last_activity_at TIMESTAMP
+);
+CREATE TABLE commit (
+    commit_id VARCHAR PRIMARY KEY,
+    project_id INTEGER REFERENCES project (project_id),
+    message TEXT,
+    date TIMESTAMP,
+    author VARCHAR
+);
+"""
+
+# Commits spread over 5 years, written in the order of a scan: the projects are
+# scanned by waves of `workers` projects, the commits of each project from the
+# newest to the oldest, by batches interleaved with the batches of the other
+# projects of the wave. Projects last active at any time of these years.
+DATASET = """
+SELECT setseed(0.42);
+INSERT INTO project (project_id, name, path, visibility, updated_at, last_activity_at)
+SELECT i, 'project-' || i, 'group-' || i % 50 || '/project-' || i,
+       (ARRAY['public', 'internal', 'private'])[1 + i % 3], activity, activity
+FROM (
+    SELECT i, timestamp '2020-01-01' + random() * interval '1825 days' AS activity
+    FROM generate_series(1, :projects) AS i
+) AS projects;
+INSERT INTO commit (commit_id, project_id, message, date, author)
+SELECT commit_id, project_id, message, date, author
+FROM (
+    SELECT md5(i::text) AS commit_id,
+           1 + floor(random() * :projects)::int AS project_id,
+           'Commit ' || i AS message,
+           timestamp '2020-01-01' + random() * interval '1825 days' AS date,
+           'author-' || floor(random() * :authors)::int AS author
+    FROM generate_series(1, :commits) AS i
+) AS commits
+ORDER BY (project_id - 1) / :workers,
+         (row_number() OVER (PARTITION BY project_id ORDER BY date DESC) - 1)
+             / :batch_size,
+         project_id,
+         date DESC;
+ANALYZE project;
+ANALYZE commit;
+"""
+
+QUERIES = {
+    "commits of a project": "SELECT count(*) FROM commit WHERE project_id = 42",
+    "last commits of a project": (
+        "SELECT commit_id, date FROM commit WHERE project_id = 42 "
+        "AND date >= timestamp '2024-01-01' ORDER BY date DESC LIMIT 100"
+    ),
+    "commits per day over a month": (
+        "SELECT date_trunc('day', date), count(*) FROM commit "
+        "WHERE date >= timestamp '2023-03-01' AND date < timestamp '2023-04-01' "
+        "GROUP BY 1"
+    ),
+    "commits of an author": "SELECT count(*) FROM commit WHERE author = 'author-42'",
+    "projects unused since a date": (
+        "SELECT project_id FROM project "
+        "WHERE last_activity_at < timestamp '2020-03-01' ORDER BY last_activity_at"
+    ),
+}
+
+
+def measure(connection, repeat):
+    """Return the median latency of each query, in milliseconds."""
+    latencies = {}
+    for name, query in QUERIES.items():
+        connection.execute(text(query)).all()  # warm the cache
+        durations = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            connection.execute(text(query)).all()
+            durations.append((time.perf_counter() - start) * 1000)
+        latencies[name] = statistics.median(durations)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--projects", type=int, default=5_000)
+    parser.add_argument("--commits", type=int, default=1_000_000)
+    parser.add_argument("--authors", type=int, default=2_000)
+    parser.add_argument(
+        "--workers", type=int, default=4, help="projects scanned concurrently"
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=500, help="commits saved per statement"
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--schema", default="benchmark_indexes")
+    parser.add_argument(
+        "--keep", action="store_true", help="keep the schema of the benchmark"
+    )
+    args = parser.parse_args()
+
+    engine = create_engine(DB_URL)
+    with engine.connect() as connection:
+        connection.execute(text(f'DROP SCHEMA IF EXISTS "{args.schema}" CASCADE'))
+        connection.execute(text(f'CREATE SCHEMA "{args.schema}"'))
+        connection.execute(text(f'SET search_path TO "{args.schema}"'))
+        try:
+            print(
+                f"Loading {args.projects} projects and {args.commits} commits "
+                f"in schema {args.schema}..."
+            )
+            connection.execute(text(TABLES))
+            for statement in filter(str.strip, DATASET.split(";")):
+                connection.execute(
+                    text(statement),
+                    {
+                        "projects": args.projects,
+                        "commits": args.commits,
+                        "authors": args.authors,
+                        "workers": args.workers,
+                        "batch_size": args.batch_size,
+                    },
+                )
+            connection.commit()
+            before = measure(connection, args.repeat)
+
+            print("Creating the indexes of the models...")
+            for index in [*Project.__table__.indexes, *Commit.__table__.indexes]:
+                index.create(connection)
+                size = connection.execute(
+                    text(
+                        "SELECT pg_size_pretty("
+                        "pg_relation_size(CAST(:name AS regclass)))"
+                    ),
+                    {"name": index.name},
+                ).scalar()
+                print(f"  {index.name}: {size}")
+            connection.execute(text("ANALYZE project; ANALYZE commit"))
+            connection.commit()
+            after = measure(connection, args.repeat)
+        finally:
+            if not args.keep:
+                connection.rollback()
+                connection.execute(
+                    text(f'DROP SCHEMA IF EXISTS "{args.schema}" CASCADE')
+                )
+                connection.commit()
+
+    print(f"\n  {'Query':<32} | {'Before (ms)':>11} | {'After (ms)':>10} | Speedup")
+    print("-" * 75)
+    for name, latency in before.items():
+        print(
+            f"  {name:<32} | {latency:>11.2f} | {after[name]:>10.2f} | "
+            f"{latency / after[name]:>6.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
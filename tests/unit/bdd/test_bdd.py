@@ -5,8 +5,13 @@
 from unittest.mock import MagicMock
 from unittest.mock import patch
 
+import pytest
 from sqlalchemy.orm import Session
 
+from gitlab_monitor.services.bdd.bdd import DB_MAX_OVERFLOW
+from gitlab_monitor.services.bdd.bdd import DB_POOL_PRE_PING
+from gitlab_monitor.services.bdd.bdd import DB_POOL_RECYCLE
+from gitlab_monitor.services.bdd.bdd import DB_POOL_SIZE
 from gitlab_monitor.services.bdd.bdd import DB_URL
 from gitlab_monitor.services.bdd.bdd import Database
 
@@ -17,29 +22,68 @@ def test_database_initialization():
     assert db._session is None
 
 
+@pytest.fixture(autouse=True)
+def dispose_database():
+    """Forget the engine shared by the process between tests."""
+    Database.dispose()
+    yield
+    Database.dispose()
+
+
 @patch("gitlab_monitor.services.bdd.bdd.create_engine")
-@patch("gitlab_monitor.services.bdd.bdd.Base.metadata.create_all")
-def test_initialize_database(mock_create_all, mock_create_engine):
+@patch("gitlab_monitor.services.bdd.bdd.check_schema_version")
+def test_initialize_database(mock_check_schema_version, mock_create_engine):
     """Test the _initialize_database method."""
     mock_engine = MagicMock()
     mock_session = MagicMock()
 
     mock_create_engine.return_value = mock_engine
-    mock_engine.connect.return_value = True
     mock_sessionmaker = MagicMock(return_value=mock_session)
 
     with patch("gitlab_monitor.services.bdd.bdd.sessionmaker", mock_sessionmaker):
         db = Database()
         session = db._initialize_database()
 
-        mock_create_engine.assert_called_once_with(DB_URL)
-        mock_engine.connect.assert_called_once()
-        mock_create_all.assert_called_once_with(bind=mock_engine)
+        mock_create_engine.assert_called_once_with(
+            DB_URL,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_pre_ping=DB_POOL_PRE_PING,
+            pool_recycle=DB_POOL_RECYCLE,
+        )
+        mock_check_schema_version.assert_called_once_with(mock_engine)
         mock_sessionmaker.assert_called_once_with(bind=mock_engine)
 
         assert session == mock_session()
 
 
+@patch("gitlab_monitor.services.bdd.bdd.create_engine")
+@patch("gitlab_monitor.services.bdd.bdd.check_schema_version")
+def test_engine_shared_by_databases(mock_check_schema_version, mock_create_engine):
+    """The engine and the session factory are created once per process."""
+    with patch("gitlab_monitor.services.bdd.bdd.sessionmaker") as mock_sessionmaker:
+        first_session = Database()._initialize_database()
+        second_session = Database()._initialize_database()
+
+    mock_create_engine.assert_called_once()
+    mock_check_schema_version.assert_called_once()
+    mock_sessionmaker.assert_called_once()
+    assert first_session is second_session is mock_sessionmaker.return_value()
+
+
+@patch("gitlab_monitor.services.bdd.bdd.create_engine")
+@patch("gitlab_monitor.services.bdd.bdd.check_schema_version")
+def test_dispose(mock_check_schema_version, mock_create_engine):
+    """Dispose closes the pool, the next call creates a new engine."""
+    engine = Database.get_engine()
+
+    Database.dispose()
+
+    engine.dispose.assert_called_once()
+    Database.get_engine()
+    assert mock_create_engine.call_count == 2
+
+
 @patch.object(Database, "_initialize_database", return_value=MagicMock(spec=Session))
 def test_session_property(mock_initialize_database):
     """Test the session property."""
@@ -52,3 +96,16 @@ def test_session_property(mock_initialize_database):
     session_again = db.session
     assert session_again == session
     mock_initialize_database.assert_called_once()
+
+
+@patch("gitlab_monitor.services.bdd.bdd.create_engine")
+@patch("gitlab_monitor.services.bdd.bdd.check_schema_version")
+@patch("gitlab_monitor.services.bdd.bdd.upgrade_schema", return_value=(0, 1))
+def test_upgrade(mock_upgrade_schema, mock_check_schema_version, mock_create_engine):
+    """The upgrade doesn't check the schema, the sessions created after it neither."""
+    assert Database.upgrade() == (0, 1)
+
+    mock_upgrade_schema.assert_called_once_with(mock_create_engine.return_value)
+    with patch("gitlab_monitor.services.bdd.bdd.sessionmaker"):
+        Database()._initialize_database()
+    mock_check_schema_version.assert_not_called()
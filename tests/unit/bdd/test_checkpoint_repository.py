@@ -0,0 +1,89 @@
+# # --- Copyright (c) 2024-2025 Linagora
+# # licence       : GPL v3
+# # - Flavien Perez fperez@linagora.com
+# # - Maïlys Jara mjara@linagora.com
+import json
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+from unittest.mock import MagicMock
+
+import pytest
+from sqlalchemy.exc import SQLAlchemyError
+
+from gitlab_monitor.services.bdd.checkpoint_repository import Checkpoint
+from gitlab_monitor.services.bdd.checkpoint_repository import (
+    SQLAlchemyCheckpointRepository,
+)
+from gitlab_monitor.services.bdd.models import ScanCheckpoint
+
+
+SCOPE = "commits:1"
+
+
+@pytest.fixture
+def checkpoint_repository():
+    return SQLAlchemyCheckpointRepository(MagicMock())
+
+
+def test_get_checkpoint(checkpoint_repository):
+    checkpoint_repository.session.get.return_value = ScanCheckpoint(
+        scope=SCOPE,
+        cursor="42",
+        started_at=datetime(2024, 5, 1, 12, 0),
+        context='{"params": {"since": null}}',
+    )
+
+    result = checkpoint_repository.get(SCOPE)
+
+    assert result == Checkpoint(
+        cursor="42",
+        started_at=datetime(2024, 5, 1, 12, 0, tzinfo=timezone.utc),
+        context={"params": {"since": None}},
+    )
+    checkpoint_repository.session.get.assert_called_once_with(ScanCheckpoint, SCOPE)
+
+
+def test_get_checkpoint_no_scan_in_progress(checkpoint_repository):
+    checkpoint_repository.session.get.return_value = None
+
+    assert checkpoint_repository.get(SCOPE) is None
+
+
+def test_save_checkpoint(checkpoint_repository):
+    started_at = datetime(2024, 5, 1, 14, 0, tzinfo=timezone(timedelta(hours=2)))
+
+    checkpoint_repository.save(
+        SCOPE, Checkpoint(cursor="42", started_at=started_at, context={"a": 1})
+    )
+
+    checkpoint = checkpoint_repository.session.merge.call_args[0][0]
+    assert checkpoint.scope == SCOPE
+    assert checkpoint.cursor == "42"
+    assert checkpoint.started_at == datetime(2024, 5, 1, 12, 0)
+    assert json.loads(checkpoint.context) == {"a": 1}
+    checkpoint_repository.session.commit.assert_called_once()
+
+
+def test_save_checkpoint_sqlalchemy_error(checkpoint_repository):
+    checkpoint_repository.session.commit.side_effect = SQLAlchemyError("Database error")
+
+    with pytest.raises(SystemExit):
+        checkpoint_repository.save(
+            SCOPE,
+            Checkpoint(cursor="42", started_at=datetime.now(timezone.utc), context={}),
+        )
+
+
+def test_delete_checkpoint(checkpoint_repository):
+    checkpoint_repository.delete(SCOPE)
+
+    checkpoint_repository.session.query.assert_called_once_with(ScanCheckpoint)
+    checkpoint_repository.session.commit.assert_called_once()
+
+
+def test_delete_checkpoint_sqlalchemy_error(checkpoint_repository):
+    checkpoint_repository.session.commit.side_effect = SQLAlchemyError("Database error")
+
+    with pytest.raises(SystemExit):
+        checkpoint_repository.delete(SCOPE)
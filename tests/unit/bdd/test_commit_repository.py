@@ -2,16 +2,26 @@
 # # licence       : GPL v3
 # # - Flavien Perez fperez@linagora.com
 # # - Maïlys Jara mjara@linagora.com
+from datetime import datetime
+from datetime import timezone
 from unittest.mock import MagicMock
 
+import psycopg2
 import pytest
+from sqlalchemy.dialects import postgresql
 from sqlalchemy.exc import SQLAlchemyError
 
 from gitlab_monitor.exc import CommitNotFoundError
 from gitlab_monitor.services.bdd.bdd import Database
+from gitlab_monitor.services.bdd.commit_repository import COPY_TO_STAGING_TABLE
+from gitlab_monitor.services.bdd.commit_repository import CREATE_STAGING_TABLE
+from gitlab_monitor.services.bdd.commit_repository import MERGE_STAGING_TABLE
+from gitlab_monitor.services.bdd.commit_repository import CommitCSVStream
 from gitlab_monitor.services.bdd.commit_repository import (
     SQLAlchemyCommitRepository,
 )
+from gitlab_monitor.services.bdd.mapper_from_dto import DTOToDatabaseMapper
+from gitlab_monitor.services.bdd.repository import UpsertResult
 from gitlab_monitor.services.dto import CommitDTO
 
 
@@ -87,6 +97,7 @@ def test_update_commit(commit_repository, commit):
     )
     commit_repository.update(updated_commit)
     commit_repository.session.commit.assert_called_once()
+    assert commit.content_hash == DTOToDatabaseMapper().content_hash(updated_commit)
     assert commit.commit_id == "false0commit0id"
     assert commit.project_id == 8888
     assert commit.message == "Updated Test Commit"
@@ -121,3 +132,127 @@ def test_update_commit_sqlalchemy_error(commit_repository, commit):
         commit_repository.update(updated_commit)
 
     commit_repository.session.commit.assert_called_once()
+
+
+# ----- Tests upsert_many -----
+
+
+def test_upsert_many(commit_repository, commit):
+    commit_repository.session.execute().scalars().all.return_value = [False]
+    commit_repository.session.execute.reset_mock()
+
+    result = commit_repository.upsert_many([commit])
+
+    assert result == UpsertResult(inserted=0, updated=1, unchanged=0)
+    statement = commit_repository.session.execute.call_args[0][0]
+    sql = str(statement.compile(dialect=postgresql.dialect()))
+    assert "INSERT INTO commit" in sql
+    assert "ON CONFLICT (commit_id) DO UPDATE SET" in sql
+    assert "WHERE commit.content_hash IS DISTINCT FROM excluded.content_hash" in sql
+    commit_repository.session.commit.assert_called_once()
+
+
+# ----- Tests copy_many -----
+
+
+def test_commit_csv_stream(commit):
+    commits = [
+        commit,
+        CommitDTO(
+            commit_id="other0commit0id",
+            project_id=8888,
+            message='Fix "quotes", commas\nand lines',
+            date=datetime(2021, 1, 2, 10, 0, tzinfo=timezone.utc),
+            author=None,
+        ),
+    ]
+    stream = CommitCSVStream(commits)
+    hashes = [DTOToDatabaseMapper().content_hash(commit_dto) for commit_dto in commits]
+
+    chunks = []
+    while chunk := stream.read(7):
+        assert len(chunk) <= 7
+        chunks.append(chunk)
+
+    assert "".join(chunks) == (
+        '"false0commit0id","8888","Test Commit","2021-01-01","Test Author",'
+        f'"{hashes[0]}"\n'
+        '"other0commit0id","8888","Fix ""quotes"", commas\nand lines",'
+        f'2021-01-02T10:00:00+00:00,,"{hashes[1]}"\n'
+    )
+    assert stream.count == 2
+
+
+def test_commit_csv_stream_read_all(commit):
+    stream = CommitCSVStream([commit])
+
+    assert stream.read().count("\n") == 1
+    assert stream.read() == ""
+
+
+def test_copy_many(commit_repository, commit):
+    cursor = commit_repository.session.connection().connection.cursor()
+    copied = []
+    cursor.copy_expert.side_effect = lambda sql, stream: copied.append(stream.read())
+    cursor.fetchone.return_value = (1, 0)
+
+    result = commit_repository.copy_many(iter([commit, commit]))
+
+    assert result == UpsertResult(inserted=1, updated=0, unchanged=1)
+    assert len(copied[0].splitlines()) == 2
+    executed = [call_args[0][0] for call_args in cursor.execute.call_args_list]
+    assert executed == [CREATE_STAGING_TABLE, MERGE_STAGING_TABLE]
+    assert cursor.copy_expert.call_args[0][0] == COPY_TO_STAGING_TABLE
+    commit_repository.session.commit.assert_called_once()
+
+
+def test_copy_many_by_batches(commit_repository, commit):
+    cursor = commit_repository.session.connection().connection.cursor()
+    copied = []
+    cursor.copy_expert.side_effect = lambda sql, stream: copied.append(stream.read())
+    cursor.fetchone.side_effect = [(2, 0), (0, 1)]
+    on_batch = MagicMock()
+
+    result = commit_repository.copy_many(
+        iter([commit, commit, commit]), batch_size=2, on_batch=on_batch
+    )
+
+    assert result == UpsertResult(inserted=2, updated=1, unchanged=0)
+    assert [len(rows.splitlines()) for rows in copied] == [2, 1]
+    assert commit_repository.session.commit.call_count == 2
+    assert [len(call_args[0][0]) for call_args in on_batch.call_args_list] == [2, 1]
+
+
+def test_copy_many_error(commit_repository, commit):
+    cursor = commit_repository.session.connection().connection.cursor()
+    cursor.copy_expert.side_effect = psycopg2.DataError("invalid input syntax")
+
+    with pytest.raises(SystemExit):
+        commit_repository.copy_many([commit])
+
+    commit_repository.session.rollback.assert_called_once()
+    commit_repository.session.commit.assert_not_called()
+
+
+# ----- Tests load_identity_index -----
+
+
+def test_load_identity_index(commit_repository):
+    query = commit_repository.session.query().filter()
+    query.count.return_value = 2
+    query.yield_per.return_value = iter([("abc",), ("def",)])
+
+    index = commit_repository.load_identity_index(8888)
+
+    assert "abc" in index
+    assert "def" in index
+    assert "ghi" not in index
+    query.yield_per.assert_called_once()
+
+
+def test_load_identity_index_too_large(commit_repository):
+    query = commit_repository.session.query().filter()
+    query.count.return_value = 11
+
+    assert commit_repository.load_identity_index(8888, max_size=10) is None
+    query.yield_per.assert_not_called()
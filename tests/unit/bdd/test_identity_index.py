@@ -0,0 +1,43 @@
+# # --- Copyright (c) 2024-2025 Linagora
+# # licence       : GPL v3
+# # - Flavien Perez fperez@linagora.com
+# # - Maïlys Jara mjara@linagora.com
+import hashlib
+
+from gitlab_monitor.services.bdd.identity_index import IdentityIndex
+from gitlab_monitor.services.bdd.identity_index import hash_id
+
+
+COMMIT_IDS = [hashlib.sha1(str(index).encode()).hexdigest() for index in range(1000)]
+
+
+def test_hash_id():
+    assert hash_id("abc") == hash_id("abc")
+    assert hash_id("abc") != hash_id("abd")
+    assert 0 <= hash_id("abc") < 2**64
+
+
+def test_exact_index():
+    index = IdentityIndex(iter(COMMIT_IDS), len(COMMIT_IDS))
+
+    assert index.is_exact
+    assert len(index) == 1000
+    assert all(commit_id in index for commit_id in COMMIT_IDS)
+    assert "unknown0commit" not in index
+
+
+def test_compact_index():
+    index = IdentityIndex(iter(COMMIT_IDS), len(COMMIT_IDS), max_exact_size=10)
+
+    assert not index.is_exact
+    assert len(index) == 1000
+    assert all(commit_id in index for commit_id in COMMIT_IDS)
+    assert "unknown0commit" not in index
+    assert hashlib.sha1(b"1000").hexdigest() not in index
+
+
+def test_empty_compact_index():
+    index = IdentityIndex(iter([]), 0, max_exact_size=-1)
+
+    assert not index.is_exact
+    assert "unknown0commit" not in index
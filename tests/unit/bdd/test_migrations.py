@@ -0,0 +1,117 @@
+# # --- Copyright (c) 2024-2025 Linagora
+# # licence       : GPL v3
+# # - Flavien Perez fperez@linagora.com
+# # - Maïlys Jara mjara@linagora.com
+from unittest.mock import MagicMock
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy import inspect
+from sqlalchemy import text
+from sqlalchemy.exc import ProgrammingError
+
+from gitlab_monitor.services.bdd.migrations import MIGRATIONS
+from gitlab_monitor.services.bdd.migrations import check_schema_version
+from gitlab_monitor.services.bdd.migrations import get_schema_version
+from gitlab_monitor.services.bdd.migrations import upgrade_schema
+from gitlab_monitor.services.bdd.models import SCHEMA_VERSION
+
+
+@pytest.fixture
+def engine():
+    return create_engine("sqlite://")
+
+
+# ----- Tests upgrade_schema -----
+
+
+def test_upgrade_schema_creates_tables(engine):
+    previous_version, version = upgrade_schema(engine, migrations={})
+
+    assert (previous_version, version) == (0, SCHEMA_VERSION)
+    assert get_schema_version(engine) == SCHEMA_VERSION
+    assert {"project", "commit", "schema_version"} <= set(
+        inspect(engine).get_table_names()
+    )
+
+
+def test_upgrade_schema_creates_indexes(engine):
+    upgrade_schema(engine, migrations={})
+
+    assert {index["name"] for index in inspect(engine).get_indexes("commit")} == {
+        "ix_commit_project_id_date",
+        "ix_commit_author",
+        "ix_commit_date",
+    }
+    assert [index["name"] for index in inspect(engine).get_indexes("project")] == [
+        "ix_project_last_activity_at"
+    ]
+
+
+def test_migrations_cover_schema_version():
+    assert set(MIGRATIONS) == set(range(1, SCHEMA_VERSION + 1))
+
+
+def test_upgrade_schema_applies_missing_migrations(engine):
+    migrations = {
+        1: [],
+        2: ["CREATE TABLE migration_2 (id INTEGER)"],
+        3: ["INSERT INTO migration_2 (id) VALUES (3)"],
+    }
+    upgrade_schema(engine, migrations=migrations, target_version=1)
+
+    assert upgrade_schema(engine, migrations=migrations, target_version=3) == (1, 3)
+
+    assert get_schema_version(engine) == 3
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT id FROM migration_2")).all() == [(3,)]
+
+
+def test_upgrade_schema_up_to_date(engine):
+    upgrade_schema(engine, migrations={})
+
+    assert upgrade_schema(engine, migrations={}) == (SCHEMA_VERSION, SCHEMA_VERSION)
+
+
+def test_upgrade_schema_rollback_on_error(engine):
+    upgrade_schema(engine, migrations={}, target_version=1)
+
+    with pytest.raises(Exception):
+        upgrade_schema(engine, migrations={2: ["NOT SQL"]}, target_version=2)
+
+    assert get_schema_version(engine) == 1
+
+
+# ----- Tests get_schema_version / check_schema_version -----
+
+
+def test_get_schema_version_not_versioned():
+    engine = MagicMock()
+    engine.connect.return_value.__enter__.return_value.execute.side_effect = (
+        ProgrammingError("SELECT", {}, Exception("relation does not exist"))
+    )
+
+    assert get_schema_version(engine) is None
+
+
+def test_check_schema_version_up_to_date(engine):
+    upgrade_schema(engine, migrations={})
+
+    check_schema_version(engine)
+
+
+def test_check_schema_version_outdated(engine, caplog):
+    upgrade_schema(engine, migrations={}, target_version=SCHEMA_VERSION - 1)
+
+    with pytest.raises(SystemExit) as e:
+        check_schema_version(engine)
+    assert e.value.code == 1
+    assert "gitlab-monitor db upgrade" in caplog.text
+
+
+def test_check_schema_version_newer(engine, caplog):
+    upgrade_schema(engine, migrations={}, target_version=SCHEMA_VERSION + 1)
+
+    with pytest.raises(SystemExit):
+        check_schema_version(engine)
+    assert "Please upgrade gitlab_monitor" in caplog.text
@@ -2,17 +2,23 @@
 # # licence       : GPL v3
 # # - Flavien Perez fperez@linagora.com
 # # - Maïlys Jara mjara@linagora.com
+import logging
+from dataclasses import replace
+from datetime import datetime
 from unittest.mock import MagicMock
 from unittest.mock import Mock
 
 import pytest
+from sqlalchemy.dialects import postgresql
 from sqlalchemy.exc import SQLAlchemyError
 
 from gitlab_monitor.exc import ProjectNotFoundError
 from gitlab_monitor.services.bdd.bdd import Database
+from gitlab_monitor.services.bdd.mapper_from_dto import DTOToDatabaseMapper
 from gitlab_monitor.services.bdd.project_repository import (
     SQLAlchemyProjectRepository,
 )
+from gitlab_monitor.services.bdd.repository import UpsertResult
 from gitlab_monitor.services.dto import ProjectDTO
 
 
@@ -100,6 +106,16 @@ def test_update_project(project_repository, project):
     assert project.release == "disabled"
     assert project.visibility == "public"
     assert project.updated_at == "2024-01-02T00:00:00Z"
+    assert project.content_hash == DTOToDatabaseMapper().content_hash(updated_project)
+
+
+def test_update_project_unchanged(project_repository, project):
+    stored_project = Mock(content_hash=DTOToDatabaseMapper().content_hash(project))
+    project_repository.session.query().filter().first.return_value = stored_project
+
+    project_repository.update(replace(project))
+
+    project_repository.session.commit.assert_not_called()
 
 
 def test_update_project_not_found(project_repository, project):
@@ -146,3 +162,143 @@ def test_update_project_sqlalchemy_error(project_repository, project):
 #     project_repository.delete(project.project_id)
 #     project_repository.session.delete.assert_called_once_with(project)
 #     project_repository.session.commit.assert_called_once()
+
+
+# ----- Tests upsert_many / create_many -----
+
+
+def _compile(statement):
+    return str(statement.compile(dialect=postgresql.dialect()))
+
+
+def test_upsert_many(project_repository, project):
+    other_project = replace(project, project_id=9999)
+    project_repository.session.execute().scalars().all.return_value = [True]
+    project_repository.session.execute.reset_mock()
+
+    result = project_repository.upsert_many(iter([project, other_project]))
+
+    assert result == UpsertResult(inserted=1, updated=0, unchanged=1)
+    assert result.total == 2
+    statement = project_repository.session.execute.call_args[0][0]
+    sql = _compile(statement)
+    assert "INSERT INTO project" in sql
+    assert "ON CONFLICT (project_id) DO UPDATE SET name = excluded.name" in sql
+    assert "project_id = excluded.project_id" not in sql
+    assert "WHERE project.content_hash IS DISTINCT FROM excluded.content_hash" in sql
+    assert "RETURNING xmax = 0" in sql
+    project_repository.session.execute.assert_called_once()
+    project_repository.session.commit.assert_called_once()
+
+
+def test_upsert_many_batches(project_repository, project):
+    projects = [replace(project, project_id=project_id) for project_id in range(5)]
+
+    project_repository.session.execute().scalars().all.side_effect = [
+        [True, False],
+        [False],
+        [True],
+    ]
+    project_repository.session.execute.reset_mock()
+
+    result = project_repository.upsert_many(projects, batch_size=2)
+
+    assert result == UpsertResult(inserted=2, updated=2, unchanged=1)
+    assert project_repository.session.execute.call_count == 3
+    assert project_repository.session.commit.call_count == 3
+
+
+def test_upsert_many_on_batch(project_repository, project):
+    projects = [replace(project, project_id=project_id) for project_id in range(3)]
+    saved_batches = []
+
+    project_repository.upsert_many(
+        projects,
+        batch_size=2,
+        on_batch=lambda batch: saved_batches.append(
+            [project.project_id for project in batch]
+        ),
+    )
+
+    assert saved_batches == [[0, 1], [2]]
+
+
+def test_upsert_many_same_project_twice(project_repository, project):
+    updated_project = replace(project, name="UPDATED")
+
+    project_repository.upsert_many([project, updated_project])
+
+    statement = project_repository.session.execute.call_args[0][0]
+    params = statement.compile(dialect=postgresql.dialect()).params
+    assert "UPDATED" in params.values()
+    assert project.name not in params.values()
+
+
+def test_upsert_many_empty(project_repository):
+    assert project_repository.upsert_many([]).total == 0
+    project_repository.session.execute.assert_not_called()
+
+
+def test_create_many(project_repository, project):
+    project_repository.create_many([project])
+
+    statement = project_repository.session.execute.call_args[0][0]
+    assert "ON CONFLICT (project_id) DO NOTHING" in _compile(statement)
+    project_repository.session.commit.assert_called_once()
+
+
+def test_upsert_many_sqlalchemy_error(project_repository, project):
+    project_repository.session.execute.side_effect = SQLAlchemyError("Database error")
+
+    with pytest.raises(SystemExit):
+        project_repository.upsert_many([project])
+    project_repository.session.commit.assert_not_called()
+
+
+# ----- Tests find_unused_since -----
+
+
+def test_find_unused_since(project_repository, project):
+    row = MagicMock(**vars(project))
+    project_repository.session.execute().scalars.return_value = [row]
+    project_repository.session.execute().scalar.return_value = 0
+    project_repository.session.execute.reset_mock()
+
+    result = project_repository.find_unused_since(
+        datetime(2024, 6, 1), namespace="/group/", visibility="private"
+    )
+
+    assert [dto.project_id for dto in result] == [project.project_id]
+    sql = _compile(project_repository.session.execute.call_args[0][0])
+    assert "project.last_activity_at < " in sql
+    assert "project.path LIKE" in sql
+    assert "project.visibility = " in sql
+    assert sql.endswith("ORDER BY project.last_activity_at, project.project_id")
+
+
+def test_find_unused_since_warns_without_last_activity(project_repository, caplog):
+    project_repository.session.execute().scalars.return_value = []
+    project_repository.session.execute().scalar.return_value = 3
+
+    with caplog.at_level(logging.WARNING):
+        project_repository.find_unused_since(datetime(2024, 6, 1))
+
+    assert "3 projects saved in the database have no last activity date" in caplog.text
+
+
+def test_find_unused_since_without_filters(project_repository):
+    project_repository.session.execute().scalars.return_value = []
+    project_repository.session.execute().scalar.return_value = 0
+    project_repository.session.execute.reset_mock()
+
+    assert project_repository.find_unused_since(datetime(2024, 6, 1)) == []
+    sql = _compile(project_repository.session.execute.call_args[0][0])
+    assert "LIKE" not in sql
+    assert "visibility" not in sql.split("WHERE")[1]
+
+
+def test_find_unused_since_error(project_repository):
+    project_repository.session.execute.side_effect = SQLAlchemyError("error")
+
+    with pytest.raises(SystemExit):
+        project_repository.find_unused_since(datetime(2024, 6, 1))
@@ -0,0 +1,156 @@
+# # --- Copyright (c) 2024-2025 Linagora
+# # licence       : GPL v3
+# # - Flavien Perez fperez@linagora.com
+# # - Maïlys Jara mjara@linagora.com
+from datetime import timedelta
+from unittest.mock import MagicMock
+
+import pytest
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import SQLAlchemyError
+
+from gitlab_monitor.services.bdd.scan_task_repository import (
+    SQLAlchemyScanTaskRepository,
+)
+from gitlab_monitor.services.bdd.scan_task_repository import TaskStatus
+
+
+@pytest.fixture
+def scan_task_repository():
+    return SQLAlchemyScanTaskRepository(MagicMock())
+
+
+def _executed_sql(scan_task_repository):
+    statement = scan_task_repository.session.execute.call_args[0][0]
+    return str(statement.compile(dialect=postgresql.dialect()))
+
+
+# ----- Tests enqueue_saved_projects -----
+
+
+def test_enqueue_saved_projects(scan_task_repository):
+    scan_task_repository.session.execute.return_value.all.return_value = [(1,), (2,)]
+
+    assert scan_task_repository.enqueue_saved_projects() == 2
+
+    sql = _executed_sql(scan_task_repository)
+    assert "INSERT INTO scan_task" in sql
+    assert "FROM project ON CONFLICT (project_id) DO UPDATE" in sql
+    assert "WHERE scan_task.status IN" in sql
+    scan_task_repository.session.commit.assert_called_once()
+
+
+def test_enqueue_saved_projects_sqlalchemy_error(scan_task_repository):
+    scan_task_repository.session.execute.side_effect = SQLAlchemyError("error")
+
+    with pytest.raises(SystemExit):
+        scan_task_repository.enqueue_saved_projects()
+
+
+# ----- Tests claim -----
+
+
+def test_claim(scan_task_repository):
+    scan_task_repository.session.execute.return_value.scalar_one_or_none.return_value = (
+        42
+    )
+
+    project_id = scan_task_repository.claim("worker-1", timedelta(minutes=10))
+
+    assert project_id == 42
+    select_sql, update_sql = [
+        str(call[0][0].compile(dialect=postgresql.dialect()))
+        for call in scan_task_repository.session.execute.call_args_list
+    ]
+    assert "FOR UPDATE SKIP LOCKED" in select_sql
+    assert "UPDATE scan_task SET status=%(status)s, worker=%(worker)s, " in update_sql
+    assert "attempts=(scan_task.attempts + %(attempts_1)s)" in update_sql
+    # The lease is dated by the clock of the database.
+    assert "lease_expires_at=(timezone(%(timezone_1)s, now())" in update_sql
+    assert "WHERE scan_task.project_id = %(project_id_1)s" in update_sql
+    scan_task_repository.session.commit.assert_called_once()
+
+
+def test_claim_empty_queue(scan_task_repository):
+    scan_task_repository.session.execute.return_value.scalar_one_or_none.return_value = (
+        None
+    )
+
+    assert scan_task_repository.claim("worker-1", timedelta(minutes=10)) is None
+    scan_task_repository.session.commit.assert_called_once()
+
+
+# ----- Tests renew / complete / fail / requeue_expired -----
+
+
+def test_renew(scan_task_repository):
+    scan_task_repository.session.execute.return_value.rowcount = 1
+
+    assert scan_task_repository.renew(42, "worker-1", timedelta(minutes=10))
+
+    sql = _executed_sql(scan_task_repository)
+    assert "UPDATE scan_task SET lease_expires_at=(timezone(" in sql
+    assert "scan_task.worker = " in sql
+    assert "scan_task.lease_expires_at >= timezone(" in sql
+    scan_task_repository.session.commit.assert_called_once()
+
+
+def test_renew_lease_lost(scan_task_repository):
+    scan_task_repository.session.execute.return_value.rowcount = 0
+
+    assert not scan_task_repository.renew(42, "worker-1", timedelta(minutes=10))
+
+
+def test_renew_sqlalchemy_error(scan_task_repository):
+    scan_task_repository.session.execute.side_effect = SQLAlchemyError("error")
+
+    with pytest.raises(SystemExit):
+        scan_task_repository.renew(42, "worker-1", timedelta(minutes=10))
+
+
+def test_complete(scan_task_repository):
+    scan_task_repository.session.execute.return_value.rowcount = 1
+
+    assert scan_task_repository.complete(42, "worker-1")
+
+    sql = _executed_sql(scan_task_repository)
+    assert "UPDATE scan_task SET status=" in sql
+    assert "scan_task.worker = " in sql
+    # A task whose lease has expired is no longer held by the worker.
+    assert "scan_task.lease_expires_at >= timezone(" in sql
+
+
+def test_complete_lease_lost(scan_task_repository):
+    scan_task_repository.session.execute.return_value.rowcount = 0
+
+    assert not scan_task_repository.complete(42, "worker-1")
+
+
+def test_fail(scan_task_repository):
+    scan_task_repository.session.execute.return_value.rowcount = 1
+
+    assert scan_task_repository.fail(42, "worker-1", max_attempts=3)
+
+    scan_task_repository.session.rollback.assert_called_once()
+    sql = _executed_sql(scan_task_repository)
+    assert "CASE WHEN (scan_task.attempts >=" in sql
+    # The task is queued again behind the tasks already pending.
+    assert "enqueued_at=timezone(" in sql
+
+
+def test_requeue_expired(scan_task_repository):
+    scan_task_repository.session.execute.return_value.rowcount = 3
+
+    assert scan_task_repository.requeue_expired(max_attempts=3) == 3
+
+    sql = _executed_sql(scan_task_repository)
+    assert "scan_task.lease_expires_at < timezone(" in sql
+    assert "enqueued_at=timezone(" in sql
+    scan_task_repository.session.commit.assert_called_once()
+
+
+def test_requeue_expired_sqlalchemy_error(scan_task_repository):
+    scan_task_repository.session.commit.side_effect = SQLAlchemyError("error")
+
+    with pytest.raises(SystemExit):
+        scan_task_repository.requeue_expired(max_attempts=3)
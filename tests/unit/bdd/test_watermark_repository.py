@@ -0,0 +1,102 @@
+# # --- Copyright (c) 2024-2025 Linagora
+# # licence       : GPL v3
+# # - Flavien Perez fperez@linagora.com
+# # - Maïlys Jara mjara@linagora.com
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+from unittest.mock import MagicMock
+
+import pytest
+from sqlalchemy.exc import SQLAlchemyError
+
+from gitlab_monitor.services.bdd.models import CommitWatermark
+from gitlab_monitor.services.bdd.models import SyncWatermark
+from gitlab_monitor.services.bdd.watermark_repository import (
+    SQLAlchemyWatermarkRepository,
+)
+
+
+URL = "https://gitlab.example.com"
+
+
+@pytest.fixture
+def watermark_repository():
+    return SQLAlchemyWatermarkRepository(MagicMock())
+
+
+# ----- Tests projects watermark -----
+
+
+def test_get_projects_watermark(watermark_repository):
+    watermark_repository.session.get.return_value = SyncWatermark(
+        instance_url=URL, synced_at=datetime(2024, 5, 1, 12, 0)
+    )
+
+    result = watermark_repository.get_projects_watermark(URL)
+
+    assert result == datetime(2024, 5, 1, 12, 0, tzinfo=timezone.utc)
+    watermark_repository.session.get.assert_called_once_with(SyncWatermark, URL)
+
+
+def test_get_projects_watermark_never_scanned(watermark_repository):
+    watermark_repository.session.get.return_value = None
+
+    assert watermark_repository.get_projects_watermark(URL) is None
+
+
+def test_set_projects_watermark(watermark_repository):
+    synced_at = datetime(2024, 5, 1, 14, 0, tzinfo=timezone(timedelta(hours=2)))
+
+    watermark_repository.set_projects_watermark(URL, synced_at)
+
+    watermark = watermark_repository.session.merge.call_args[0][0]
+    assert watermark.instance_url == URL
+    assert watermark.synced_at == datetime(2024, 5, 1, 12, 0)
+    watermark_repository.session.commit.assert_called_once()
+
+
+def test_set_projects_watermark_sqlalchemy_error(watermark_repository):
+    watermark_repository.session.commit.side_effect = SQLAlchemyError("Database error")
+
+    with pytest.raises(SystemExit):
+        watermark_repository.set_projects_watermark(URL, datetime.now(timezone.utc))
+
+
+# ----- Tests commits watermark -----
+
+
+def test_get_commits_watermark(watermark_repository):
+    watermark_repository.session.get.return_value = CommitWatermark(
+        project_id=1, last_commit_id="abc", last_committed_at=datetime(2024, 5, 1)
+    )
+
+    result = watermark_repository.get_commits_watermark(1)
+
+    assert result == ("abc", datetime(2024, 5, 1, tzinfo=timezone.utc))
+    watermark_repository.session.get.assert_called_once_with(CommitWatermark, 1)
+
+
+def test_get_commits_watermark_never_scanned(watermark_repository):
+    watermark_repository.session.get.return_value = None
+
+    assert watermark_repository.get_commits_watermark(1) is None
+
+
+def test_set_commits_watermark(watermark_repository):
+    committed_at = datetime(2024, 5, 1, 14, 0, tzinfo=timezone(timedelta(hours=2)))
+
+    watermark_repository.set_commits_watermark(1, "abc", committed_at)
+
+    watermark = watermark_repository.session.merge.call_args[0][0]
+    assert watermark.project_id == 1
+    assert watermark.last_commit_id == "abc"
+    assert watermark.last_committed_at == datetime(2024, 5, 1, 12, 0)
+    watermark_repository.session.commit.assert_called_once()
+
+
+def test_set_commits_watermark_sqlalchemy_error(watermark_repository):
+    watermark_repository.session.commit.side_effect = SQLAlchemyError("Database error")
+
+    with pytest.raises(SystemExit):
+        watermark_repository.set_commits_watermark(1, "abc", datetime.now(timezone.utc))
@@ -2,6 +2,7 @@
 # # licence       : GPL v3
 # # - Flavien Perez fperez@linagora.com
 # # - Maïlys Jara mjara@linagora.com
+from datetime import datetime
 from pathlib import Path
 from unittest.mock import MagicMock
 from unittest.mock import patch
@@ -15,6 +16,18 @@ from gitlab_monitor.commands.cli import _version_callback
 from gitlab_monitor.commands.cli import app
 from gitlab_monitor.commands.cli import validate_project
 from gitlab_monitor.logger import logger
+from gitlab_monitor.services.bdd.repository import DEFAULT_BATCH_SIZE
+from gitlab_monitor.services.bdd.scan_task_repository import (
+    DEFAULT_MAX_ATTEMPTS,
+)
+from gitlab_monitor.services.bdd.scan_task_repository import (
+    DEFAULT_POLL_INTERVAL,
+)
+from gitlab_monitor.services.bdd.watermark_repository import (
+    DEFAULT_MAX_SYNC_AGE,
+)
+from gitlab_monitor.services.call_gitlab import ScanStrategy
+from gitlab_monitor.services.filters import Visibility
 
 
 runner = CliRunner()
@@ -38,7 +51,25 @@ def test_scan_projects(mock_cli_command):
     mock_command_instance.create_command.return_value = MagicMock()
 
     result = runner.invoke(
-        app, ["scan-projects", "--no-database", "--save-in-file", "test.json"]
+        app,
+        [
+            "scan-projects",
+            "--no-database",
+            "--save-in-file",
+            "test.json",
+            "--full-scan",
+            "--batch-size",
+            "50",
+            "--visibility",
+            "internal",
+            "--namespace",
+            "group/subgroup",
+            "--no-archived",
+            "--search",
+            "monitor",
+            "--active-since",
+            "2024-01-01",
+        ],
     )
 
     assert result.exit_code == 0
@@ -49,6 +80,130 @@ def test_scan_projects(mock_cli_command):
         no_db=True,
         unused_since=None,
         save_in_file="test.json",
+        full_scan=True,
+        batch_size=50,
+        visibility=Visibility.INTERNAL,
+        namespace="group/subgroup",
+        archived=False,
+        search="monitor",
+        active_since=datetime(2024, 1, 1),
+        strategy=ScanStrategy.FULL,
+        jobs=1,
+        resume=False,
+        use_async=False,
+        commits=False,
+        workers=4,
+        single_pass=False,
+        full_commit_scan=False,
+    )
+
+
+@patch("gitlab_monitor.commands.cli.CLICommand")
+def test_scan_projects_sorted_strategy(mock_cli_command):
+    mock_command_instance = mock_cli_command.return_value
+
+    result = runner.invoke(
+        app,
+        ["scan-projects", "--strategy", "sorted", "--unused-since", "2024-01-01"],
+    )
+
+    assert result.exit_code == 0
+    kwargs = mock_command_instance.handle_command.call_args.kwargs
+    assert kwargs["strategy"] is ScanStrategy.SORTED
+    assert kwargs["unused_since"] == datetime(2024, 1, 1)
+
+
+@patch("gitlab_monitor.commands.cli.CLICommand")
+def test_scan_projects_sorted_strategy_without_unused_since(mock_cli_command):
+    result = runner.invoke(app, ["scan-projects", "--strategy", "sorted"])
+
+    assert result.exit_code != 0
+    assert "--unused-since" in result.output
+    mock_cli_command.assert_not_called()
+
+
+@patch("gitlab_monitor.commands.cli.CLICommand")
+def test_scan_projects_resume(mock_cli_command):
+    mock_command_instance = mock_cli_command.return_value
+
+    result = runner.invoke(app, ["scan-projects", "--resume"])
+
+    assert result.exit_code == 0
+    assert mock_command_instance.handle_command.call_args.kwargs["resume"] is True
+
+
+@patch("gitlab_monitor.commands.cli.CLICommand")
+def test_scan_projects_commits(mock_cli_command):
+    mock_command_instance = mock_cli_command.return_value
+
+    result = runner.invoke(
+        app, ["scan-projects", "--commits", "--workers", "8", "--single-pass"]
+    )
+
+    assert result.exit_code == 0
+    kwargs = mock_command_instance.handle_command.call_args.kwargs
+    assert kwargs["commits"] is True
+    assert kwargs["workers"] == 8
+    assert kwargs["single_pass"] is True
+
+
+@pytest.mark.parametrize(
+    "option", [["--no-database"], ["--save-in-file", "test.json"], ["--resume"]]
+)
+@patch("gitlab_monitor.commands.cli.CLICommand")
+def test_scan_projects_commits_invalid(mock_cli_command, option):
+    result = runner.invoke(app, ["scan-projects", "--commits", *option])
+
+    assert result.exit_code != 0
+    assert "--commits" in result.output
+    mock_cli_command.assert_not_called()
+
+
+@patch("gitlab_monitor.commands.cli.CLICommand")
+def test_scan_projects_async(mock_cli_command):
+    mock_command_instance = mock_cli_command.return_value
+
+    result = runner.invoke(app, ["scan-projects", "--async"])
+
+    assert result.exit_code == 0
+    assert mock_command_instance.handle_command.call_args.kwargs["use_async"] is True
+
+
+@patch("gitlab_monitor.commands.cli.CLICommand")
+def test_scan_projects_resume_without_database(mock_cli_command):
+    result = runner.invoke(app, ["scan-projects", "--resume", "--no-database"])
+
+    assert result.exit_code != 0
+    assert "--resume" in result.output
+    mock_cli_command.assert_not_called()
+
+
+# === Tests worker ===
+
+
+@patch("gitlab_monitor.commands.cli.CLICommand")
+def test_worker(mock_cli_command):
+    mock_command_instance = mock_cli_command.return_value
+
+    result = runner.invoke(
+        app, ["worker", "--enqueue", "--name", "node-1", "--lease", "60", "-j", "4"]
+    )
+
+    assert result.exit_code == 0
+    mock_command_instance.create_command.assert_called_once_with("worker")
+    mock_command_instance.handle_command.assert_called_once_with(
+        mock_command_instance.create_command.return_value,
+        enqueue=True,
+        wait=False,
+        worker_name="node-1",
+        lease=60,
+        max_attempts=DEFAULT_MAX_ATTEMPTS,
+        poll_interval=DEFAULT_POLL_INTERVAL,
+        jobs=4,
+        single_pass=False,
+        batch_size=DEFAULT_BATCH_SIZE,
+        copy_load=False,
+        use_async=False,
     )
 
 
@@ -69,6 +224,11 @@ def test_scan_project(mock_cli_command):
             "--no-database",
             "--save-in-file",
             "project.json",
+            "--jobs",
+            "4",
+            "--single-pass",
+            "--full-commit-scan",
+            "--copy-load",
         ],
     )
 
@@ -81,15 +241,50 @@ def test_scan_project(mock_cli_command):
         get_commits=True,
         no_db=True,
         save_in_file="project.json",
+        jobs=4,
+        single_pass=True,
+        full_commit_scan=True,
+        batch_size=500,
+        copy_load=True,
+        resume=False,
+        use_async=False,
     )
 
 
+@patch("gitlab_monitor.commands.cli.CLICommand")
+def test_scan_project_resume_without_database(mock_cli_command):
+    result = runner.invoke(
+        app, ["scan-project", "123", "--commit", "--resume", "--no-database"]
+    )
+
+    assert result.exit_code != 0
+    assert "--resume" in result.output
+    mock_cli_command.assert_not_called()
+
+
 def test_scan_project_missing_id():
     result = runner.invoke(app, ["scan-project"])
     assert result.exit_code != 0
     assert "Missing argument 'PROJECT_ID'" in result.output
 
 
+# === Tests db upgrade ===
+
+
+@patch("gitlab_monitor.commands.cli.CLICommand")
+def test_db_upgrade(mock_cli_command):
+    mock_command_instance = mock_cli_command.return_value
+    mock_command_instance.create_command.return_value = MagicMock()
+
+    result = runner.invoke(app, ["db", "upgrade"])
+
+    assert result.exit_code == 0
+    mock_command_instance.create_command.assert_called_once_with("db_upgrade")
+    mock_command_instance.handle_command.assert_called_once_with(
+        mock_command_instance.create_command.return_value
+    )
+
+
 # === Tests --verbose ===
 
 
@@ -143,6 +338,13 @@ def test_archive_project_with_id(mock_cli_command):
     mock_command_instance.handle_command.assert_called_once_with(
         mock_command_instance.create_command.return_value,
         project="123",
+        unused_since=None,
+        namespace=None,
+        visibility=None,
+        dry_run=False,
+        jobs=4,
+        journal=None,
+        max_sync_age=DEFAULT_MAX_SYNC_AGE,
     )
 
 
@@ -154,7 +356,17 @@ def test_archive_project_with_valid_path(mock_cli_command, tmp_path):
     mock_command_instance = mock_cli_command.return_value
     mock_command_instance.create_command.return_value = MagicMock()
 
-    result = runner.invoke(app, ["archive-project", str(valid_path)])
+    result = runner.invoke(
+        app,
+        [
+            "archive-project",
+            str(valid_path),
+            "-j",
+            "10",
+            "--journal",
+            str(tmp_path / "journal.jsonl"),
+        ],
+    )
 
     assert result.exit_code == 0
     assert f"Given Path : {valid_path}" in result.output
@@ -163,6 +375,13 @@ def test_archive_project_with_valid_path(mock_cli_command, tmp_path):
     mock_command_instance.handle_command.assert_called_once_with(
         mock_command_instance.create_command.return_value,
         project=str(valid_path),
+        unused_since=None,
+        namespace=None,
+        visibility=None,
+        dry_run=False,
+        jobs=10,
+        journal=str(tmp_path / "journal.jsonl"),
+        max_sync_age=DEFAULT_MAX_SYNC_AGE,
     )
 
 
@@ -175,4 +394,46 @@ def test_archive_project_with_invalid_path():
 def test_archive_project_missing_argument():
     result = runner.invoke(app, ["archive-project"])
     assert result.exit_code != 0
-    assert "Missing argument 'PROJECT'" in result.output
+    assert "--unused-since" in result.output
+
+
+@patch("gitlab_monitor.commands.cli.CLICommand")
+def test_archive_project_unused_since(mock_cli_command):
+    mock_command_instance = mock_cli_command.return_value
+
+    result = runner.invoke(
+        app,
+        [
+            "archive-project",
+            "--unused-since",
+            "2023-01-01",
+            "--namespace",
+            "group",
+            "--visibility",
+            "private",
+            "--dry-run",
+        ],
+    )
+
+    assert result.exit_code == 0
+    kwargs = mock_command_instance.handle_command.call_args.kwargs
+    assert kwargs["project"] is None
+    assert kwargs["unused_since"] == datetime(2023, 1, 1)
+    assert kwargs["namespace"] == "group"
+    assert kwargs["visibility"] == "private"
+    assert kwargs["dry_run"] is True
+
+
+@pytest.mark.parametrize(
+    "arguments",
+    [
+        ["123", "--unused-since", "2023-01-01"],
+        ["123", "--namespace", "group"],
+    ],
+)
+@patch("gitlab_monitor.commands.cli.CLICommand")
+def test_archive_project_invalid_selection(mock_cli_command, arguments):
+    result = runner.invoke(app, ["archive-project", *arguments])
+
+    assert result.exit_code != 0
+    mock_cli_command.assert_not_called()
@@ -5,6 +5,8 @@
 from unittest.mock import MagicMock
 from unittest.mock import patch
 
+import pytest
+
 from gitlab_monitor.commands.command_mapper import CommandMapper
 from gitlab_monitor.commands.commands import CLICommand
 
@@ -37,6 +39,7 @@ def test_handle_command_with_kwargs():
 
     mock_command_class.assert_called_once_with(kwargs)
     mock_command_instance.execute.assert_called_once_with(kwargs)
+    mock_command_instance.close.assert_called_once_with()
 
 
 def test_handle_command_without_kwargs():
@@ -51,3 +54,16 @@ def test_handle_command_without_kwargs():
 
     mock_command_class.assert_called_once_with({})
     mock_command_instance.execute.assert_called_once_with()
+
+
+def test_handle_command_closes_on_error():
+    """Test the handle_command method closes the command when it fails."""
+    mock_command_class = MagicMock()
+    mock_command_instance = MagicMock()
+    mock_command_instance.execute.side_effect = SystemExit(1)
+    mock_command_class.return_value = mock_command_instance
+
+    with pytest.raises(SystemExit):
+        CLICommand().handle_command(mock_command_class)
+
+    mock_command_instance.close.assert_called_once_with()
@@ -0,0 +1,238 @@
+# # --- Copyright (c) 2024-2025 Linagora
+# # licence       : GPL v3
+# # - Flavien Perez fperez@linagora.com
+# # - Maïlys Jara mjara@linagora.com
+import asyncio
+import json
+import threading
+from datetime import datetime
+from datetime import timezone
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from unittest.mock import patch
+from urllib.parse import parse_qs
+from urllib.parse import urlsplit
+
+import gitlab
+import pytest
+from gitlab.v4.objects import Project
+
+from gitlab_monitor.services.async_gitlab import AsyncGitlabAPIService
+from gitlab_monitor.services.async_gitlab import BridgedGitlabAPIService
+from gitlab_monitor.services.call_gitlab import GitlabAPIService
+from gitlab_monitor.services.call_gitlab import ScanStrategy
+from gitlab_monitor.services.filters import ProjectFilter
+from gitlab_monitor.services.rate_limiter import RateLimiter
+
+
+PROJECTS = [
+    {"id": 1, "name": "p1", "last_activity_at": "2023-01-01T00:00:00Z"},
+    {"id": 2, "name": "p2", "last_activity_at": "2023-06-01T00:00:00Z"},
+    {"id": 3, "name": "p3", "last_activity_at": "2024-06-01T00:00:00Z"},
+]
+COMMITS = [{"id": f"sha{index}", "title": f"Commit {index}"} for index in range(5)]
+
+
+class FakeGitlab(BaseHTTPRequestHandler):
+    """Fake GitLab API: the projects and the commits lists, two elements per page,
+    and the commit details."""
+
+    requests: list = []
+    rejected: set = set()
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        self.requests.append((url.path, query))
+        if url.path in self.rejected:
+            self.rejected.discard(url.path)
+            self._send(429, {"message": "Too Many Requests"}, {"Retry-After": "0"})
+        elif url.path == "/api/v4/projects":
+            self._send_page(PROJECTS, query)
+        elif url.path == "/api/v4/projects/1/repository/commits":
+            self._send_page(COMMITS, query)
+        elif url.path.startswith("/api/v4/projects/1/repository/commits/"):
+            sha = url.path.rsplit("/", 1)[1]
+            self._send(200, {"id": sha, "title": "Commit", "project_id": 1})
+        else:
+            self._send(404, {"message": "404 Not found"})
+
+    def _send_page(self, elements, query):
+        page = int(query.get("page", ["1"])[0])
+        headers = {}
+        if page * 2 < len(elements):
+            next_query = {key: values[0] for key, values in query.items()}
+            next_query["page"] = str(page + 1)
+            next_url = f"http://{self.headers['Host']}{urlsplit(self.path).path}?" + (
+                "&".join(f"{key}={value}" for key, value in next_query.items())
+            )
+            headers["Link"] = f'<{next_url}>; rel="next"'
+        self._send(200, elements[(page - 1) * 2 : page * 2], headers)
+
+    def _send(self, status, body, headers=None):
+        content = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def fake_gitlab():
+    FakeGitlab.requests = []
+    FakeGitlab.rejected = set()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeGitlab)
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def gitlab_instance(fake_gitlab):
+    return gitlab.Gitlab(url=fake_gitlab, private_token="token", ssl_verify=False)
+
+
+def collect(async_iterator_factory, gitlab_instance):
+    async def run():
+        service = AsyncGitlabAPIService(gitlab_instance, RateLimiter())
+        try:
+            return [element async for element in async_iterator_factory(service)]
+        finally:
+            await service.aclose()
+
+    return asyncio.run(run())
+
+
+# ----- Tests AsyncGitlabAPIService -----
+
+
+def test_scan_projects_follows_pages(gitlab_instance):
+    projects = collect(lambda service: service.scan_projects(), gitlab_instance)
+
+    assert [project.id for project in projects] == [1, 2, 3]
+    assert isinstance(projects[0], gitlab.v4.objects.Project)
+    path, query = FakeGitlab.requests[0]
+    assert path == "/api/v4/projects"
+    assert query["order_by"] == ["id"]
+    assert query["per_page"] == ["100"]
+
+
+def test_scan_projects_sorted_stops_at_first_active_project(gitlab_instance):
+    projects = collect(
+        lambda service: service.scan_projects(
+            project_filter=ProjectFilter(unused_since=datetime(2024, 1, 1)),
+            strategy=ScanStrategy.SORTED,
+        ),
+        gitlab_instance,
+    )
+
+    assert [project.id for project in projects] == [1, 2]
+    assert FakeGitlab.requests[0][1]["last_activity_before"] == ["2024-01-01T00:00:00"]
+
+
+def test_get_project_commit(gitlab_instance):
+    project = gitlab_instance.projects.get(1, lazy=True)
+
+    commits = collect(
+        lambda service: service.get_project_commit(project), gitlab_instance
+    )
+
+    assert [commit.id for commit in commits] == [commit["id"] for commit in COMMITS]
+    assert len(FakeGitlab.requests) == 3
+
+
+def test_get_project_commit_same_query_as_sync_client(fake_gitlab, gitlab_instance):
+    since = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    until = datetime(2024, 6, 1, tzinfo=timezone.utc)
+    with GitlabAPIService(fake_gitlab, "token") as service:
+        project = Project(service._gitlab_instance.projects, {"id": 1, "name": "p1"})
+        list(service.get_project_commit(project, since=since, until=until))
+    sync_query = FakeGitlab.requests[0][1]
+    FakeGitlab.requests = []
+
+    project = Project(gitlab_instance.projects, {"id": 1, "name": "p1"})
+    collect(
+        lambda service: service.get_project_commit(project, since=since, until=until),
+        gitlab_instance,
+    )
+
+    assert FakeGitlab.requests[0][1] == sync_query
+    assert "all" not in sync_query
+
+
+def test_get_commits_details_keeps_order(gitlab_instance):
+    project = gitlab_instance.projects.get(1, lazy=True)
+    commit_ids = [f"sha{index}" for index in range(20)]
+
+    details = collect(
+        lambda service: service.get_commits_details(project, commit_ids, 8),
+        gitlab_instance,
+    )
+
+    assert [commit.id for commit in details] == commit_ids
+    assert details[0].project_id == 1
+
+
+def test_get_retries_rejected_request(gitlab_instance):
+    FakeGitlab.rejected = {"/api/v4/projects"}
+
+    projects = collect(lambda service: service.scan_projects(), gitlab_instance)
+
+    assert len(projects) == 3
+    assert FakeGitlab.requests[0][0] == FakeGitlab.requests[1][0]
+
+
+# ----- Tests BridgedGitlabAPIService -----
+
+
+def test_bridged_service(fake_gitlab):
+    service = BridgedGitlabAPIService(fake_gitlab, "token", pool_size=4)
+
+    projects = list(service.scan_projects())
+    project = projects[0]
+    commits = list(service.get_project_commit(project))
+    details = list(service.get_commits_details(project, ["sha1", "sha2"], 2))
+
+    assert [project.id for project in projects] == [1, 2, 3]
+    assert len(commits) == len(COMMITS)
+    assert [commit.id for commit in details] == ["sha1", "sha2"]
+
+
+def test_bridged_service_error_exits(fake_gitlab):
+    service = BridgedGitlabAPIService(fake_gitlab, "token")
+    project = Project(service._gitlab_instance.projects, {"id": 404, "name": "p404"})
+
+    with pytest.raises(SystemExit):
+        list(service.get_project_commit(project))
+
+
+def test_bridged_service_incremental_scan_is_synchronous(fake_gitlab):
+    service = BridgedGitlabAPIService(fake_gitlab, "token")
+    updated_after = datetime(2024, 5, 1, tzinfo=timezone.utc)
+
+    with patch.object(
+        GitlabAPIService, "scan_projects", return_value=[]
+    ) as scan_projects:
+        assert service.scan_projects(updated_after=updated_after) == []
+
+    scan_projects.assert_called_once_with(
+        updated_after, None, ScanStrategy.FULL, 1, None, None
+    )
+
+
+def test_bridged_service_close(fake_gitlab):
+    with BridgedGitlabAPIService(fake_gitlab, "token") as service:
+        assert [project.id for project in service.scan_projects()] == [1, 2, 3]
+
+    assert service._async_service._client.is_closed
+    assert not service._loop_thread.is_alive()
+    assert service._loop.is_closed()
+    service.close()
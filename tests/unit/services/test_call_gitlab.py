@@ -2,6 +2,9 @@
 # # licence       : GPL v3
 # # - Flavien Perez fperez@linagora.com
 # # - Maïlys Jara mjara@linagora.com
+import time
+from datetime import datetime
+from datetime import timezone
 from unittest.mock import MagicMock
 from unittest.mock import patch
 
@@ -9,8 +12,14 @@ import gitlab
 import pytest
 from gitlab import exceptions as gitlab_exceptions
 from requests.exceptions import ConnectionError
+from requests.exceptions import ReadTimeout
 
+from gitlab_monitor.services.call_gitlab import PROJECTS_PER_PAGE
 from gitlab_monitor.services.call_gitlab import GitlabAPIService
+from gitlab_monitor.services.call_gitlab import ScanStrategy
+from gitlab_monitor.services.filters import ProjectFilter
+from gitlab_monitor.services.transport import CONNECT_TIMEOUT
+from gitlab_monitor.services.transport import READ_TIMEOUT
 
 
 # === Mock return types of gitlab methods ===
@@ -66,6 +75,36 @@ def gitlab_service(mock_gitlab):
     )
 
 
+# === Tests  __init__ ===
+
+
+def test_gitlab_service_transport():
+    with patch("gitlab.Gitlab") as MockGitlab:
+        GitlabAPIService(
+            url="https://gitlab.example.com", private_token="fake-token", pool_size=16
+        )
+
+    kwargs = MockGitlab.call_args.kwargs
+    assert kwargs["timeout"] == (CONNECT_TIMEOUT, READ_TIMEOUT)
+    assert kwargs["session"].get_adapter(kwargs["url"])._pool_maxsize == 16
+
+
+def test_gitlab_service_close_closes_cache(tmp_path):
+    with patch(
+        "gitlab_monitor.services.call_gitlab.CACHE_PATH", str(tmp_path / "cache.db")
+    ), patch("gitlab.Gitlab"):
+        service = GitlabAPIService(
+            url="https://gitlab.example.com", private_token="fake-token"
+        )
+    cache = service._cache
+
+    with patch.object(cache, "close", wraps=cache.close) as close:
+        service.close()
+        service.close()
+
+    close.assert_called_once()
+
+
 # === Tests  scan_projects ===
 
 
@@ -99,7 +138,234 @@ def test_good_data_from_api_to_scan_projects(mock_gitlab, gitlab_service):
 
     assert len(result) == 2
 
-    mock_gitlab.projects.list.assert_called_once_with(iterator=True)
+    mock_gitlab.projects.list.assert_called_once_with(
+        iterator=True, order_by="id", sort="asc"
+    )
+
+
+def test_scan_projects_updated_after(mock_gitlab, gitlab_service):
+    mock_gitlab.projects.list.return_value = MockRESTObjectList([])
+
+    list(
+        gitlab_service.scan_projects(
+            updated_after=datetime(2024, 5, 1, 12, 30, tzinfo=timezone.utc)
+        )
+    )
+
+    mock_gitlab.projects.list.assert_called_once_with(
+        order_by="updated_at",
+        sort="asc",
+        updated_after="2024-05-01T12:30:00+00:00",
+        per_page=PROJECTS_PER_PAGE,
+        page=1,
+    )
+
+
+def _updated_projects(updated_at_by_id):
+    """Projects list of the API sorted by update date, then by id, which includes
+    the projects updated at the `updated_after` date."""
+
+    def projects_list(**params):
+        after = datetime.fromisoformat(params["updated_after"])
+        projects = sorted(
+            (
+                {"id": project_id, "updated_at": updated_at}
+                for project_id, updated_at in updated_at_by_id.items()
+                if datetime.fromisoformat(updated_at) >= after
+            ),
+            key=lambda project: (project["updated_at"], project["id"]),
+        )
+        start = (params["page"] - 1) * params["per_page"]
+        return MockRESTObjectList(projects[start : start + params["per_page"]])
+
+    return projects_list
+
+
+def test_scan_projects_updated_after_requests_pages_from_last_date(
+    mock_gitlab, gitlab_service
+):
+    updated_at_by_id = {
+        project_id: f"2024-05-{project_id:02d}T00:00:00+00:00"
+        for project_id in range(1, 6)
+    }
+    mock_gitlab.projects.list.side_effect = _updated_projects(updated_at_by_id)
+
+    with patch("gitlab_monitor.services.call_gitlab.PROJECTS_PER_PAGE", 2):
+        projects = gitlab_service.scan_projects(
+            updated_after=datetime(2024, 5, 1, tzinfo=timezone.utc)
+        )
+        ids = [next(projects).id, next(projects).id]
+        # A project retrieved is updated again during the scan.
+        updated_at_by_id[1] = "2024-06-01T00:00:00+00:00"
+        ids.extend(project.id for project in projects)
+
+    assert ids == [1, 2, 3, 4, 5, 1]
+    assert [
+        call_args.kwargs["updated_after"]
+        for call_args in mock_gitlab.projects.list.call_args_list
+    ] == [
+        "2024-05-01T00:00:00+00:00",
+        "2024-05-02T00:00:00+00:00",
+        "2024-05-03T00:00:00+00:00",
+        "2024-05-04T00:00:00+00:00",
+        "2024-05-05T00:00:00+00:00",
+        "2024-06-01T00:00:00+00:00",
+    ]
+
+
+def test_scan_projects_updated_after_same_date(mock_gitlab, gitlab_service):
+    updated_at_by_id = {
+        project_id: "2024-05-02T00:00:00+00:00" for project_id in range(1, 6)
+    }
+    mock_gitlab.projects.list.side_effect = _updated_projects(updated_at_by_id)
+
+    with patch("gitlab_monitor.services.call_gitlab.PROJECTS_PER_PAGE", 2):
+        projects = list(
+            gitlab_service.scan_projects(
+                updated_after=datetime(2024, 5, 1, tzinfo=timezone.utc)
+            )
+        )
+
+    assert [project.id for project in projects] == [1, 2, 3, 4, 5]
+    assert [
+        call_args.kwargs["page"]
+        for call_args in mock_gitlab.projects.list.call_args_list
+    ] == [1, 2, 3]
+
+
+def test_scan_projects_updated_after_resume(mock_gitlab, gitlab_service):
+    mock_gitlab.projects.list.side_effect = _updated_projects(
+        {
+            1: "2024-05-01T00:00:00+00:00",
+            2: "2024-05-02T00:00:00+00:00",
+            3: "2024-05-02T00:00:00+00:00",
+            4: "2024-05-03T00:00:00+00:00",
+        }
+    )
+
+    projects = gitlab_service.scan_projects(
+        updated_after=datetime(2024, 5, 2, tzinfo=timezone.utc), updated_ids=[2]
+    )
+
+    assert [project.id for project in projects] == [3, 4]
+
+
+def test_scan_projects_id_after(mock_gitlab, gitlab_service):
+    mock_gitlab.projects.list.return_value = MockRESTObjectList([])
+
+    gitlab_service.scan_projects(id_after=42)
+
+    mock_gitlab.projects.list.assert_called_once_with(
+        iterator=True, order_by="id", sort="asc", id_after=42
+    )
+
+
+def test_scan_projects_with_filter(mock_gitlab, gitlab_service):
+    mock_gitlab.projects.list.return_value = MockRESTObjectList([])
+
+    gitlab_service.scan_projects(
+        project_filter=ProjectFilter(
+            namespace="group", archived=True, unused_since=datetime(2024, 1, 1)
+        )
+    )
+
+    mock_gitlab.projects.list.assert_called_once_with(
+        iterator=True,
+        archived=True,
+        last_activity_before="2024-01-01T00:00:00",
+        order_by="id",
+        sort="asc",
+    )
+
+
+def test_scan_projects_sorted_stops_at_first_active_project(
+    mock_gitlab, gitlab_service
+):
+    fetched = []
+
+    def pages():
+        for last_activity_at in (
+            "2023-01-01T00:00:00.000Z",
+            "2023-06-01T00:00:00.000Z",
+            "2024-02-01T00:00:00.000Z",
+            "2024-03-01T00:00:00.000Z",
+        ):
+            fetched.append(last_activity_at)
+            yield MockRESTObject({"last_activity_at": last_activity_at})
+
+    mock_gitlab.projects.list.return_value = pages()
+
+    projects = list(
+        gitlab_service.scan_projects(
+            project_filter=ProjectFilter(unused_since=datetime(2024, 1, 1)),
+            strategy=ScanStrategy.SORTED,
+        )
+    )
+
+    assert len(projects) == 2
+    assert len(fetched) == 3
+    mock_gitlab.projects.list.assert_called_once_with(
+        iterator=True,
+        last_activity_before="2024-01-01T00:00:00",
+        order_by="last_activity_at",
+        sort="asc",
+    )
+
+
+def test_scan_projects_sharded(mock_gitlab, gitlab_service):
+    def projects_list(**params):
+        if params.get("sort") == "desc":
+            return [MockRESTObject({"id": 20})]
+        return iter(
+            [
+                MockRESTObject({"id": project_id})
+                for project_id in range(1, 21)
+                if params["id_after"] < project_id < params["id_before"]
+            ]
+        )
+
+    mock_gitlab.projects.list.side_effect = projects_list
+
+    projects = gitlab_service.scan_projects(
+        project_filter=ProjectFilter(archived=False),
+        strategy=ScanStrategy.SHARDED,
+        jobs=2,
+    )
+
+    assert [project.id for project in projects] == list(range(1, 21))
+    ranges = sorted(
+        (call_args.kwargs["id_after"], call_args.kwargs["id_before"])
+        for call_args in mock_gitlab.projects.list.call_args_list[1:]
+    )
+    assert ranges == [
+        (0, 3),
+        (2, 6),
+        (5, 8),
+        (7, 11),
+        (10, 13),
+        (12, 16),
+        (15, 18),
+        (17, 21),
+    ]
+    assert all(
+        call_args.kwargs["pagination"] == "keyset"
+        and call_args.kwargs["archived"] is False
+        for call_args in mock_gitlab.projects.list.call_args_list[1:]
+    )
+
+
+def test_scan_projects_sharded_without_projects(mock_gitlab, gitlab_service):
+    mock_gitlab.projects.list.return_value = []
+
+    projects = gitlab_service.scan_projects(strategy=ScanStrategy.SHARDED, jobs=4)
+
+    assert list(projects) == []
+    mock_gitlab.projects.list.assert_called_once()
+
+
+def test_scan_projects_sorted_without_unused_since(gitlab_service):
+    with pytest.raises(ValueError):
+        gitlab_service.scan_projects(strategy=ScanStrategy.SORTED)
 
 
 def test_scan_projects_with_invalid_url(mock_gitlab, gitlab_service, caplog):
@@ -112,7 +378,9 @@ def test_scan_projects_with_invalid_url(mock_gitlab, gitlab_service, caplog):
         gitlab_service.scan_projects()
     assert e.value.code == 1
 
-    mock_gitlab.projects.list.assert_called_once_with(iterator=True)
+    mock_gitlab.projects.list.assert_called_once_with(
+        iterator=True, order_by="id", sort="asc"
+    )
     for record in caplog.records:
         assert record.levelname == "ERROR"
         assert "Error when retrieving projects due to bad url:" in record.message
@@ -127,7 +395,9 @@ def test_scan_projects_with_invalid_token(mock_gitlab, gitlab_service, caplog):
         gitlab_service.scan_projects()
     assert e.value.code == 1
 
-    mock_gitlab.projects.list.assert_called_once_with(iterator=True)
+    mock_gitlab.projects.list.assert_called_once_with(
+        iterator=True, order_by="id", sort="asc"
+    )
     for record in caplog.records:
         assert record.levelname == "ERROR"
         assert "Authentication error due to bad token:" in record.message
@@ -142,7 +412,9 @@ def test_scan_projects_with_invalid_certificate(mock_gitlab, gitlab_service, cap
         gitlab_service.scan_projects()
     assert e.value.code == 1
 
-    mock_gitlab.projects.list.assert_called_once_with(iterator=True)
+    mock_gitlab.projects.list.assert_called_once_with(
+        iterator=True, order_by="id", sort="asc"
+    )
     for record in caplog.records:
         assert record.levelname == "ERROR"
         assert "Wrong path to gitlab authentifcation certificate:" in record.message
@@ -178,7 +450,9 @@ def test_scan_projects_with_without_certificat(mock_gitlab, gitlab_service, capl
 
     assert len(result) == 2
 
-    mock_gitlab.projects.list.assert_called_once_with(iterator=True)
+    mock_gitlab.projects.list.assert_called_once_with(
+        iterator=True, order_by="id", sort="asc"
+    )
 
     for record in caplog.records:
         assert record.levelname == "WARNING"
@@ -339,11 +613,151 @@ def test_good_data_from_api_to_get_project_commit(gitlab_service):
     with patch.object(mock_project, "commits") as mock_commits:
         mock_commits.list.return_value = MockRESTObjectList(commits_list)
 
-        result = gitlab_service.get_project_commit(mock_project)
+        result = list(gitlab_service.get_project_commit(mock_project))
 
         assert len(result) == 3
 
-        mock_commits.list.assert_called_once_with(get_all=True, all=True)
+        mock_commits.list.assert_called_once_with(iterator=True, per_page=100)
+
+
+def test_get_project_commit_since(gitlab_service):
+    mock_project = MockRESTObject({"id": 1, "name": "Project 1"})
+    mock_project.commits = MagicMock()
+
+    list(
+        gitlab_service.get_project_commit(
+            mock_project, since=datetime(2024, 5, 1, tzinfo=timezone.utc)
+        )
+    )
+
+    mock_project.commits.list.assert_called_once_with(
+        iterator=True, per_page=100, since="2024-05-01T00:00:00+00:00"
+    )
+
+
+def test_get_project_commit_until(gitlab_service):
+    mock_project = MockRESTObject({"id": 1, "name": "Project 1"})
+    mock_project.commits = MagicMock()
+
+    list(
+        gitlab_service.get_project_commit(
+            mock_project, until=datetime(2024, 5, 1, tzinfo=timezone.utc)
+        )
+    )
+
+    mock_project.commits.list.assert_called_once_with(
+        iterator=True, per_page=100, until="2024-05-01T00:00:00+00:00"
+    )
+
+
+def test_get_project_commit_error_on_next_page(gitlab_service):
+    mock_project = MockRESTObject({"id": 1, "name": "Project 1"})
+    mock_project.commits = MagicMock()
+    mock_project.commits.list.return_value = _failing_pages()
+
+    commits = gitlab_service.get_project_commit(mock_project)
+
+    assert next(commits) == "commit"
+    with pytest.raises(SystemExit):
+        next(commits)
+
+
+def _failing_pages():
+    yield "commit"
+    raise gitlab_exceptions.GitlabHttpError("Server error", 500)
+
+
+# === Tests  is_commit_in_branches ===
+
+
+def test_is_commit_in_branches(gitlab_service):
+    mock_project = MagicMock()
+    mock_project.commits.get.return_value.refs.return_value = [
+        {"type": "branch", "name": "main"}
+    ]
+
+    assert gitlab_service.is_commit_in_branches(mock_project, "abc")
+
+    mock_project.commits.get.assert_called_once_with("abc", lazy=True)
+    mock_project.commits.get.return_value.refs.assert_called_once_with(type="branch")
+
+
+def test_is_commit_in_branches_no_branch(gitlab_service):
+    mock_project = MagicMock()
+    mock_project.commits.get.return_value.refs.return_value = []
+
+    assert not gitlab_service.is_commit_in_branches(mock_project, "abc")
+
+
+def test_is_commit_in_branches_commit_not_found(gitlab_service):
+    mock_project = MagicMock()
+    mock_project.commits.get.return_value.refs.side_effect = (
+        gitlab_exceptions.GitlabGetError(
+            response_code=404, error_message="404 Commit Not Found"
+        )
+    )
+
+    assert not gitlab_service.is_commit_in_branches(mock_project, "abc")
+
+
+# === Tests  get_commits_details ===
+
+
+def test_get_commits_details_sequential(gitlab_service):
+    mock_project = MagicMock()
+    mock_project.commits.get.side_effect = lambda commit_id: MockRESTObject(
+        {"id": commit_id}
+    )
+
+    result = list(gitlab_service.get_commits_details(mock_project, ["a", "b", "c"]))
+
+    assert [commit.id for commit in result] == ["a", "b", "c"]
+    assert mock_project.commits.get.call_count == 3
+
+
+def test_get_commits_details_concurrent_keeps_order(gitlab_service):
+    mock_project = MagicMock()
+
+    def get_commit(commit_id):
+        # The first commits are the slowest ones to answer.
+        time.sleep(0.01 * (5 - int(commit_id)))
+        return MockRESTObject({"id": commit_id})
+
+    mock_project.commits.get.side_effect = get_commit
+    commit_ids = [str(index) for index in range(5)]
+
+    result = list(gitlab_service.get_commits_details(mock_project, commit_ids, 4))
+
+    assert [commit.id for commit in result] == commit_ids
+    assert mock_project.commits.get.call_count == 5
+
+
+def test_get_commits_details_concurrent_is_bounded(gitlab_service):
+    mock_project = MagicMock()
+    mock_project.commits.get.side_effect = lambda commit_id: MockRESTObject(
+        {"id": commit_id}
+    )
+
+    details = gitlab_service.get_commits_details(
+        mock_project, [str(index) for index in range(10)], 2
+    )
+    assert next(details).id == "0"
+    time.sleep(0.05)
+
+    assert mock_project.commits.get.call_count == 2
+    details.close()
+
+
+def test_get_commits_details_concurrent_error(gitlab_service):
+    mock_project = MockRESTObject({"id": 1, "name": "Project 1"})
+    mock_project.commits = MagicMock()
+    mock_project.commits.get.side_effect = gitlab_exceptions.GitlabGetError(
+        response_code=404, error_message="404 Commit Not Found"
+    )
+
+    with pytest.raises(SystemExit) as e:
+        list(gitlab_service.get_commits_details(mock_project, ["a", "b"], 2))
+    assert e.value.code == 1
 
 
 # === Tests archive_project ===
@@ -377,3 +791,52 @@ def test_archive_project_failure(mock_gitlab, gitlab_service, caplog):
     for record in caplog.records:
         assert record.levelname == "ERROR"
         assert f"Error when archiving project {mock_project.name}" in record.message
+
+
+def test_get_project_handle(mock_gitlab, gitlab_service):
+    project = gitlab_service.get_project_handle(7)
+
+    mock_gitlab.projects.get.assert_called_once_with(7, lazy=True)
+    assert project is mock_gitlab.projects.get.return_value
+
+
+def test_archive_project_handle_without_name(gitlab_service):
+    project = MagicMock(spec=["archive", "get_id"])
+    project.get_id.return_value = 7
+
+    with patch("gitlab_monitor.services.call_gitlab.logger") as mock_logger:
+        gitlab_service.archive_project(project)
+
+    project.archive.assert_called_once()
+    mock_logger.info.assert_called_once_with("Archiving project %s...", 7)
+
+
+# === Tests archive_projects ===
+
+
+def test_archive_projects_reports_failures(mock_gitlab, gitlab_service):
+    projects = {project_id: MagicMock() for project_id in (1, 2, 3)}
+    projects[2].archive.side_effect = gitlab_exceptions.GitlabCreateError(
+        response_code=404, error_message="404 Project Not Found"
+    )
+    mock_gitlab.projects.get.side_effect = lambda project_id, lazy: projects[project_id]
+
+    results = list(gitlab_service.archive_projects([1, 2, 3], 2))
+
+    assert [project_id for project_id, _ in results] == [1, 2, 3]
+    assert results[0][1] is None
+    assert "404 Project Not Found" in results[1][1]
+    assert results[2][1] is None
+    for project in projects.values():
+        project.archive.assert_called_once()
+    assert all(call.kwargs["lazy"] for call in mock_gitlab.projects.get.call_args_list)
+
+
+def test_archive_projects_reports_network_errors(mock_gitlab, gitlab_service):
+    projects = {project_id: MagicMock() for project_id in (1, 2)}
+    projects[1].archive.side_effect = ReadTimeout()
+    mock_gitlab.projects.get.side_effect = lambda project_id, lazy: projects[project_id]
+
+    results = list(gitlab_service.archive_projects([1, 2], 2))
+
+    assert results == [(1, "ReadTimeout"), (2, None)]
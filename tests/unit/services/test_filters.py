@@ -0,0 +1,70 @@
+# # --- Copyright (c) 2024-2025 Linagora
+# # licence       : GPL v3
+# # - Flavien Perez fperez@linagora.com
+# # - Maïlys Jara mjara@linagora.com
+from datetime import datetime
+from unittest.mock import MagicMock
+
+import pytest
+
+from gitlab_monitor.services.filters import ProjectFilter
+from gitlab_monitor.services.filters import Visibility
+
+
+@pytest.fixture
+def project():
+    return MagicMock(
+        path_with_namespace="group/subgroup/project",
+        visibility="internal",
+        archived=False,
+        last_activity_at="2024-03-01T10:00:00.000Z",
+    )
+
+
+def test_empty_filter(project):
+    project_filter = ProjectFilter()
+
+    assert project_filter.is_empty()
+    assert project_filter.to_api_params() == {}
+    assert project_filter.matches(project)
+
+
+def test_to_api_params():
+    project_filter = ProjectFilter(
+        visibility=Visibility.PRIVATE,
+        namespace="group",
+        archived=False,
+        search="monitor",
+        active_since=datetime(2024, 1, 1),
+        unused_since=datetime(2024, 6, 1),
+    )
+
+    assert not project_filter.is_empty()
+    assert project_filter.to_api_params() == {
+        "visibility": "private",
+        "archived": False,
+        "search": "monitor",
+        "last_activity_after": "2024-01-01T00:00:00",
+        "last_activity_before": "2024-06-01T00:00:00",
+    }
+
+
+@pytest.mark.parametrize(
+    "project_filter, expected",
+    [
+        (ProjectFilter(namespace="group"), True),
+        (ProjectFilter(namespace="group/subgroup/"), True),
+        (ProjectFilter(namespace="group/sub"), False),
+        (ProjectFilter(visibility="internal"), True),
+        (ProjectFilter(visibility=Visibility.PUBLIC), False),
+        (ProjectFilter(archived=False), True),
+        (ProjectFilter(archived=True), False),
+        (ProjectFilter(search="anything"), True),
+        (ProjectFilter(active_since=datetime(2024, 3, 1)), True),
+        (ProjectFilter(active_since=datetime(2024, 3, 2)), False),
+        (ProjectFilter(unused_since=datetime(2024, 3, 2)), True),
+        (ProjectFilter(unused_since=datetime(2024, 3, 1)), False),
+    ],
+)
+def test_matches(project, project_filter, expected):
+    assert project_filter.matches(project) is expected
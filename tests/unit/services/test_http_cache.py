@@ -0,0 +1,241 @@
+# # --- Copyright (c) 2024-2025 Linagora
+# # licence       : GPL v3
+# # - Flavien Perez fperez@linagora.com
+# # - Maïlys Jara mjara@linagora.com
+import threading
+from unittest.mock import MagicMock
+from unittest.mock import patch
+
+import pytest
+from requests import Request
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from gitlab_monitor.services.http_cache import CachingAdapter
+from gitlab_monitor.services.http_cache import HTTPCache
+from gitlab_monitor.services.http_cache import cache_key
+from gitlab_monitor.services.rate_limiter import RateLimiter
+
+
+URL = "https://gitlab.example.com/api/v4/projects/1"
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def cache(clock):
+    return HTTPCache(":memory:", ttl=60, max_size=10, clock=clock)
+
+
+@pytest.fixture
+def adapter(cache):
+    return CachingAdapter(RateLimiter(), cache)
+
+
+def get_request(url=URL, token="token"):
+    return Request("GET", url, headers={"PRIVATE-TOKEN": token}).prepare()
+
+
+def response(status_code=200, headers=None, content=b"{}"):
+    return MagicMock(
+        status_code=status_code,
+        headers=CaseInsensitiveDict(headers or {}),
+        content=content,
+        ok=status_code < 400,
+    )
+
+
+# ----- Tests HTTPCache -----
+
+
+def test_cache_get_fresh_then_stale(cache, clock):
+    cache.set("key", URL, {"ETag": '"a"'}, b"body")
+
+    headers, body, fresh = cache.get("key")
+    assert headers["etag"] == '"a"'
+    assert body == b"body"
+    assert fresh
+
+    clock.now += 61
+    assert not cache.get("key")[2]
+
+
+def test_cache_get_missing(cache):
+    assert cache.get("key") is None
+
+
+def test_cache_evicts_least_recently_used(cache, clock):
+    cache.set("a", URL, {}, b"1234")
+    clock.now += 1
+    cache.set("b", URL, {}, b"1234")
+    clock.now += 1
+    cache.get("a")
+    clock.now += 1
+
+    cache.set("c", URL, {}, b"1234")
+
+    assert cache.get("a") is not None
+    assert cache.get("b") is None
+    assert cache.get("c") is not None
+
+
+def test_cache_invalidate(cache):
+    cache.set("a", URL, {}, b"1")
+    cache.set("b", URL + "/commits", {}, b"1")
+    cache.set("c", URL + "?statistics=true", {}, b"1")
+    cache.set("d", URL + "0", {}, b"1")
+    cache.set("e", URL + "0/commits", {}, b"1")
+
+    cache.invalidate(URL)
+
+    assert cache.get("a") is None
+    assert cache.get("b") is None
+    assert cache.get("c") is None
+    assert cache.get("d") is not None
+    assert cache.get("e") is not None
+
+
+def test_cache_keeps_size_up_to_date(cache):
+    cache.set("a", URL, {}, b"1234")
+    cache.set("a", URL, {}, b"12345")
+    cache.set("b", URL + "/commits", {}, b"123")
+    cache.set("c", URL + "0", {}, b"12")
+    assert cache._size == 10
+
+    cache.invalidate(URL + "/commits")
+    assert cache._size == 7
+
+    cache.set("d", URL, {}, b"123456")
+    assert cache._size == 8
+    assert cache.get("a") is None
+
+
+def test_cache_writes_access_times_on_flush(cache, clock):
+    cache.set("a", URL, {}, b"1")
+    clock.now += 10
+    cache.get("a")
+
+    query = "SELECT accessed_at FROM response WHERE key = 'a'"
+    assert cache._connection.execute(query).fetchone() == (1000.0,)
+    cache.flush()
+    assert cache._connection.execute(query).fetchone() == (1010.0,)
+
+
+def test_cache_close_writes_access_times(tmp_path, clock):
+    path = str(tmp_path / "cache.db")
+    cache = HTTPCache(path, ttl=60, max_size=10, clock=clock)
+    cache.set("a", URL, {}, b"1")
+    clock.now += 10
+    cache.get("a")
+
+    cache.close()
+
+    reopened = HTTPCache(path, ttl=60, max_size=10, clock=clock)
+    query = "SELECT accessed_at FROM response WHERE key = 'a'"
+    assert reopened._connection.execute(query).fetchone() == (1010.0,)
+    reopened.close()
+
+
+def test_cache_counts_under_lock(cache):
+    cache.set("a", URL, {}, b"1")
+
+    threads = [
+        threading.Thread(target=lambda: [cache.get("a") for _ in range(100)])
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert cache.hits == 800
+
+
+def test_cache_key_depends_on_token():
+    assert cache_key(get_request(token="a")) != cache_key(get_request(token="b"))
+
+
+# ----- Tests CachingAdapter -----
+
+
+def test_adapter_serves_fresh_response_without_request(adapter, cache):
+    with patch.object(
+        HTTPAdapter, "send", return_value=response(headers={"ETag": '"a"'})
+    ) as mock_send:
+        adapter.send(get_request())
+        result = adapter.send(get_request())
+
+    assert mock_send.call_count == 1
+    assert result.status_code == 200
+    assert result.content == b"{}"
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_adapter_revalidates_stale_response(adapter, cache, clock):
+    with patch.object(
+        HTTPAdapter,
+        "send",
+        side_effect=[
+            response(headers={"ETag": '"a"', "Last-Modified": "yesterday"}),
+            response(304),
+        ],
+    ) as mock_send:
+        adapter.send(get_request())
+        clock.now += 61
+        result = adapter.send(get_request())
+
+    request = mock_send.call_args.args[0]
+    assert request.headers["If-None-Match"] == '"a"'
+    assert request.headers["If-Modified-Since"] == "yesterday"
+    assert result.status_code == 200
+    assert result.content == b"{}"
+    assert cache.revalidations == 1
+    assert cache.get(cache_key(get_request()))[2]
+
+
+def test_adapter_does_not_store_response_without_validator(adapter, cache):
+    with patch.object(HTTPAdapter, "send", return_value=response()) as mock_send:
+        adapter.send(get_request())
+        adapter.send(get_request())
+
+    assert mock_send.call_count == 2
+    assert cache.misses == 2
+
+
+def test_adapter_invalidates_on_write(adapter, cache):
+    cache.set(cache_key(get_request()), URL, {"ETag": '"a"'}, b"{}")
+
+    with patch.object(HTTPAdapter, "send", return_value=response(201)):
+        adapter.send(
+            Request("POST", URL + "/archive", headers={"PRIVATE-TOKEN": "t"}).prepare()
+        )
+
+    assert cache.get(cache_key(get_request())) is None
+
+
+def test_adapter_invalidates_only_the_written_project(adapter, cache):
+    cache.set("12", "https://gitlab.example.com/api/v4/projects/12", {}, b"{}")
+    cache.set("123", "https://gitlab.example.com/api/v4/projects/123", {}, b"{}")
+
+    with patch.object(HTTPAdapter, "send", return_value=response(201)):
+        adapter.send(
+            Request(
+                "POST",
+                "https://gitlab.example.com/api/v4/projects/12/archive",
+                headers={"PRIVATE-TOKEN": "t"},
+            ).prepare()
+        )
+
+    assert cache.get("12") is None
+    assert cache.get("123") is not None
@@ -0,0 +1,56 @@
+# # --- Copyright (c) 2024-2025 Linagora
+# # licence       : GPL v3
+# # - Flavien Perez fperez@linagora.com
+# # - Maïlys Jara mjara@linagora.com
+import json
+
+import pytest
+
+from gitlab_monitor.services.journal import ProjectJournal
+
+
+def test_journal_records_outcomes(tmp_path):
+    path = tmp_path / "journal" / "archive.jsonl"
+
+    with ProjectJournal(str(path), "archive") as journal:
+        journal.record(1)
+        journal.record(2, "404 Project Not Found")
+
+    entries = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [(entry["project_id"], entry["error"]) for entry in entries] == [
+        (1, None),
+        (2, "404 Project Not Found"),
+    ]
+    assert entries[0]["action"] == "archive"
+
+
+def test_journal_done_ids_keeps_last_outcome(tmp_path):
+    path = tmp_path / "archive.jsonl"
+    with ProjectJournal(str(path), "archive") as journal:
+        journal.record(1)
+        journal.record(2, "error")
+        journal.record(3)
+        journal.record(3, "error")
+        journal.record(2)
+    with ProjectJournal(str(path), "unarchive") as journal:
+        journal.record(4)
+
+    assert ProjectJournal(str(path), "archive").done_ids() == {1, 2}
+
+
+def test_journal_done_ids_missing_file(tmp_path):
+    assert (
+        ProjectJournal(str(tmp_path / "archive.jsonl"), "archive").done_ids() == set()
+    )
+
+
+def test_journal_done_ids_ignores_truncated_line(tmp_path):
+    path = tmp_path / "archive.jsonl"
+    path.write_text('{"project_id": 1, "action": "archive", "error": null}\n{"proj')
+
+    assert ProjectJournal(str(path), "archive").done_ids() == {1}
+
+
+def test_journal_record_needs_open_journal(tmp_path):
+    with pytest.raises(ValueError):
+        ProjectJournal(str(tmp_path / "archive.jsonl"), "archive").record(1)
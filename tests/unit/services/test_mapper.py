@@ -20,6 +20,7 @@ def test_project_from_gitlab_api():
     project_data.visibility = "public"
     project_data.created_at = "2024-01-01T00:00:00Z"
     project_data.updated_at = "2024-01-02T00:00:00Z"
+    project_data.last_activity_at = "2024-01-03T00:00:00Z"
 
     mapper = Mapper()
 
@@ -34,6 +35,7 @@ def test_project_from_gitlab_api():
     assert project_dto.visibility == "public"
     assert project_dto.created_at.replace(tzinfo=None) == datetime(2024, 1, 1, 0, 0)
     assert project_dto.updated_at.replace(tzinfo=None) == datetime(2024, 1, 2, 0, 0)
+    assert project_dto.last_activity_at.replace(tzinfo=None) == datetime(2024, 1, 3)
 
 
 def test_commit_from_gitlab_api():
@@ -56,3 +58,45 @@ def test_commit_from_gitlab_api():
     assert commit_dto.project_id == 1
     assert commit_dto.date.replace(tzinfo=None) == datetime(2024, 1, 1, 0, 0)
     assert commit_dto.author == "John Doe"
+
+
+def test_commit_from_gitlab_api_list():
+    commit_data = MagicMock()
+    commit_data.id = "abc123"
+    commit_data.title = "Initial commit"
+    commit_data.authored_date = "2024-01-01T00:00:00Z"
+    commit_data.author_name = "John Doe"
+
+    mapper = Mapper()
+
+    commit_dto = mapper.commit_from_gitlab_api_list(commit_data, 1)
+
+    assert isinstance(commit_dto, CommitDTO)
+    assert commit_dto.commit_id == "abc123"
+    assert commit_dto.message == "Initial commit"
+    assert commit_dto.project_id == 1
+    assert commit_dto.date.replace(tzinfo=None) == datetime(2024, 1, 1, 0, 0)
+    assert commit_dto.author == "John Doe"
+
+
+def test_commit_from_gitlab_api_list_is_equivalent_to_details():
+    """The single pass mapping gives the same DTO as the list + details mapping."""
+    commit_list_item = {
+        "id": "abc123",
+        "short_id": "abc1",
+        "title": "Initial commit",
+        "author_name": "John Doe",
+        "author_email": "john.doe@example.com",
+        "authored_date": "2024-01-01T10:20:30.000+01:00",
+        "committed_date": "2024-01-02T00:00:00.000+01:00",
+    }
+    commit_data = MagicMock(**commit_list_item)
+    commit_details = MagicMock(
+        **commit_list_item, project_id=1, stats={"additions": 1, "deletions": 0}
+    )
+
+    mapper = Mapper()
+
+    assert mapper.commit_from_gitlab_api_list(
+        commit_data, 1
+    ) == mapper.commit_from_gitlab_api(commit_data, commit_details)
@@ -0,0 +1,116 @@
+# # --- Copyright (c) 2024-2025 Linagora
+# # licence       : GPL v3
+# # - Flavien Perez fperez@linagora.com
+# # - Maïlys Jara mjara@linagora.com
+import threading
+import time
+
+import pytest
+
+from gitlab_monitor.services.pipeline import chain_stages
+from gitlab_monitor.services.pipeline import stage
+
+
+def test_stage_keeps_order():
+    assert list(stage(range(100), 4)) == list(range(100))
+
+
+def test_stage_empty():
+    assert not list(stage([], 4))
+
+
+def test_stage_is_bounded():
+    produced = []
+
+    def source():
+        for index in range(10):
+            produced.append(index)
+            yield index
+
+    elements = stage(source(), 2)
+    assert next(elements) == 0
+    time.sleep(0.1)
+
+    # One element consumed, two waiting in the queue and one waiting to be put.
+    assert len(produced) == 4
+    assert list(elements) == list(range(1, 10))
+
+
+def test_stage_raises_error_after_elements():
+    def source():
+        yield 1
+        yield 2
+        raise SystemExit(1)
+
+    elements = stage(source(), 4)
+
+    assert next(elements) == 1
+    assert next(elements) == 2
+    with pytest.raises(SystemExit):
+        next(elements)
+
+
+def test_stage_runs_in_thread():
+    threads = []
+
+    def source():
+        threads.append(threading.current_thread())
+        yield 1
+
+    assert list(stage(source(), 1)) == [1]
+    assert threads[0] is not threading.current_thread()
+
+
+def test_stage_stops_when_consumer_stops():
+    closed = threading.Event()
+
+    def source():
+        try:
+            index = 0
+            while True:
+                yield index
+                index += 1
+        finally:
+            closed.set()
+
+    elements = stage(source(), 2)
+    assert next(elements) == 0
+    elements.close()
+
+    assert closed.wait(1)
+
+
+def test_chain_stages_keeps_order():
+    iterables = [range(index * 10, index * 10 + 10) for index in range(5)]
+
+    assert list(chain_stages(iterables, 3, 2)) == list(range(50))
+
+
+def test_chain_stages_is_bounded():
+    produced = [[] for _ in range(4)]
+
+    def source(index):
+        for element in range(10):
+            produced[index].append(element)
+            yield element
+
+    elements = chain_stages((source(index) for index in range(4)), 2, 2)
+    assert next(elements) == 0
+    time.sleep(0.1)
+
+    # The first two iterables are produced, at most 2 elements ahead.
+    assert [len(elements) for elements in produced] == [4, 3, 0, 0]
+    assert len(list(elements)) == 39
+
+
+def test_chain_stages_raises_error():
+    def source():
+        yield 1
+        raise SystemExit(1)
+
+    elements = chain_stages([[0], source(), [2]], 4, 2)
+
+    assert next(elements) == 0
+    assert next(elements) == 1
+    with pytest.raises(SystemExit):
+        next(elements)
@@ -0,0 +1,226 @@
+# # --- Copyright (c) 2024-2025 Linagora
+# # licence       : GPL v3
+# # - Flavien Perez fperez@linagora.com
+# # - Maïlys Jara mjara@linagora.com
+from unittest.mock import MagicMock
+from unittest.mock import patch
+
+import pytest
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ConnectionError
+from requests.exceptions import ReadTimeout
+
+from gitlab_monitor.services.rate_limiter import RateLimitedAdapter
+from gitlab_monitor.services.rate_limiter import RateLimiter
+from gitlab_monitor.services.rate_limiter import jittered_backoff
+from gitlab_monitor.services.rate_limiter import retry_after
+
+
+class FakeClock:
+    """Clock advanced by the sleeps of the rate limiter."""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, delay):
+        self.sleeps.append(delay)
+        self.now += delay
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def limiter(clock):
+    return RateLimiter(margin=0.0, burst=2, clock=clock, sleep=clock.sleep)
+
+
+# ----- Tests RateLimiter -----
+
+
+def test_acquire_unlimited_without_headers(limiter, clock):
+    for _ in range(10):
+        limiter.acquire()
+
+    assert limiter.rate is None
+    assert not clock.sleeps
+
+
+def test_update_sets_rate_from_headers(limiter, clock):
+    limiter.update({"RateLimit-Remaining": "100", "RateLimit-Reset": str(clock() + 50)})
+
+    assert limiter.rate == 2.0
+
+
+def test_update_keeps_margin(clock):
+    limiter = RateLimiter(margin=0.1, clock=clock, sleep=clock.sleep)
+
+    limiter.update({"RateLimit-Remaining": "100", "RateLimit-Reset": str(clock() + 10)})
+
+    assert limiter.rate == pytest.approx(9.0)
+
+
+def test_update_ignores_missing_headers(limiter):
+    limiter.update({"RateLimit-Remaining": "100"})
+
+    assert limiter.rate is None
+
+
+def test_acquire_waits_for_tokens(limiter, clock):
+    limiter.update({"RateLimit-Remaining": "10", "RateLimit-Reset": str(clock() + 10)})
+
+    for _ in range(4):
+        limiter.acquire()
+
+    # The burst of 2 tokens, then one token per second.
+    assert clock.sleeps == [1.0, 1.0]
+
+
+def test_acquire_unlimited_keeps_burst(limiter, clock):
+    for _ in range(10):
+        limiter.acquire()
+    limiter.update({"RateLimit-Remaining": "10", "RateLimit-Reset": str(clock() + 10)})
+
+    limiter.acquire()
+    limiter.acquire()
+
+    assert not clock.sleeps
+
+
+def test_update_pauses_until_reset_when_exhausted(limiter, clock):
+    reset = clock() + 30
+    limiter.update({"RateLimit-Remaining": "0", "RateLimit-Reset": str(reset)})
+
+    limiter.acquire()
+
+    assert clock.now >= reset
+
+
+def test_pause_holds_requests(limiter, clock):
+    limiter.pause(5)
+
+    limiter.acquire()
+
+    assert clock.sleeps == [5]
+
+
+# ----- Tests helpers -----
+
+
+def test_retry_after_seconds():
+    assert retry_after({"Retry-After": "12"}) == 12.0
+
+
+def test_retry_after_http_date():
+    with patch("gitlab_monitor.services.rate_limiter.time.time", return_value=0):
+        assert retry_after({"Retry-After": "Thu, 01 Jan 1970 00:00:30 GMT"}) == 30.0
+
+
+def test_retry_after_missing_or_invalid():
+    assert retry_after({}) is None
+    assert retry_after({"Retry-After": "soon"}) is None
+
+
+def test_jittered_backoff_is_bounded():
+    for attempt in range(10):
+        assert 0 <= jittered_backoff(attempt, 1.0) <= min(60.0, 2**attempt)
+
+
+# ----- Tests RateLimitedAdapter -----
+
+
+def response(status_code, headers=None):
+    return MagicMock(status_code=status_code, headers=headers or {})
+
+
+def test_adapter_retries_rejected_requests(limiter, clock):
+    adapter = RateLimitedAdapter(limiter, retries=3)
+    responses = [response(429, {"Retry-After": "2"}), response(200)]
+
+    with patch.object(HTTPAdapter, "send", side_effect=responses) as mock_send:
+        result = adapter.send(MagicMock())
+
+    assert result is responses[1]
+    assert mock_send.call_count == 2
+    assert clock.sleeps == [2.0]
+
+
+def test_adapter_returns_rejection_after_retries(limiter):
+    adapter = RateLimitedAdapter(limiter, retries=2, backoff=0)
+
+    with patch.object(
+        HTTPAdapter, "send", side_effect=[response(429) for _ in range(3)]
+    ) as mock_send:
+        result = adapter.send(MagicMock())
+
+    assert result.status_code == 429
+    assert mock_send.call_count == 3
+
+
+def test_adapter_updates_limiter(limiter, clock):
+    adapter = RateLimitedAdapter(limiter)
+    headers = {"RateLimit-Remaining": "20", "RateLimit-Reset": str(clock() + 10)}
+
+    with patch.object(HTTPAdapter, "send", return_value=response(200, headers)):
+        adapter.send(MagicMock())
+
+    assert limiter.rate == 2.0
+
+
+def test_adapter_retries_transient_errors_through_limiter(limiter):
+    adapter = RateLimitedAdapter(limiter, transport_retries=2, transport_backoff=0)
+    responses = [response(503), response(200)]
+
+    with patch.object(limiter, "acquire") as mock_acquire, patch.object(
+        HTTPAdapter, "send", side_effect=responses
+    ) as mock_send:
+        result = adapter.send(MagicMock(method="GET"))
+
+    assert result is responses[1]
+    assert mock_send.call_count == 2
+    assert mock_acquire.call_count == 2
+    responses[0].close.assert_called_once()
+
+
+def test_adapter_returns_transient_error_after_retries(limiter):
+    adapter = RateLimitedAdapter(limiter, transport_retries=1, transport_backoff=0)
+
+    with patch.object(
+        HTTPAdapter, "send", side_effect=[response(502), response(502)]
+    ) as mock_send:
+        result = adapter.send(MagicMock(method="GET"))
+
+    assert result.status_code == 502
+    assert mock_send.call_count == 2
+
+
+def test_adapter_retries_connection_errors(limiter):
+    adapter = RateLimitedAdapter(limiter, transport_retries=2, transport_backoff=0)
+    ok = response(200)
+
+    with patch.object(limiter, "acquire") as mock_acquire, patch.object(
+        HTTPAdapter, "send", side_effect=[ConnectionError(), ReadTimeout(), ok]
+    ):
+        result = adapter.send(MagicMock(method="GET"))
+
+    assert result is ok
+    assert mock_acquire.call_count == 3
+
+
+def test_adapter_does_not_retry_non_idempotent_requests(limiter):
+    adapter = RateLimitedAdapter(limiter, transport_retries=2, transport_backoff=0)
+
+    with patch.object(HTTPAdapter, "send", side_effect=ReadTimeout()) as mock_send:
+        with pytest.raises(ReadTimeout):
+            adapter.send(MagicMock(method="POST"))
+    assert mock_send.call_count == 1
+
+    with patch.object(HTTPAdapter, "send", return_value=response(503)) as mock_send:
+        assert adapter.send(MagicMock(method="POST")).status_code == 503
+    assert mock_send.call_count == 1
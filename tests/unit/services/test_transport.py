@@ -0,0 +1,49 @@
+# # --- Copyright (c) 2024-2025 Linagora
+# # licence       : GPL v3
+# # - Flavien Perez fperez@linagora.com
+# # - Maïlys Jara mjara@linagora.com
+from gitlab_monitor.services.http_cache import CachingAdapter
+from gitlab_monitor.services.http_cache import HTTPCache
+from gitlab_monitor.services.rate_limiter import RateLimitedAdapter
+from gitlab_monitor.services.rate_limiter import RateLimiter
+from gitlab_monitor.services.transport import DEFAULT_POOL_SIZE
+from gitlab_monitor.services.transport import build_session
+
+
+def test_build_session():
+    limiter = RateLimiter()
+
+    session = build_session(limiter, pool_size=32)
+
+    adapter = session.get_adapter("https://gitlab.example.com")
+    assert isinstance(adapter, RateLimitedAdapter)
+    assert adapter.limiter is limiter
+    assert adapter._pool_maxsize == 32
+    assert session.get_adapter("http://gitlab.example.com") is adapter
+    assert "gzip" in session.headers["Accept-Encoding"]
+
+
+def test_build_session_minimum_pool_size():
+    session = build_session(RateLimiter(), pool_size=1)
+
+    adapter = session.get_adapter("https://gitlab.example.com")
+    assert adapter._pool_maxsize == DEFAULT_POOL_SIZE
+
+
+def test_build_session_retries_idempotent_requests():
+    session = build_session(RateLimiter())
+
+    adapter = session.get_adapter("https://gitlab.example.com")
+    # The retries are done by the adapter, through the rate limiter.
+    assert adapter.transport_retries > 0
+    assert adapter.max_retries.total == 0
+
+
+def test_build_session_with_cache():
+    cache = HTTPCache(":memory:")
+
+    session = build_session(RateLimiter(), cache=cache)
+
+    adapter = session.get_adapter("https://gitlab.example.com")
+    assert isinstance(adapter, CachingAdapter)
+    assert adapter.cache is cache
@@ -0,0 +1,27 @@
+# # --- Copyright (c) 2024-2025 Linagora
+# # licence       : GPL v3
+# # - Flavien Perez fperez@linagora.com
+# # - Maïlys Jara mjara@linagora.com
+from gitlab_monitor.services.utils import batched
+
+
+def test_batched():
+    assert list(batched(range(5), 2)) == [[0, 1], [2, 3], [4]]
+
+
+def test_batched_empty():
+    assert not list(batched([], 2))
+
+
+def test_batched_is_lazy():
+    consumed = []
+
+    def source():
+        for index in range(4):
+            consumed.append(index)
+            yield index
+
+    batches = batched(source(), 2)
+
+    assert next(batches) == [0, 1]
+    assert consumed == [0, 1]
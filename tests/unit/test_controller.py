@@ -4,22 +4,35 @@
 # # - Maïlys Jara mjara@linagora.com
 import json
 from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+from unittest.mock import ANY
 from unittest.mock import MagicMock
 from unittest.mock import call
 from unittest.mock import mock_open
 from unittest.mock import patch
 
 import pytest
+from requests.exceptions import ReadTimeout
 
 from gitlab_monitor.controller.controller import ArchiveProjectCommand
 from gitlab_monitor.controller.controller import GetProjectCommand
 from gitlab_monitor.controller.controller import GetProjectsCommand
+from gitlab_monitor.controller.controller import UpgradeDatabaseCommand
+from gitlab_monitor.controller.controller import WorkerCommand
 from gitlab_monitor.logger.logger import logger
+from gitlab_monitor.services.async_gitlab import BridgedGitlabAPIService
+from gitlab_monitor.services.bdd.checkpoint_repository import Checkpoint
+from gitlab_monitor.services.bdd.repository import DEFAULT_BATCH_SIZE
+from gitlab_monitor.services.bdd.repository import UpsertResult
+from gitlab_monitor.services.call_gitlab import ScanStrategy
 from gitlab_monitor.services.dto import CommitDTO
 from gitlab_monitor.services.dto import ProjectDTO
+from gitlab_monitor.services.filters import ProjectFilter
 from gitlab_monitor.services.mapper import Mapper
 from gitlab_monitor.services.pretty_print import PrintCommitDTO
 from gitlab_monitor.services.pretty_print import PrintProjectDTO
+from gitlab_monitor.services.utils import batched
 
 
 # === Fixtures ===
@@ -40,12 +53,60 @@ def gitlab_service():
 
 @pytest.fixture
 def project_repository():
-    return MagicMock()
+    project_repository = MagicMock()
+    project_repository.saved_dto = []
+
+    def upsert_many(projects_dto, batch_size, on_batch=None):
+        for batch in batched(projects_dto, batch_size):
+            project_repository.saved_dto.extend(batch)
+            if on_batch:
+                on_batch(list(batch))
+        return UpsertResult(inserted=len(project_repository.saved_dto))
+
+    project_repository.upsert_many.side_effect = upsert_many
+    return project_repository
 
 
 @pytest.fixture
 def commit_repository():
-    return MagicMock()
+    commit_repository = MagicMock()
+    commit_repository.saved_dto = []
+    commit_repository.load_identity_index.return_value = None
+
+    def upsert_many(commits_dto, batch_size, on_batch=None):
+        for batch in batched(commits_dto, batch_size):
+            commit_repository.saved_dto.extend(batch)
+            if on_batch:
+                on_batch(list(batch))
+        return commit_repository.upsert_many.return_value
+
+    def copy_many(commits_dto, batch_size=2, on_batch=None):
+        for batch in batched(commits_dto, batch_size):
+            commit_repository.saved_dto.extend(batch)
+            if on_batch:
+                on_batch(list(batch))
+        return commit_repository.copy_many.return_value
+
+    commit_repository.upsert_many.side_effect = upsert_many
+    commit_repository.upsert_many.return_value = UpsertResult()
+    commit_repository.copy_many.side_effect = copy_many
+    commit_repository.copy_many.return_value = UpsertResult()
+    return commit_repository
+
+
+@pytest.fixture
+def checkpoint_repository():
+    checkpoint_repository = MagicMock()
+    checkpoint_repository.get.return_value = None
+    return checkpoint_repository
+
+
+@pytest.fixture
+def watermark_repository():
+    watermark_repository = MagicMock()
+    watermark_repository.get_projects_watermark.return_value = None
+    watermark_repository.get_commits_watermark.return_value = None
+    return watermark_repository
 
 
 @pytest.fixture
@@ -58,35 +119,71 @@ def db():
 
 
 @pytest.fixture
-def get_projects_command(gitlab_service, project_repository, db):
+def get_projects_command(
+    gitlab_service, project_repository, watermark_repository, checkpoint_repository, db
+):
     command = GetProjectsCommand(kwargs={"no_db": False})
     command.gitlab_service = gitlab_service
     command.project_repository = project_repository
+    command.watermark_repository = watermark_repository
+    command.checkpoint_repository = checkpoint_repository
     command._no_db = False
     command.db = db
     return command
 
 
 @pytest.fixture
-def get_project_command(gitlab_service, project_repository, db):
+def get_project_command(
+    gitlab_service,
+    project_repository,
+    commit_repository,
+    watermark_repository,
+    checkpoint_repository,
+    db,
+):
     command = GetProjectCommand(kwargs={"no_db": False})
     command.gitlab_service = gitlab_service
     command.project_repository = project_repository
+    command.commit_repository = commit_repository
+    command.watermark_repository = watermark_repository
+    command.checkpoint_repository = checkpoint_repository
     command._no_db = False
     command.db = db
     return command
 
 
 @pytest.fixture
-def archive_project_command(gitlab_service, project_repository, db):
+def archive_project_command(
+    gitlab_service, project_repository, watermark_repository, db
+):
     command = ArchiveProjectCommand(kwargs={"no_db": False})
     command.gitlab_service = gitlab_service
     command.project_repository = project_repository
+    command.watermark_repository = watermark_repository
+    watermark_repository.get_projects_watermark.return_value = datetime.now(
+        timezone.utc
+    ) - timedelta(hours=1)
     command._no_db = False
     command.db = db
     return command
 
 
+# === Tests  Command ===
+
+
+def test_command_async_service(db, monkeypatch):
+    monkeypatch.delenv("SSL_CERT_PATH")
+    command = GetProjectCommand(kwargs={"use_async": True, "jobs": 50})
+
+    assert isinstance(command.gitlab_service, BridgedGitlabAPIService)
+
+
+def test_command_sync_service(db):
+    command = GetProjectCommand(kwargs={})
+
+    assert not isinstance(command.gitlab_service, BridgedGitlabAPIService)
+
+
 # === Tests  GetProjectsCommand execute ===
 
 
@@ -118,7 +215,6 @@ def test_get_projects_command_execute_no_options(get_projects_command):
         ),
     ]
     get_projects_command.global_options = MagicMock()
-    get_projects_command._save_projects = MagicMock()
 
     get_projects_command.gitlab_service.scan_projects.return_value = projects
 
@@ -128,7 +224,7 @@ def test_get_projects_command_execute_no_options(get_projects_command):
 
         get_projects_command.gitlab_service.scan_projects.assert_called_once()
         assert Mapper().project_from_gitlab_api.call_count == 2
-        get_projects_command._save_projects.assert_called_once_with(projects_dto)
+        assert get_projects_command.project_repository.saved_dto == projects_dto
 
 
 def test_get_projects_command_execute_with_no_database_options(get_projects_command):
@@ -163,8 +259,14 @@ def test_get_projects_command_execute_with_no_database_options(get_projects_comm
 
     get_projects_command.gitlab_service.scan_projects.return_value = projects
 
+    printed_dto = []
+
+    def print_dto_list(dto_list, dto_type):
+        printed_dto.extend(dto_list)
+        return len(printed_dto)
+
     with patch.object(
-        PrintProjectDTO, "print_dto_list", MagicMock()
+        PrintProjectDTO, "print_dto_list", MagicMock(side_effect=print_dto_list)
     ) as mock_print_dto_list:
         with patch.object(Mapper, "project_from_gitlab_api", side_effect=projects_dto):
             kwargs = {"no_db": True}
@@ -173,7 +275,8 @@ def test_get_projects_command_execute_with_no_database_options(get_projects_comm
 
             get_projects_command.gitlab_service.scan_projects.assert_called_once()
             assert Mapper().project_from_gitlab_api.call_count == 2
-            mock_print_dto_list.assert_called_once_with(projects_dto, "Projects")
+            mock_print_dto_list.assert_called_once_with(ANY, "Projects")
+            assert printed_dto == projects_dto
             get_projects_command._save_projects.assert_not_called()
 
 
@@ -182,8 +285,8 @@ def test_get_projects_command_execute_with_unused_since_options(get_projects_com
         MagicMock(),
         MagicMock(),
     ]
-    projects[0].updated_at = "2024-02-02T00:00:00Z"
-    projects[1].updated_at = "2024-04-02T00:00:00Z"
+    projects[0].last_activity_at = "2024-02-02T00:00:00Z"
+    projects[1].last_activity_at = "2024-04-02T00:00:00Z"
     projects_dto = [
         ProjectDTO(
             project_id=1,
@@ -207,7 +310,6 @@ def test_get_projects_command_execute_with_unused_since_options(get_projects_com
         ),
     ]
     get_projects_command.global_options = MagicMock()
-    get_projects_command._save_projects = MagicMock()
 
     get_projects_command.gitlab_service.scan_projects.return_value = projects
 
@@ -220,9 +322,16 @@ def test_get_projects_command_execute_with_unused_since_options(get_projects_com
         get_projects_command._unused_since = unused_since_datetime
         get_projects_command.execute(kwargs)
 
-        get_projects_command.gitlab_service.scan_projects.assert_called_once()
+        get_projects_command.gitlab_service.scan_projects.assert_called_once_with(
+            updated_after=None,
+            project_filter=ProjectFilter(unused_since=unused_since_datetime),
+            strategy=ScanStrategy.FULL,
+            jobs=1,
+            id_after=None,
+            updated_ids=None,
+        )
         assert Mapper().project_from_gitlab_api.call_count == 1
-        get_projects_command._save_projects.assert_called_once_with([projects_dto[0]])
+        assert get_projects_command.project_repository.saved_dto == [projects_dto[0]]
 
 
 def test_get_projects_command_execute_with_option_save_in_file(
@@ -282,6 +391,431 @@ def test_get_projects_command_execute_with_option_save_in_file(
             get_projects_command._save_projects.assert_not_called()
 
 
+def test_get_projects_command_execute_streams_projects(get_projects_command):
+    """Each project is saved before the next one is retrieved from the API."""
+    events = []
+
+    def scan_projects():
+        for project_id in (1, 2):
+            events.append(f"fetch {project_id}")
+            yield MagicMock(id=project_id)
+
+    def project_from_gitlab_api(project):
+        return MagicMock(project_id=project.id)
+
+    def upsert_many(projects_dto, batch_size, on_batch=None):
+        for batch in batched(projects_dto, batch_size):
+            events.extend(f"save {project_dto.project_id}" for project_dto in batch)
+        return UpsertResult()
+
+    get_projects_command._batch_size = 1
+    get_projects_command.gitlab_service.scan_projects.return_value = scan_projects()
+    get_projects_command.project_repository.upsert_many.side_effect = upsert_many
+
+    with patch.object(
+        Mapper, "project_from_gitlab_api", side_effect=project_from_gitlab_api
+    ):
+        get_projects_command.execute({})
+
+    assert events == ["fetch 1", "save 1", "fetch 2", "save 2"]
+
+
+def test_get_projects_command_execute_incremental(get_projects_command):
+    watermark = datetime(2024, 5, 1, tzinfo=timezone.utc)
+    get_projects_command.watermark_repository.get_projects_watermark.return_value = (
+        watermark
+    )
+    get_projects_command.gitlab_service.scan_projects.return_value = []
+
+    get_projects_command.execute({})
+
+    get_projects_command.watermark_repository.get_projects_watermark.assert_called_once_with(
+        "https://mockgitlab.com"
+    )
+    get_projects_command.gitlab_service.scan_projects.assert_called_once_with(
+        updated_after=watermark,
+        project_filter=ProjectFilter(),
+        strategy=ScanStrategy.FULL,
+        jobs=1,
+        id_after=None,
+        updated_ids=None,
+    )
+    url, synced_at = (
+        get_projects_command.watermark_repository.set_projects_watermark.call_args[0]
+    )
+    assert url == "https://mockgitlab.com"
+    assert synced_at > watermark
+
+
+def test_get_projects_command_execute_checkpoints(get_projects_command):
+    get_projects_command._batch_size = 1
+    get_projects_command.gitlab_service.scan_projects.return_value = [
+        MagicMock(id=1),
+        MagicMock(id=2),
+    ]
+
+    with patch.object(
+        Mapper,
+        "project_from_gitlab_api",
+        side_effect=lambda project: MagicMock(project_id=project.id),
+    ):
+        get_projects_command.execute({})
+
+    checkpoint_repository = get_projects_command.checkpoint_repository
+    assert [
+        save.args[1].cursor for save in checkpoint_repository.save.call_args_list
+    ] == ["1", "2"]
+    assert checkpoint_repository.save.call_args.args[0] == (
+        "projects:https://mockgitlab.com"
+    )
+    checkpoint_repository.delete.assert_called_once_with(
+        "projects:https://mockgitlab.com"
+    )
+
+
+def test_get_projects_command_execute_resume(get_projects_command):
+    started_at = datetime(2024, 5, 1, tzinfo=timezone.utc)
+    get_projects_command._resume = True
+    get_projects_command.checkpoint_repository.get.return_value = Checkpoint(
+        cursor="42",
+        started_at=started_at,
+        context={
+            "params": {
+                "filter": {
+                    "visibility": None,
+                    "namespace": None,
+                    "archived": None,
+                    "search": None,
+                    "active_since": None,
+                    "unused_since": None,
+                },
+                "updated_after": None,
+            }
+        },
+    )
+    get_projects_command.gitlab_service.scan_projects.return_value = []
+
+    get_projects_command.execute({})
+
+    scan_kwargs = get_projects_command.gitlab_service.scan_projects.call_args.kwargs
+    assert scan_kwargs["id_after"] == 42
+    get_projects_command.watermark_repository.set_projects_watermark.assert_called_once_with(
+        "https://mockgitlab.com", started_at
+    )
+
+
+def test_get_projects_command_execute_incremental_checkpoints(get_projects_command):
+    get_projects_command._batch_size = 2
+    get_projects_command.watermark_repository.get_projects_watermark.return_value = (
+        datetime(2024, 5, 1, tzinfo=timezone.utc)
+    )
+    updated_at = {
+        1: datetime(2024, 5, 2, tzinfo=timezone.utc),
+        2: datetime(2024, 5, 3, tzinfo=timezone.utc),
+        3: datetime(2024, 5, 3, tzinfo=timezone.utc),
+    }
+    get_projects_command.gitlab_service.scan_projects.return_value = [
+        MagicMock(id=project_id) for project_id in updated_at
+    ]
+
+    with patch.object(
+        Mapper,
+        "project_from_gitlab_api",
+        side_effect=lambda project: MagicMock(
+            project_id=project.id, updated_at=updated_at[project.id]
+        ),
+    ):
+        get_projects_command.execute({})
+
+    checkpoints = [
+        save.args[1]
+        for save in get_projects_command.checkpoint_repository.save.call_args_list
+    ]
+    assert [checkpoint.cursor for checkpoint in checkpoints] == [
+        "2024-05-03T00:00:00+00:00",
+        "2024-05-03T00:00:00+00:00",
+    ]
+    assert [checkpoint.context["updated_ids"] for checkpoint in checkpoints] == [
+        [2],
+        [3],
+    ]
+
+
+def test_get_projects_command_execute_incremental_resume(get_projects_command):
+    get_projects_command._resume = True
+    get_projects_command.watermark_repository.get_projects_watermark.return_value = (
+        datetime(2024, 5, 1, tzinfo=timezone.utc)
+    )
+    get_projects_command.checkpoint_repository.get.return_value = Checkpoint(
+        cursor="2024-05-03T00:00:00+00:00",
+        started_at=datetime(2024, 6, 1, tzinfo=timezone.utc),
+        context={
+            "params": {
+                "filter": {
+                    "visibility": None,
+                    "namespace": None,
+                    "archived": None,
+                    "search": None,
+                    "active_since": None,
+                    "unused_since": None,
+                },
+                "updated_after": "2024-05-01 00:00:00+00:00",
+            },
+            "updated_ids": [2],
+        },
+    )
+    get_projects_command.gitlab_service.scan_projects.return_value = []
+
+    get_projects_command.execute({})
+
+    scan_kwargs = get_projects_command.gitlab_service.scan_projects.call_args.kwargs
+    assert scan_kwargs["updated_after"] == datetime(2024, 5, 3, tzinfo=timezone.utc)
+    assert scan_kwargs["updated_ids"] == [2]
+    assert scan_kwargs["id_after"] is None
+
+
+def test_get_projects_command_execute_resume_other_options(get_projects_command):
+    get_projects_command._resume = True
+    get_projects_command.checkpoint_repository.get.return_value = Checkpoint(
+        cursor="42",
+        started_at=datetime(2024, 5, 1, tzinfo=timezone.utc),
+        context={"params": {"filter": {}, "updated_after": "2024-04-01"}},
+    )
+    get_projects_command.gitlab_service.scan_projects.return_value = []
+
+    get_projects_command.execute({})
+
+    assert (
+        get_projects_command.gitlab_service.scan_projects.call_args.kwargs["id_after"]
+        is None
+    )
+
+
+def test_get_projects_command_execute_full_scan(get_projects_command):
+    get_projects_command._full_scan = True
+    get_projects_command.gitlab_service.scan_projects.return_value = []
+
+    get_projects_command.execute({"full_scan": True})
+
+    get_projects_command.watermark_repository.get_projects_watermark.assert_not_called()
+    get_projects_command.gitlab_service.scan_projects.assert_called_once_with(
+        updated_after=None,
+        project_filter=ProjectFilter(),
+        strategy=ScanStrategy.FULL,
+        jobs=1,
+        id_after=None,
+        updated_ids=None,
+    )
+    get_projects_command.watermark_repository.set_projects_watermark.assert_called_once()
+
+
+def test_get_projects_command_execute_unused_since_keeps_watermark(
+    get_projects_command,
+):
+    get_projects_command.gitlab_service.scan_projects.return_value = []
+
+    get_projects_command.execute({"unused_since": datetime(2024, 1, 1)})
+
+    get_projects_command.watermark_repository.get_projects_watermark.assert_not_called()
+    get_projects_command.gitlab_service.scan_projects.assert_called_once_with(
+        updated_after=None,
+        project_filter=ProjectFilter(unused_since=datetime(2024, 1, 1)),
+        strategy=ScanStrategy.FULL,
+        jobs=1,
+        id_after=None,
+        updated_ids=None,
+    )
+    get_projects_command.watermark_repository.set_projects_watermark.assert_not_called()
+
+
+def test_get_projects_command_execute_sorted_strategy(get_projects_command):
+    get_projects_command.gitlab_service.scan_projects.return_value = []
+
+    get_projects_command.execute(
+        {"unused_since": datetime(2024, 1, 1), "strategy": ScanStrategy.SORTED}
+    )
+
+    get_projects_command.gitlab_service.scan_projects.assert_called_once_with(
+        updated_after=None,
+        project_filter=ProjectFilter(unused_since=datetime(2024, 1, 1)),
+        strategy=ScanStrategy.SORTED,
+        jobs=1,
+        id_after=None,
+        updated_ids=None,
+    )
+
+
+def test_get_projects_command_execute_filters(get_projects_command):
+    projects = [
+        MagicMock(path_with_namespace="group/project1", archived=False),
+        MagicMock(path_with_namespace="other/project2", archived=False),
+        MagicMock(path_with_namespace="group/project3", archived=True),
+    ]
+    get_projects_command.gitlab_service.scan_projects.return_value = projects
+
+    with patch.object(
+        Mapper, "project_from_gitlab_api", side_effect=lambda project: project
+    ):
+        get_projects_command.execute({"namespace": "group", "archived": False})
+
+    get_projects_command.watermark_repository.get_projects_watermark.assert_not_called()
+    get_projects_command.gitlab_service.scan_projects.assert_called_once_with(
+        updated_after=None,
+        project_filter=ProjectFilter(namespace="group", archived=False),
+        strategy=ScanStrategy.FULL,
+        jobs=1,
+        id_after=None,
+        updated_ids=None,
+    )
+    assert get_projects_command.project_repository.saved_dto == [projects[0]]
+    get_projects_command.watermark_repository.set_projects_watermark.assert_not_called()
+
+
+def test_dump_projects_same_as_json_dump(get_projects_command, tmp_path, monkeypatch):
+    projects_dto = [
+        ProjectDTO(
+            project_id=1,
+            name="Project 1",
+            path="namespace/project1",
+            description="Description 1",
+            release="enabled",
+            visibility="public",
+            created_at=datetime.fromisoformat("2024-01-01T00:00:00Z"),
+            updated_at=datetime.fromisoformat("2024-01-02T00:00:00Z"),
+        ),
+        ProjectDTO(
+            project_id=2,
+            name="Project 2",
+            path="namespace/project2",
+            description=None,
+            release="enabled",
+            visibility="internal",
+            created_at=datetime.fromisoformat("2024-02-01T00:00:00Z"),
+            updated_at=datetime.fromisoformat("2024-03-02T00:00:00Z"),
+        ),
+    ]
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "saved_datas" / "projects").mkdir(parents=True)
+    get_projects_command._save_in_file = "test-file"
+
+    for dto_list in (projects_dto, []):
+        count = get_projects_command._dump_projects(iter(dto_list))
+
+        assert count == len(dto_list)
+        assert (tmp_path / "saved_datas/projects/test-file.json").read_text(
+            encoding="utf-8"
+        ) == json.dumps(
+            [project.__dict__ for project in dto_list], indent=4, default=str
+        )
+
+
+def mock_project(project_id):
+    project = MagicMock(id=project_id)
+    project.name = f"Project {project_id}"
+    return project
+
+
+def project_dto_of(project):
+    return ProjectDTO(
+        project_id=project.id,
+        name=project.name,
+        path=f"namespace/{project.id}",
+        description="",
+        release="enabled",
+        visibility="public",
+        created_at="2024-01-01T00:00:00Z",
+        updated_at="2024-01-02T00:00:00Z",
+    )
+
+
+def test_get_projects_command_scans_commits(get_projects_command, capsys):
+    projects = [mock_project(project_id) for project_id in range(1, 6)]
+    get_projects_command.gitlab_service.scan_projects.return_value = projects
+    get_projects_command._scan_commits = True
+    get_projects_command._workers = 2
+    get_projects_command._batch_size = 2
+
+    with patch.object(
+        Mapper, "project_from_gitlab_api", side_effect=project_dto_of
+    ), patch.object(
+        GetProjectCommand, "_get_commits", side_effect=lambda project: project.id * 10
+    ) as mock_get_commits:
+        get_projects_command.execute({})
+
+    assert sorted(call.args[0].id for call in mock_get_commits.call_args_list) == [
+        1,
+        2,
+        3,
+        4,
+        5,
+    ]
+    output = capsys.readouterr().out
+    assert "Commits scan summary" in output
+    assert "5 projects, 0 failed, 150 commits" in output
+    get_projects_command.watermark_repository.set_projects_watermark.assert_called_once()
+
+
+def test_get_projects_command_scans_commits_with_failure(get_projects_command, capsys):
+    projects = [mock_project(project_id) for project_id in range(1, 4)]
+    get_projects_command.gitlab_service.scan_projects.return_value = projects
+    get_projects_command._scan_commits = True
+
+    def get_commits(project):
+        if project.id == 2:
+            raise SystemExit(1)
+        return 1
+
+    with patch.object(
+        Mapper, "project_from_gitlab_api", side_effect=project_dto_of
+    ), patch.object(GetProjectCommand, "_get_commits", side_effect=get_commits):
+        get_projects_command.execute({})
+
+    assert "3 projects, 1 failed, 2 commits" in capsys.readouterr().out
+    get_projects_command.watermark_repository.set_projects_watermark.assert_not_called()
+
+
+def test_get_projects_command_scans_commits_with_network_error(
+    get_projects_command, capsys
+):
+    projects = [mock_project(project_id) for project_id in range(1, 4)]
+    get_projects_command.gitlab_service.scan_projects.return_value = projects
+    get_projects_command._scan_commits = True
+
+    def get_commits(project):
+        if project.id == 2:
+            raise ReadTimeout()
+        return 1
+
+    with patch.object(
+        Mapper, "project_from_gitlab_api", side_effect=project_dto_of
+    ), patch.object(GetProjectCommand, "_get_commits", side_effect=get_commits):
+        get_projects_command.execute({})
+
+    assert "3 projects, 1 failed, 2 commits" in capsys.readouterr().out
+
+
+def test_get_projects_command_commit_scanner_shares_client(get_projects_command):
+    get_projects_command.gitlab_service.scan_projects.return_value = [mock_project(1)]
+    get_projects_command._scan_commits = True
+    get_projects_command._options = {"no_db": False, "full_scan": True}
+    scanners = []
+
+    def get_commits(scanner, project):
+        scanners.append(scanner)
+        return 0
+
+    with patch.object(
+        Mapper, "project_from_gitlab_api", side_effect=project_dto_of
+    ), patch.object(GetProjectCommand, "_get_commits", autospec=True) as mock_commits:
+        mock_commits.side_effect = get_commits
+        get_projects_command.execute({"full_scan": True})
+
+    assert scanners[0] is not get_projects_command
+    assert scanners[0].gitlab_service is get_projects_command.gitlab_service
+    # --full-scan retrieves the projects again, not their commits.
+    assert not scanners[0]._full_commit_scan
+
+
 # === Tests  GetProjectsCommand _save_projects ===
 
 
@@ -308,11 +842,12 @@ def test_save_projects(get_projects_command, caplog):
             updated_at="2024-03-02T00:00:00Z",
         ),
     ]
-    get_projects_command.project_repository.create = MagicMock()
+    count = get_projects_command._save_projects(projects_dto)
 
-    get_projects_command._save_projects(projects_dto)
-
-    assert get_projects_command.project_repository.create.call_count == 2
+    assert count == 2
+    get_projects_command.project_repository.upsert_many.assert_called_once_with(
+        projects_dto, DEFAULT_BATCH_SIZE, on_batch=None
+    )
 
     for record in caplog.records:
         assert record.levelname == "INFO"
@@ -498,6 +1033,111 @@ def test_save_project(get_project_command, caplog):
         ) in record.message
 
 
+def test_get_commits_checkpoints(get_project_command):
+    project = MagicMock(id=1)
+    commits = [
+        MagicMock(id="c", committed_date="2021-01-03T00:00:00+00:00"),
+        MagicMock(id="b", committed_date="2021-01-02T00:00:00+00:00"),
+        MagicMock(id="a", committed_date="2021-01-01T00:00:00+00:00"),
+    ]
+    get_project_command._single_pass = True
+    get_project_command._batch_size = 2
+    get_project_command.gitlab_service.get_project_commit.return_value = commits
+
+    with patch.object(
+        Mapper,
+        "commit_from_gitlab_api_list",
+        side_effect=lambda commit, project_id: MagicMock(commit_id=commit.id),
+    ), patch.object(GetProjectCommand, "_on_commits_batch") as on_commits_batch:
+        get_project_command._get_commits(project)
+
+    checkpoint_repository = get_project_command.checkpoint_repository
+    assert [
+        save.args[1].cursor for save in checkpoint_repository.save.call_args_list
+    ] == ["2021-01-02T00:00:00+00:00", "2021-01-01T00:00:00+00:00"]
+    assert on_commits_batch.call_args_list == [call(project), call(project)]
+    assert checkpoint_repository.save.call_args.args[1].context["newest_commit"] == [
+        "c",
+        "2021-01-03T00:00:00+00:00",
+    ]
+    checkpoint_repository.delete.assert_called_once_with("commits:1")
+
+
+def test_get_commits_streams_the_list(get_project_command):
+    project = MagicMock(id=1)
+    listed = []
+
+    def project_commits():
+        for index in range(20):
+            listed.append(index)
+            yield MagicMock(id=str(index), committed_date=f"2021-01-{20 - index:02}")
+
+    get_project_command._single_pass = True
+    get_project_command._batch_size = 2
+    get_project_command.gitlab_service.get_project_commit.return_value = (
+        project_commits()
+    )
+    listed_at_first_batch = []
+    get_project_command.checkpoint_repository.save.side_effect = (
+        lambda scope, checkpoint: listed_at_first_batch.append(len(listed))
+    )
+
+    with patch.object(
+        Mapper,
+        "commit_from_gitlab_api_list",
+        side_effect=lambda commit, project_id: MagicMock(commit_id=commit.id),
+    ):
+        get_project_command._get_commits(project)
+
+    # The first batch is saved before the whole list is retrieved.
+    assert listed_at_first_batch[0] < 20
+    assert len(listed) == 20
+    last_checkpoint = get_project_command.checkpoint_repository.save.call_args.args[1]
+    assert last_checkpoint.cursor == "2021-01-01"
+
+
+def test_get_commits_resume(get_project_command):
+    project = MagicMock(id=1)
+    get_project_command._resume = True
+    get_project_command._single_pass = True
+    get_project_command.checkpoint_repository.get.return_value = Checkpoint(
+        cursor="2021-01-02T00:00:00+00:00",
+        started_at=datetime(2024, 5, 1, tzinfo=timezone.utc),
+        context={
+            "params": {"since": None, "single_pass": True},
+            "newest_commit": ["c", "2021-01-03T00:00:00+00:00"],
+        },
+    )
+    get_project_command.gitlab_service.get_project_commit.return_value = [
+        MagicMock(id="a", committed_date="2021-01-01T00:00:00+00:00"),
+        MagicMock(id="b", committed_date="2021-01-02T00:00:00+00:00"),
+    ]
+
+    with patch.object(
+        Mapper,
+        "commit_from_gitlab_api_list",
+        side_effect=lambda commit, project_id: MagicMock(commit_id=commit.id),
+    ), patch("gitlab_monitor.controller.controller.stage") as mock_stage:
+        get_project_command._get_commits(project)
+
+    # The rest of the list is sorted, and in memory already.
+    mock_stage.assert_not_called()
+    checkpoint_repository = get_project_command.checkpoint_repository
+    assert checkpoint_repository.save.call_args.args[1].cursor == (
+        "2021-01-01T00:00:00+00:00"
+    )
+    get_project_command.checkpoint_repository.get.assert_called_once_with("commits:1")
+    get_project_command.gitlab_service.get_project_commit.assert_called_once_with(
+        project, since=None, until=datetime(2021, 1, 2, tzinfo=timezone.utc)
+    )
+    get_project_command.watermark_repository.set_commits_watermark.assert_called_once_with(
+        1, "c", datetime(2021, 1, 3, tzinfo=timezone.utc)
+    )
+    get_project_command.checkpoint_repository.delete.assert_called_once_with(
+        "commits:1"
+    )
+
+
 # === Tests  GetProjectCommand _get_commits ===
 
 
@@ -505,8 +1145,8 @@ def test_get_commits(get_project_command):
     project_id = 1
     project = MagicMock()
     commits = [
-        MagicMock(),
-        MagicMock(),
+        MagicMock(id="b", committed_date="2021-01-02T00:00:00+00:00"),
+        MagicMock(id="a", committed_date="2021-01-01T00:00:00+00:00"),
     ]
     commits_dto = [
         CommitDTO(
@@ -525,25 +1165,41 @@ def test_get_commits(get_project_command):
         ),
     ]
 
-    get_project_command._save_commits = MagicMock()
+    saved = []
+    get_project_command._save_commits = MagicMock(
+        side_effect=lambda dto_commits, project, on_batch: saved.extend(dto_commits)
+    )
     get_project_command.gitlab_service.get_project_commit.return_value = commits
+    get_project_command.gitlab_service.get_commits_details.return_value = [
+        MagicMock(),
+        MagicMock(),
+    ]
 
     with patch.object(Mapper, "commit_from_gitlab_api", side_effect=commits_dto):
         get_project_command._get_commits(project)
 
         get_project_command.gitlab_service.get_project_commit.assert_called_once_with(
-            project
+            project, since=None
+        )
+        get_project_command.gitlab_service.get_commits_details.assert_called_once_with(
+            project, [commit.id for commit in commits], 1
         )
         assert Mapper().commit_from_gitlab_api.call_count == 2
-        get_project_command._save_commits.assert_called_once_with(commits_dto, project)
+        get_project_command._save_commits.assert_called_once_with(
+            ANY, project, on_batch=ANY
+        )
+        assert saved == commits_dto
+        get_project_command.watermark_repository.set_commits_watermark.assert_called_once_with(
+            project.id, "b", datetime(2021, 1, 2, tzinfo=timezone.utc)
+        )
 
 
 def test_get_commits_no_database(get_project_command):
     project_id = 1
     project = MagicMock()
     commits = [
-        MagicMock(),
-        MagicMock(),
+        MagicMock(id="b", committed_date="2021-01-02T00:00:00+00:00"),
+        MagicMock(id="a", committed_date="2021-01-01T00:00:00+00:00"),
     ]
     commits_dto = [
         CommitDTO(
@@ -562,8 +1218,15 @@ def test_get_commits_no_database(get_project_command):
         ),
     ]
 
-    get_project_command._save_commits = MagicMock()
+    saved = []
+    get_project_command._save_commits = MagicMock(
+        side_effect=lambda dto_commits, project, on_batch: saved.extend(dto_commits)
+    )
     get_project_command.gitlab_service.get_project_commit.return_value = commits
+    get_project_command.gitlab_service.get_commits_details.return_value = [
+        MagicMock(),
+        MagicMock(),
+    ]
 
     with patch.object(
         PrintCommitDTO, "print_dto_list", MagicMock()
@@ -573,11 +1236,128 @@ def test_get_commits_no_database(get_project_command):
             get_project_command._get_commits(project)
 
             get_project_command.gitlab_service.get_project_commit.assert_called_once_with(
-                project
+                project, since=None
             )
             assert Mapper().commit_from_gitlab_api.call_count == 2
             get_project_command._save_commits.assert_not_called()
             mock_print_dto_list.assert_called_once_with(commits_dto, "Commits")
+            get_project_command.watermark_repository.get_commits_watermark.assert_not_called()
+            get_project_command.watermark_repository.set_commits_watermark.assert_not_called()
+
+
+def test_get_commits_single_pass(get_project_command):
+    project = MagicMock()
+    project.id = 1
+    commits = [
+        MagicMock(id="b", committed_date="2021-01-02T00:00:00+00:00"),
+        MagicMock(id="a", committed_date="2021-01-01T00:00:00+00:00"),
+    ]
+    commits_dto = [
+        CommitDTO(
+            commit_id=1,
+            message="Commit 1",
+            project_id=1,
+            date="2021-01-01",
+            author="Test Author",
+        ),
+        CommitDTO(
+            commit_id=2,
+            message="Commit 2",
+            project_id=1,
+            date="2021-01-01",
+            author="Test Author",
+        ),
+    ]
+
+    saved = []
+    get_project_command._save_commits = MagicMock(
+        side_effect=lambda dto_commits, project, on_batch: saved.extend(dto_commits)
+    )
+    get_project_command._single_pass = True
+    get_project_command.gitlab_service.get_project_commit.return_value = commits
+
+    with patch.object(
+        Mapper, "commit_from_gitlab_api_list", side_effect=commits_dto
+    ) as mock_mapper, patch(
+        "gitlab_monitor.controller.controller.stage",
+        side_effect=lambda elements, maxsize: elements,
+    ) as mock_stage:
+        get_project_command._get_commits(project)
+
+        mock_mapper.assert_has_calls([call(commits[0], 1), call(commits[1], 1)])
+        # The pages of the list are requested while the database writes.
+        mock_stage.assert_called_once()
+        get_project_command.gitlab_service.get_commits_details.assert_not_called()
+        get_project_command._save_commits.assert_called_once_with(
+            ANY, project, on_batch=ANY
+        )
+        assert saved == commits_dto
+
+
+def test_get_commits_error_while_saving(get_project_command):
+    project = MagicMock(id=1)
+    get_project_command.gitlab_service.get_project_commit.return_value = [
+        MagicMock(id="a", committed_date="2021-01-01T00:00:00+00:00"),
+    ]
+    get_project_command.gitlab_service.get_commits_details.side_effect = SystemExit(1)
+
+    with pytest.raises(SystemExit):
+        get_project_command._get_commits(project)
+
+    get_project_command.watermark_repository.set_commits_watermark.assert_not_called()
+    get_project_command.checkpoint_repository.delete.assert_not_called()
+
+
+def test_get_commits_since_watermark(get_project_command):
+    project = MagicMock()
+    last_committed_at = datetime(2024, 5, 1, tzinfo=timezone.utc)
+    get_project_command.watermark_repository.get_commits_watermark.return_value = (
+        "abc",
+        last_committed_at,
+    )
+    get_project_command.gitlab_service.is_commit_in_branches.return_value = True
+    get_project_command.gitlab_service.get_project_commit.return_value = []
+
+    get_project_command._get_commits(project)
+
+    get_project_command.watermark_repository.get_commits_watermark.assert_called_once_with(
+        project.id
+    )
+    get_project_command.gitlab_service.is_commit_in_branches.assert_called_once_with(
+        project, "abc"
+    )
+    get_project_command.gitlab_service.get_project_commit.assert_called_once_with(
+        project, since=last_committed_at
+    )
+
+
+def test_get_commits_since_rewritten_history(get_project_command):
+    project = MagicMock()
+    get_project_command.watermark_repository.get_commits_watermark.return_value = (
+        "abc",
+        datetime(2024, 5, 1, tzinfo=timezone.utc),
+    )
+    get_project_command.gitlab_service.is_commit_in_branches.return_value = False
+    get_project_command.gitlab_service.get_project_commit.return_value = []
+
+    get_project_command._get_commits(project)
+
+    get_project_command.gitlab_service.get_project_commit.assert_called_once_with(
+        project, since=None
+    )
+
+
+def test_get_commits_full_scan(get_project_command):
+    project = MagicMock()
+    get_project_command._full_commit_scan = True
+    get_project_command.gitlab_service.get_project_commit.return_value = []
+
+    get_project_command._get_commits(project)
+
+    get_project_command.watermark_repository.get_commits_watermark.assert_not_called()
+    get_project_command.gitlab_service.get_project_commit.assert_called_once_with(
+        project, since=None
+    )
 
 
 # === Tests  GetProjectCommand _get_commits ===
@@ -603,11 +1383,12 @@ def test_save_commits(get_project_command, caplog):
 
     project = MagicMock()
 
-    get_project_command.commit_repository.create = MagicMock()
-
     get_project_command._save_commits(commits_dto, project)
 
-    assert get_project_command.commit_repository.create.call_count == 2
+    get_project_command.commit_repository.upsert_many.assert_called_once_with(
+        ANY, DEFAULT_BATCH_SIZE, on_batch=None
+    )
+    assert get_project_command.commit_repository.saved_dto == commits_dto
 
     with patch.object(project, "name") as mock_project_name:
         for record in caplog.records:
@@ -619,6 +1400,74 @@ def test_save_commits(get_project_command, caplog):
             ) in record.message
 
 
+def test_save_commits_skips_known_commits(get_project_command):
+    commits_dto = [
+        CommitDTO(
+            commit_id=commit_id,
+            message="Commit",
+            project_id=1,
+            date="2021-01-01",
+            author="Test Author",
+        )
+        for commit_id in ("known", "new")
+    ]
+    project = MagicMock(id=1)
+    get_project_command.commit_repository.load_identity_index.return_value = {"known"}
+
+    get_project_command._save_commits(commits_dto, project)
+
+    get_project_command.commit_repository.load_identity_index.assert_called_once_with(1)
+    assert get_project_command.commit_repository.saved_dto == [commits_dto[1]]
+
+
+def test_save_commits_logs_unchanged_commits(get_project_command, caplog):
+    commits_dto = [
+        CommitDTO(
+            commit_id=commit_id,
+            message="Commit",
+            project_id=1,
+            date="2021-01-01",
+            author="Test Author",
+        )
+        for commit_id in ("known", "changed", "same")
+    ]
+    project = MagicMock(id=1)
+    project.name = "Project 1"
+    get_project_command.commit_repository.load_identity_index.return_value = {"known"}
+    get_project_command.commit_repository.upsert_many.return_value = UpsertResult(
+        updated=1, unchanged=1
+    )
+
+    with caplog.at_level("INFO", logger=logger.name):
+        get_project_command._save_commits(commits_dto, project)
+
+    assert (
+        '3 commits from project "Project 1" have been retrieved: 0 saved, 1 updated '
+        "and 2 unchanged in the database." in caplog.text
+    )
+
+
+def test_save_commits_copy_load(get_project_command):
+    commits_dto = [
+        CommitDTO(
+            commit_id=1,
+            message="Commit 1",
+            project_id=1,
+            date="2021-01-01",
+            author="Test Author",
+        ),
+    ]
+    get_project_command._copy_load = True
+    on_batch = MagicMock()
+
+    get_project_command._save_commits(commits_dto, MagicMock(), on_batch=on_batch)
+
+    get_project_command.commit_repository.copy_many.assert_called_once()
+    get_project_command.commit_repository.upsert_many.assert_not_called()
+    assert get_project_command.commit_repository.saved_dto == commits_dto
+    on_batch.assert_called_once_with(commits_dto)
+
+
 # === Tests ArchiveProjectCommand execute ===
 
 
@@ -626,34 +1475,298 @@ def test_archive_project_by_id(archive_project_command):
     project_id = "123"
     project_mock = MagicMock()
 
-    archive_project_command.gitlab_service.get_project_by_id.return_value = project_mock
+    archive_project_command.gitlab_service.get_project_handle.return_value = (
+        project_mock
+    )
 
     archive_project_command.execute({"project": project_id})
 
-    archive_project_command.gitlab_service.get_project_by_id.assert_called_once_with(
-        project_id
+    archive_project_command.gitlab_service.get_project_handle.assert_called_once_with(
+        123
     )
+    archive_project_command.gitlab_service.get_project_by_id.assert_not_called()
     archive_project_command.gitlab_service.archive_project.assert_called_once_with(
         project_mock
     )
 
 
-def test_archive_projects_from_json_file(archive_project_command):
-    projects = [{"project_id": "123"}, {"project_id": "456"}]
-    project_mocks = [MagicMock(), MagicMock()]
+def archive_results(project_ids, jobs):
+    for project_id in project_ids:
+        yield project_id, "404 Project Not Found" if project_id == 789 else None
+
+
+def test_archive_projects_from_json_file(archive_project_command, tmp_path):
+    projects_file = tmp_path / "projects.json"
+    projects_file.write_text(
+        json.dumps([{"project_id": 123}, {"project_id": 456}, {"project_id": 123}])
+    )
+    archive_project_command._jobs = 4
+    archive_project_command.gitlab_service.archive_projects.side_effect = (
+        archive_results
+    )
+
+    archive_project_command.execute({"project": str(projects_file)})
 
-    archive_project_command.gitlab_service.get_project_by_id.side_effect = project_mocks
+    archive_project_command.gitlab_service.archive_projects.assert_called_once_with(
+        [123, 456], 4
+    )
+    archive_project_command.gitlab_service.get_project_by_id.assert_not_called()
+    journal = [
+        json.loads(line)
+        for line in (tmp_path / "projects.archive.jsonl").read_text().splitlines()
+    ]
+    assert [(entry["project_id"], entry["error"]) for entry in journal] == [
+        (123, None),
+        (456, None),
+    ]
 
-    with patch("builtins.open", mock_open(read_data=json.dumps(projects))):
-        archive_project_command.execute({"project": "projects.json"})
 
-    expected_calls = [call(project["project_id"]) for project in projects]
-    archive_project_command.gitlab_service.get_project_by_id.assert_has_calls(
-        expected_calls
+def test_archive_projects_skips_archived_projects(archive_project_command, tmp_path):
+    projects_file = tmp_path / "projects.json"
+    projects_file.write_text(
+        json.dumps([{"project_id": 123}, {"project_id": 456}, {"project_id": 789}])
     )
-    assert archive_project_command.gitlab_service.get_project_by_id.call_count == len(
-        projects
+    journal_file = tmp_path / "journal.jsonl"
+    archive_project_command.gitlab_service.archive_projects.side_effect = (
+        archive_results
     )
-    assert archive_project_command.gitlab_service.archive_project.call_count == len(
-        projects
+
+    for _ in range(2):
+        with pytest.raises(SystemExit):
+            archive_project_command.execute(
+                {"project": str(projects_file), "journal": str(journal_file)}
+            )
+
+    # Only the project which failed is archived again.
+    assert archive_project_command.gitlab_service.archive_projects.call_args_list == [
+        call([123, 456, 789], 1),
+        call([789], 1),
+    ]
+
+
+def test_archive_projects_unused_since(archive_project_command, tmp_path):
+    unused_since = datetime(2023, 1, 1)
+    archive_project_command.project_repository.find_unused_since.return_value = [
+        project_dto_of(mock_project(project_id)) for project_id in (3, 1)
+    ]
+    archive_project_command.gitlab_service.archive_projects.side_effect = (
+        archive_results
+    )
+    journal_file = tmp_path / "journal.jsonl"
+
+    archive_project_command.execute(
+        {
+            "unused_since": unused_since,
+            "namespace": "group",
+            "visibility": "private",
+            "journal": str(journal_file),
+        }
+    )
+
+    archive_project_command.project_repository.find_unused_since.assert_called_once_with(
+        unused_since, namespace="group", visibility="private"
+    )
+    archive_project_command.gitlab_service.archive_projects.assert_called_once_with(
+        [3, 1], 1
+    )
+    assert len(journal_file.read_text().splitlines()) == 2
+
+
+def test_archive_projects_dry_run(archive_project_command, tmp_path):
+    archive_project_command.project_repository.find_unused_since.return_value = [
+        project_dto_of(mock_project(1))
+    ]
+    journal_file = tmp_path / "journal.jsonl"
+
+    with patch.object(PrintProjectDTO, "print_dto_list") as mock_print_dto_list:
+        archive_project_command.execute(
+            {
+                "unused_since": datetime(2023, 1, 1),
+                "dry_run": True,
+                "journal": str(journal_file),
+            }
+        )
+
+    mock_print_dto_list.assert_called_once()
+    archive_project_command.gitlab_service.archive_projects.assert_not_called()
+    archive_project_command.gitlab_service.archive_project.assert_not_called()
+    assert not journal_file.exists()
+
+
+@pytest.mark.parametrize(
+    "synced_at",
+    [None, datetime.now(timezone.utc) - timedelta(hours=25)],
+)
+def test_archive_projects_unused_since_outdated_scan(
+    archive_project_command, synced_at, tmp_path
+):
+    archive_project_command.watermark_repository.get_projects_watermark.return_value = (
+        synced_at
+    )
+
+    with pytest.raises(SystemExit):
+        archive_project_command.execute(
+            {
+                "unused_since": datetime(2023, 1, 1),
+                "journal": str(tmp_path / "journal.jsonl"),
+            }
+        )
+
+    archive_project_command.project_repository.find_unused_since.assert_not_called()
+    archive_project_command.gitlab_service.archive_projects.assert_not_called()
+
+
+def test_archive_projects_unused_since_max_sync_age(archive_project_command, tmp_path):
+    archive_project_command.watermark_repository.get_projects_watermark.return_value = (
+        datetime.now(timezone.utc) - timedelta(hours=25)
+    )
+    archive_project_command.project_repository.find_unused_since.return_value = []
+
+    archive_project_command.execute(
+        {
+            "unused_since": datetime(2023, 1, 1),
+            "max_sync_age": 48,
+            "journal": str(tmp_path / "journal.jsonl"),
+        }
+    )
+
+    archive_project_command.project_repository.find_unused_since.assert_called_once()
+
+
+def test_archive_projects_dry_run_outdated_scan(archive_project_command, caplog):
+    archive_project_command.watermark_repository.get_projects_watermark.return_value = (
+        None
     )
+    archive_project_command.project_repository.find_unused_since.return_value = []
+
+    with patch.object(PrintProjectDTO, "print_dto_list"):
+        archive_project_command.execute(
+            {"unused_since": datetime(2023, 1, 1), "dry_run": True}
+        )
+
+    assert "were never scanned" in caplog.text
+    archive_project_command.project_repository.find_unused_since.assert_called_once()
+
+
+# === Tests WorkerCommand execute ===
+
+
+@pytest.fixture
+def worker_command(
+    gitlab_service,
+    project_repository,
+    commit_repository,
+    watermark_repository,
+    checkpoint_repository,
+    db,
+):
+    command = WorkerCommand(kwargs={"jobs": 2})
+    command.gitlab_service = gitlab_service
+    command.project_repository = project_repository
+    command.commit_repository = commit_repository
+    command.watermark_repository = watermark_repository
+    command.checkpoint_repository = checkpoint_repository
+    command.scan_task_repository = MagicMock()
+    command.scan_task_repository.requeue_expired.return_value = 0
+    command.db = db
+    return command
+
+
+def test_worker_command_scans_claimed_projects(worker_command):
+    worker_command.scan_task_repository.claim.side_effect = [1, 2, None]
+
+    with patch.object(GetProjectCommand, "execute") as mock_execute:
+        worker_command.execute({"enqueue": True, "worker_name": "worker-1"})
+
+    worker_command.scan_task_repository.enqueue_saved_projects.assert_called_once()
+    assert mock_execute.call_args_list == [
+        call({"id": 1, "get_commits": True}),
+        call({"id": 2, "get_commits": True}),
+    ]
+    assert worker_command.scan_task_repository.complete.call_args_list == [
+        call(1, "worker-1"),
+        call(2, "worker-1"),
+    ]
+    assert worker_command.scan_task_repository.requeue_expired.call_count == 3
+    assert worker_command._jobs == 2
+
+
+def test_worker_command_releases_failed_scan(worker_command):
+    worker_command.scan_task_repository.claim.side_effect = [1, None]
+
+    with patch.object(GetProjectCommand, "execute", side_effect=SystemExit(1)):
+        worker_command.execute({"worker_name": "worker-1", "max_attempts": 5})
+
+    worker_command.scan_task_repository.enqueue_saved_projects.assert_not_called()
+    worker_command.scan_task_repository.fail.assert_called_once_with(1, "worker-1", 5)
+    worker_command.scan_task_repository.complete.assert_not_called()
+
+
+def test_worker_command_releases_scan_with_transport_error(worker_command):
+    worker_command.scan_task_repository.claim.side_effect = [1, None]
+
+    with patch.object(
+        GetProjectCommand, "execute", side_effect=ReadTimeout("timed out")
+    ):
+        worker_command.execute({"worker_name": "worker-1", "max_attempts": 5})
+
+    worker_command.scan_task_repository.fail.assert_called_once_with(1, "worker-1", 5)
+    worker_command.scan_task_repository.complete.assert_not_called()
+
+
+def test_worker_command_renews_lease_after_each_batch(worker_command):
+    worker_command._worker = "worker-1"
+    worker_command._lease = timedelta(minutes=10)
+    worker_command.scan_task_repository.renew.return_value = True
+
+    worker_command._on_commits_batch(MagicMock(id=1))
+
+    worker_command.scan_task_repository.renew.assert_called_once_with(
+        1, "worker-1", timedelta(minutes=10)
+    )
+
+
+def test_worker_command_stops_scan_when_lease_is_lost(worker_command):
+    worker_command.scan_task_repository.claim.side_effect = [1, None]
+    worker_command.scan_task_repository.renew.return_value = False
+
+    def scan(kwargs):
+        worker_command._on_commits_batch(MagicMock(id=kwargs["id"]))
+
+    with patch.object(GetProjectCommand, "execute", side_effect=scan):
+        worker_command.execute({"worker_name": "worker-1", "lease": 600})
+
+    worker_command.scan_task_repository.renew.assert_called_once_with(
+        1, "worker-1", timedelta(seconds=600)
+    )
+    worker_command.scan_task_repository.fail.assert_not_called()
+    worker_command.scan_task_repository.complete.assert_not_called()
+
+
+def test_worker_command_waits_for_tasks(worker_command):
+    worker_command.scan_task_repository.claim.side_effect = [None, 1, None]
+
+    with patch.object(GetProjectCommand, "execute"), patch(
+        "gitlab_monitor.controller.controller.time.sleep",
+        side_effect=[None, KeyboardInterrupt],
+    ) as mock_sleep:
+        with pytest.raises(KeyboardInterrupt):
+            worker_command.execute({"wait": True, "poll_interval": 5})
+
+    mock_sleep.assert_called_with(5)
+    worker_command.scan_task_repository.complete.assert_called_once()
+
+
+# === Tests UpgradeDatabaseCommand execute ===
+
+
+def test_upgrade_database_command(monkeypatch):
+    monkeypatch.delenv("GITLAB_PRIVATE_TOKEN")
+    with patch("gitlab_monitor.controller.controller.Database") as mock_database:
+        mock_database.upgrade.return_value = (0, 1)
+        command = UpgradeDatabaseCommand({})
+
+        command.execute()
+
+        mock_database.upgrade.assert_called_once()
+        mock_database.assert_not_called()